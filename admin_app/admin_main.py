@@ -1,30 +1,104 @@
 # admin_app/admin_main.py
+import importlib
 import tkinter as tk
 import threading
-from tkinterweb import HtmlFrame
+import sys
 
-# Import the admin Flask app and run function
-from .admin_web_server import run_admin_server
+# The admin Flask app and tkinterweb are imported lazily; see shared/startup.py.
+from shared.serving import server_config
+from shared.startup import StartupTimer, in_process_requested, run_in_background, warm_up
 
 class AdminApp:
-    def __init__(self, root):
+    def __init__(self, root, server_ready=None, timer=None, in_process=False):
         self.root = root
         self.root.title("PUP Shop - Admin Panel")
         self.root.geometry("800x600")
+        self.server_ready = server_ready or threading.Event()
+        self.timer = timer or StartupTimer()
+        self.in_process = in_process
 
-        self.webview = HtmlFrame(self.root, messages_enabled=False)
-        self.webview.pack(fill="both", expand=True)
-        self.webview.load_url("http://127.0.0.1:5001")
+        self.loading_label = tk.Label(self.root, text="Loading Admin Panel...", font=("Arial", 16, "bold"), fg="#722F37")
+        self.loading_label.pack(expand=True)
+        self.wait_for_server()
 
-def main():
-    # Start the Admin Flask server in a separate thread
-    flask_thread = threading.Thread(target=run_admin_server, daemon=True)
-    flask_thread.start()
+    def wait_for_server(self):
+        if self.server_ready.is_set():
+            self.show_webview()
+        else:
+            self.root.after(20, self.wait_for_server)
+
+    def show_webview(self):
+        with self.timer.phase('webview create'):
+            from tkinterweb import HtmlFrame
+            self.loading_label.destroy()
+            self.webview = HtmlFrame(self.root, messages_enabled=False)
+            self.webview.pack(fill="both", expand=True)
+        with self.timer.phase('webview load'):
+            if self.in_process:
+                self.load_in_process()
+            else:
+                self.webview.load_url(server_url())
+        self.timer.report()
+
+    def load_in_process(self):
+        # The app module was already imported by the background loader, so this is cheap.
+        from shared.webview import WSGITransport
+        from .admin_web_server import app
+        self.transport = WSGITransport(app)
+        self.transport.attach(self.webview)
+        self.transport.home()
+
+def server_url():
+    config = server_config('admin', default_port=5001)
+    host = '127.0.0.1' if config['host'] in ('0.0.0.0', '') else config['host']
+    return f"http://{host}:{config['port']}"
+
+def _run_server(timer, server_ready, schema_ready):
+    with timer.phase('import web server'):
+        from .admin_web_server import run_admin_server
+    schema_ready.wait()  # a fresh database has no tables until init_db has run
+    run_admin_server(on_ready=lambda: (timer.mark('server listening'), server_ready.set()))
+
+def _load_app(timer, server_ready, schema_ready):
+    # In-process mode: no socket, the webview is ready once the app is imported and the schema exists.
+    # Imported for the side effect only: the webview's transport picks the modules up later.
+    with timer.phase('import web server'):
+        importlib.import_module('.admin_web_server', __package__)
+        importlib.import_module('shared.webview')
+    schema_ready.wait()
+    timer.mark('app ready (in-process)')
+    server_ready.set()
+
+def _warm_up(timer, schema_ready):
+    from shared.database import check_db, init_db
+    from . import admin_web_server
+    # Serving waits for the schema; the cache warm-ups run alongside the first requests.
+    warm_up(timer,
+            ('db connect', check_db),
+            ('schema check', init_db))
+    schema_ready.set()
+    warm_up(timer,
+            ('inventory page load', admin_web_server.warm_caches),
+            ('import tkinterweb', lambda: __import__('tkinterweb')))
+
+def main(argv=None):
+    timer = StartupTimer.from_argv(argv)
+    server_ready = threading.Event()
+    schema_ready = threading.Event()
+    in_process = in_process_requested(argv)
+
+    # Start the Admin Flask server and warm the DB/catalog while the window comes up
+    if in_process:
+        run_in_background('flask-app', _load_app, timer, server_ready, schema_ready)
+    else:
+        run_in_background('flask-server', _run_server, timer, server_ready, schema_ready)
+    run_in_background('warm-up', _warm_up, timer, schema_ready)
 
     # Start the Tkinter GUI
-    root = tk.Tk()
-    app = AdminApp(root)
+    with timer.phase('tk init'):
+        root = tk.Tk()
+        app = AdminApp(root, server_ready, timer, in_process)
     root.mainloop()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main(sys.argv[1:])
\ No newline at end of file
@@ -1,23 +1,70 @@
 # admin_app/admin_web_server.py
-from flask import Flask, request, redirect, url_for
+from flask import Flask, Response, abort, jsonify, request, redirect, url_for
 from dominate import document
 from dominate.tags import *
-from shared.database import get_all_products, add_product, update_product, delete_product
+from dominate.util import raw
+from shared.database import get_products_page, add_product, update_product, delete_product, check_db, get_catalog_cache_stats, get_pool_stats
+from shared.inventory_csv import export_csv, import_csv
+from shared.inventory_summary import get_inventory_summary_stats, inventory_dashboard, refresh_inventory_summary
+from shared.metrics import install_metrics, stats_collector, timed
+from shared.pool import PoolTimeout
+from mysql.connector import Error
+from shared.serving import install_health_check, serve, server_config
+from shared.static_assets import asset_url, fallback_css, install_static_routes
 import os
+import sys
 
 app = Flask(__name__, static_folder=os.path.join('..', 'assets'), static_url_path='/static')
+install_health_check(app, check_db)
+install_metrics(app, 'admin',
+                stats_collector('pup_db_pool', get_pool_stats, counters=('created', 'recycled', 'discarded', 'timeouts')),
+                stats_collector('pup_catalog_cache', get_catalog_cache_stats,
+                                counters=('hits', 'misses', 'browse_hits', 'browse_misses')),
+                stats_collector('pup_inventory_summary', get_inventory_summary_stats,
+                                counters=('reconciles', 'drift_corrections')))
+install_static_routes(app)
 
-def create_admin_page(products):
+# The inventory table shows one keyset page at a time; see get_products_page.
+ADMIN_PAGE_SIZES = (25, 50, 100)
+ADMIN_DEFAULT_PAGE_SIZE = 50
+ADMIN_FIELDS = ('id', 'name', 'stock', 'price')
+# Table header -> (ascending sort, descending sort)
+ADMIN_COLUMNS = (("ID", 'oldest', 'newest'), ("NAME", 'name_asc', 'name_desc'),
+                 ("QUANTITY", 'stock_asc', 'stock_desc'), ("PRICE", 'price_asc', 'price_desc'))
+
+def _table_url(query, sort, limit, cursor=None):
+    return url_for('admin_home', q=query or None, sort=sort, limit=limit, cursor=cursor)
+
+def _create_dashboard(dashboard):
+    with div(class_="grid grid-cols-2 md:grid-cols-4 gap-4 mb-4"):
+        for caption, value in (("STOCK VALUE", f"₱{dashboard['stock_value']:,.2f}"), ("PRODUCTS", f"{dashboard['products']:,}"),
+                               ("LOW STOCK", f"{dashboard['low_stock']:,}"), ("OUT OF STOCK", f"{dashboard['out_of_stock']:,}")):
+            div(p(caption, class_="text-sm font-bold text-gray-500"), p(value, class_="text-2xl font-bold text-[#722F37]"),
+                class_="bg-white p-4 rounded-lg shadow-md")
+    with div(class_="bg-white p-4 rounded-lg shadow-md mb-8"):
+        h2("TOP SELLERS", class_="font-bold text-[#722F37] mb-2")
+        with ol(class_="list-decimal list-inside"):
+            for product in dashboard['top_sellers']:
+                li(f"{product['name']} ({product['sold_count'] or 0:,} sold)")
+        if dashboard['reconciled_at'] is not None:
+            p(f"Last full recount {dashboard['reconciled_at']:%Y-%m-%d %H:%M:%S}", class_="text-xs text-gray-500 mt-2")
+
+def create_admin_page(page, query='', sort='newest', limit=ADMIN_DEFAULT_PAGE_SIZE, first_page=True, dashboard=None):
+    products = page['products']
     doc = document(title="PUP Shop - Admin Panel")
     with doc.head:
         meta(charset="UTF-8")
-        link(href="https://cdn.jsdelivr.net/npm/tailwindcss@2.2.19/dist/tailwind.min.css", rel="stylesheet")
+        link(href=asset_url('tailwind.css'), rel="stylesheet")
+        if fallback_css():
+            style(raw(fallback_css()))  # no local Tailwind yet; see shared/static_assets.py
 
     # --- APPLYING THE SAME FIX HERE ---
     doc.body.set_attribute('class', 'bg-gray-200 p-8')
     with doc.body:
         img(src="/static/images/pup_logo.png", class_="mx-auto h-16 w-16 mb-4")
         h1("INVENTORY MANAGEMENT", class_="text-3xl font-bold text-center text-[#722F37] mb-6 border-b-2 border-[#722F37] pb-2")
+        if dashboard is not None:
+            _create_dashboard(dashboard)
         
         with form(action="/add", method="POST", class_="bg-white p-6 rounded-lg shadow-md mb-8"):
             with div(class_="grid grid-cols-1 md:grid-cols-2 gap-4"):
@@ -31,37 +78,117 @@ def create_admin_page(products):
                 button("Update Item", type="submit", formaction="/update", formmethod="post", class_="bg-blue-600 text-white px-6 py-2 rounded-lg")
                 button("Delete Item", type="submit", formaction="/delete", formmethod="post", class_="bg-red-600 text-white px-6 py-2 rounded-lg")
 
+        with form(action="/import", method="POST", enctype="multipart/form-data", class_="bg-white p-6 rounded-lg shadow-md mb-8 flex items-center space-x-4"):
+            label("BULK CSV:", _for="csv_file", class_="font-bold")
+            input_(type="file", name="file", id="csv_file", accept=".csv,text/csv", required=True, class_="p-2 border rounded flex-1")
+            button("Import", type="submit", class_="bg-green-600 text-white px-6 py-2 rounded-lg")
+            a("Export", href="/export", class_="bg-blue-600 text-white px-6 py-2 rounded-lg")
+
+        with form(action="/", method="GET", class_="bg-white p-4 rounded-lg shadow-md mb-4 flex items-center space-x-4"):
+            input_(type="search", name="q", value=query, placeholder="Search by name", class_="p-2 border rounded flex-1")
+            input_(type="hidden", name="sort", value=sort)
+            with select(name="limit", class_="p-2 border rounded"):
+                for size in ADMIN_PAGE_SIZES:
+                    option(f"{size} per page", value=size, selected=(size == limit))
+            button("Search", type="submit", class_="bg-[#722F37] text-white px-6 py-2 rounded-lg")
+
         with table(class_="w-full bg-white rounded-lg shadow-md"):
             with thead(class_="bg-[#722F37] text-white"):
                 with tr():
-                    th("ID", class_="p-3"); th("NAME", class_="p-3"); th("QUANTITY", class_="p-3"); th("PRICE", class_="p-3")
+                    for heading, ascending, descending in ADMIN_COLUMNS:
+                        arrow = " ▲" if sort == ascending else " ▼" if sort == descending else ""
+                        toggled = descending if sort == ascending else ascending
+                        th(a(heading + arrow, href=_table_url(query, toggled, limit)), class_="p-3")
             with tbody():
                 if products: # Check if products is not None
                     for p in products:
                         with tr(class_="border-b hover:bg-gray-100"):
                             td(p['id'], class_="p-3"); td(p['name'], class_="p-3"); td(p['stock'], class_="p-3"); td(f"₱{p['price']:.2f}", class_="p-3")
+                else:
+                    with tr():
+                        td("No products match." if query else "No products yet.", colspan=4, class_="p-3 text-center")
+
+        with div(class_="flex justify-between mt-4"):
+            if not first_page:
+                a("« First page", href=_table_url(query, sort, limit), class_="text-[#722F37] font-bold")
+            else:
+                span()
+            if page['next_cursor']:
+                a("Next page »", href=_table_url(query, sort, limit, page['next_cursor']), class_="text-[#722F37] font-bold")
     return doc.render()
 
 # (The rest of the admin_web_server.py file remains the same)
 @app.route("/")
 def admin_home():
-    products = get_all_products()
-    return create_admin_page(products)
+    query = request.args.get('q', '').strip()
+    sort = request.args.get('sort', 'newest')
+    limit = request.args.get('limit', ADMIN_DEFAULT_PAGE_SIZE, type=int)
+    if limit not in ADMIN_PAGE_SIZES:
+        limit = ADMIN_DEFAULT_PAGE_SIZE
+    cursor = request.args.get('cursor')
+    try:
+        page = get_products_page(limit=limit, cursor=cursor, sort=sort, columns=ADMIN_FIELDS, name_filter=query)
+    except ValueError as err:
+        abort(400, str(err))
+    try:
+        # Kept up to date in memory (see shared/inventory_summary.py), so this costs the
+        # same for ten products or a million.
+        dashboard = inventory_dashboard()
+    except (Error, PoolTimeout) as err:
+        print(f"Error loading the inventory dashboard: {err}")
+        dashboard = None
+    with timed('render'):
+        return create_admin_page(page, query, sort, limit, first_page=not cursor, dashboard=dashboard)
+
+def warm_caches():
+    """Loads the first inventory page and builds the dashboard figures so the first request doesn't pay for them."""
+    get_products_page(limit=ADMIN_DEFAULT_PAGE_SIZE, columns=ADMIN_FIELDS)
+    inventory_dashboard()
 
+# Each write is followed by refresh_inventory_summary(), so the page it redirects to
+# already counts it.
 @app.route("/add", methods=["POST"])
 def admin_add():
     add_product(request.form['item_name'], request.form['quantity'], request.form['price'])
+    refresh_inventory_summary()
     return redirect(url_for('admin_home'))
 
 @app.route("/update", methods=["POST"])
 def admin_update():
     update_product(request.form['item_id'], request.form['item_name'], request.form['quantity'], request.form['price'])
+    refresh_inventory_summary()
     return redirect(url_for('admin_home'))
 
 @app.route("/delete", methods=["POST"])
 def admin_delete():
     delete_product(request.form['item_id'])
+    refresh_inventory_summary()
     return redirect(url_for('admin_home'))
 
-def run_admin_server():
-    app.run(host='127.0.0.1', port=5001, debug=False)
\ No newline at end of file
+@app.route("/import", methods=["POST"])
+def admin_import():
+    """
+    Bulk upsert from CSV, sent either as a multipart `file` field (the admin form) or as
+    the raw request body (e.g. `curl --data-binary @stock.csv -H 'Content-Type: text/csv'`).
+    """
+    upload = request.files.get('file')
+    try:
+        summary = import_csv(upload.stream if upload else request.stream)
+        refresh_inventory_summary()
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+    except (Error, PoolTimeout) as err:
+        print(f"Error importing products: {err}")
+        return jsonify({'error': 'Database unavailable'}), 503
+    return jsonify(summary)
+
+@app.route("/export")
+def admin_export():
+    return Response(export_csv(), mimetype='text/csv',
+                    headers={'Content-Disposition': 'attachment; filename=products.csv'})
+
+def run_admin_server(argv=(), on_ready=None):
+    serve(app, on_ready=on_ready, **server_config('admin', default_port=5001, argv=argv))
+
+if __name__ == '__main__':
+    run_admin_server(sys.argv[1:])
\ No newline at end of file
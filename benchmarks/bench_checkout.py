@@ -0,0 +1,135 @@
+# benchmarks/bench_checkout.py
+"""
+Merch-drop checkout benchmark.
+
+Creates a scratch product with a fixed stock, then has many concurrent clients try to
+buy it through place_order(). Reports orders/sec and verifies that nothing was oversold.
+Runs against the database configured in shared/database.py:
+
+    python -m benchmarks.bench_checkout --clients 300 --stock 100
+"""
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from shared import database
+from shared.database import CheckoutError, db_connection, init_db, place_order
+
+
+def _create_scratch_product(stock):
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "INSERT INTO products (name, description, price, stock, image_url, sold_count) VALUES (%s, %s, %s, %s, %s, %s)",
+                ('Benchmark Drop Item', 'bench_checkout scratch product', 100.00, stock, '/static/images/pup_logo.png', 0)
+            )
+            product_id = cursor.lastrowid
+            conn.commit()
+        finally:
+            cursor.close()
+    return product_id
+
+
+def _product_state(product_id):
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT stock, sold_count FROM products WHERE id=%s", (product_id,))
+            stock, sold_count = cursor.fetchone()
+            cursor.execute("SELECT COALESCE(SUM(quantity), 0) FROM order_items WHERE product_id=%s", (product_id,))
+            ordered = int(cursor.fetchone()[0])
+        finally:
+            cursor.close()
+    return stock, sold_count, ordered
+
+
+def _cleanup(product_id):
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("DELETE FROM orders WHERE id IN (SELECT order_id FROM order_items WHERE product_id=%s)", (product_id,))
+            cursor.execute("DELETE FROM order_items WHERE product_id=%s", (product_id,))
+            cursor.execute("DELETE FROM products WHERE id=%s", (product_id,))
+            conn.commit()
+        finally:
+            cursor.close()
+
+
+def run(clients, stock, quantity, keep=False):
+    init_db()
+    product_id = _create_scratch_product(stock)
+    counts = {'placed': 0, 'sold_out': 0, 'errors': 0}
+    lock = threading.Lock()
+    start_gate = threading.Event()
+
+    def buyer(_):
+        start_gate.wait()
+        try:
+            place_order([(product_id, quantity)])
+            outcome = 'placed'
+        except CheckoutError as err:
+            outcome = 'sold_out' if err.out_of_stock else 'errors'
+        except Exception:
+            outcome = 'errors'
+        with lock:
+            counts[outcome] += 1
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        futures = [pool.submit(buyer, n) for n in range(clients)]
+        time.sleep(0.2)  # let every worker reach the gate so they all hit the row at once
+        started = time.perf_counter()
+        start_gate.set()
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - started
+
+    database.product_counters.flush()  # sold_count is written behind; see place_order
+    final_stock, sold_count, ordered = _product_state(product_id)
+    if not keep:
+        _cleanup(product_id)
+
+    return {
+        'clients': clients,
+        'initial_stock': stock,
+        'quantity_per_order': quantity,
+        'elapsed_s': round(elapsed, 4),
+        'attempts_per_s': round(clients / elapsed, 1),
+        'orders_per_s': round(counts['placed'] / elapsed, 1),
+        **counts,
+        'final_stock': final_stock,
+        'units_ordered': ordered,
+        'oversold_units': max(0, ordered - stock),
+        'consistent': final_stock >= 0 and final_stock == stock - ordered and sold_count == ordered,
+        'pool': database.get_pool_stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=300, help='concurrent buyers (default 300)')
+    parser.add_argument('--stock', type=int, default=100, help='units available in the drop (default 100)')
+    parser.add_argument('--quantity', type=int, default=1, help='units per order (default 1)')
+    parser.add_argument('--pool-size', type=int, default=20, help='DB connection pool size (default 20)')
+    parser.add_argument('--keep', action='store_true', help='keep the scratch product and its orders')
+    parser.add_argument('--json', metavar='PATH', help='also write the results to PATH as JSON')
+    args = parser.parse_args()
+
+    database.POOL_CONFIG['size'] = args.pool_size
+    # Hundreds of buyers share a small pool; give them time to queue rather than time out.
+    database.POOL_CONFIG['timeout'] = max(database.POOL_CONFIG['timeout'], 60)
+    result = run(args.clients, args.stock, args.quantity, keep=args.keep)
+
+    for key, value in result.items():
+        print(f"{key:>20}: {value}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2, default=str)
+    if not result['consistent'] or result['oversold_units']:
+        raise SystemExit("FAILED: stock accounting is inconsistent")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+# benchmarks/bench_search.py
+"""
+Product search latency benchmark.
+
+Builds the in-memory search index over a synthetic catalog (or the configured database
+with --from-db), then replays typeahead keystrokes against /api/suggest and submitted
+queries against /api/search through the shop's Flask app. Reports p50/p95/p99 latency
+per endpoint and fails if a p99 exceeds its budget:
+
+    python -m benchmarks.bench_search --products 50000 --queries 2000
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from shared import search
+
+# p99 budgets, in milliseconds, for a request handled in-process (no network).
+BUDGETS_MS = {'suggest': 10.0, 'search': 25.0}
+
+_ADJECTIVES = ('Minimalist', 'Classic', 'Vintage', 'Iskolar', 'Baybayin', 'Obelisk', 'Sablay', 'Heritage',
+               'Limited', 'Study', 'Campus', 'Mabini', 'Sintang', 'Paaralan', 'Retro', 'Premium')
+_ITEMS = ('Lanyard', 'Tote Bag', 'Shirt', 'Hoodie', 'Mug', 'Notebook', 'Pin', 'Cap', 'Sticker Set',
+          'Tumbler', 'Jacket', 'Keychain', 'Pouch', 'Umbrella', 'Signage', 'Pen')
+_COLOURS = ('White', 'Black', 'Maroon', 'Gold', 'Navy', 'Grey', 'Green', 'Cream')
+_MOTIFS = ('Iskolar Script', 'Obelisk silhouette', 'Baybayin text', 'Jeepney art', 'PUP seal', 'Coquette bow')
+
+
+def synthetic_products(count, seed=7):
+    """`count` product dicts with realistic, overlapping names and descriptions."""
+    rng = random.Random(seed)
+    for product_id in range(1, count + 1):
+        adjective, item, colour = rng.choice(_ADJECTIVES), rng.choice(_ITEMS), rng.choice(_COLOURS)
+        yield {
+            'id': product_id,
+            'name': f"PUP {adjective} {item} ({colour}) #{product_id}",
+            'description': f"{colour} {item.lower()} with {rng.choice(_MOTIFS)} design",
+            'price': round(rng.uniform(20, 900), 2),
+            'stock': rng.randint(0, 500),
+            'image_url': '/static/images/pup_logo.png',
+            'sold_count': rng.randint(0, 5000),
+        }
+
+
+def _workload(count, seed=11):
+    """Yields ('suggest' | 'search', query) pairs: each query is typed a keystroke at a time."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        words = [rng.choice(_ADJECTIVES), rng.choice(_ITEMS).split()[0]]
+        if rng.random() < 0.3:
+            words.append(rng.choice(_COLOURS))
+        text = ' '.join(words).lower()
+        for end in range(1, len(text) + 1):
+            if text[end - 1] != ' ':
+                yield 'suggest', text[:end]
+        yield 'search', text
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(products, queries, from_db=False):
+    started = time.perf_counter()
+    if from_db:
+        index = search.build_index()
+        if index is None:
+            raise SystemExit("The catalog is above PUP_SEARCH_MAX_PRODUCTS; search uses FULLTEXT instead.")
+    else:
+        index = search.SearchIndex()
+        for product in synthetic_products(products):
+            index.add(product)
+    build_s = time.perf_counter() - started
+    search.set_index(index)
+
+    from shop_app.web_server import app
+    client = app.test_client()
+    latencies = {'suggest': [], 'search': []}
+    hits = 0
+    for endpoint, query in _workload(queries):
+        t0 = time.perf_counter()
+        response = client.get(f"/api/{endpoint}", query_string={'q': query})
+        latencies[endpoint].append((time.perf_counter() - t0) * 1000)
+        if response.status_code != 200:
+            raise SystemExit(f"/api/{endpoint}?q={query} returned {response.status_code}")
+        if endpoint == 'search':
+            hits += bool(response.get_json()['products'])
+
+    result = {'products': len(index), 'index_build_s': round(build_s, 3), 'searches': queries,
+              'searches_with_hits': hits}
+    for endpoint, samples in latencies.items():
+        result[endpoint] = {
+            'requests': len(samples),
+            'mean_ms': round(statistics.fmean(samples), 3),
+            'p50_ms': round(_percentile(samples, 50), 3),
+            'p95_ms': round(_percentile(samples, 95), 3),
+            'p99_ms': round(_percentile(samples, 99), 3),
+            'budget_p99_ms': BUDGETS_MS[endpoint],
+        }
+        result[endpoint]['within_budget'] = result[endpoint]['p99_ms'] <= BUDGETS_MS[endpoint]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=50000, help='synthetic catalog size (default 50000)')
+    parser.add_argument('--queries', type=int, default=2000, help='searches to type and submit (default 2000)')
+    parser.add_argument('--from-db', action='store_true', help='index the configured database instead')
+    parser.add_argument('--json', metavar='PATH', help='also write the results to PATH as JSON')
+    args = parser.parse_args()
+
+    result = run(args.products, args.queries, from_db=args.from_db)
+    for key, value in result.items():
+        print(f"{key:>20}: {value}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+    over = [name for name in BUDGETS_MS if not result[name]['within_budget']]
+    if over:
+        raise SystemExit(f"FAILED: p99 over budget for {', '.join(over)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+# benchmarks/bench_suite.py
+"""
+Render, catalog and request hot-path benchmarks.
+
+For each catalog size, loads synthetic products into a local database stand-in (see
+benchmarks/standin.py) and times create_page for every section, create_admin_page,
+create_fragment, get_all_products, and whole requests through the shop and admin Flask apps. Results are
+written as JSON so runs from different commits can be compared:
+
+    python -m benchmarks.bench_suite --json before.json
+    python -m benchmarks.bench_suite --json after.json --compare before.json
+"""
+import argparse
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+
+from benchmarks.bench_search import synthetic_products
+from benchmarks.standin import standin_database
+from shared import database
+
+DEFAULT_SIZES = (10, 1000, 50000)
+# Each case runs for at least MIN_SECONDS (and MIN_ITERATIONS), but at most MAX_ITERATIONS times.
+MIN_SECONDS = 0.5
+MIN_ITERATIONS = 5
+MAX_ITERATIONS = 2000
+# --compare fails a case whose median got this much slower than the baseline (the median
+# rather than the mean, so one GC pause doesn't read as a regression).
+REGRESSION_THRESHOLD = 0.25
+SECTIONS = ('homepage', 'login', 'register', 'cart', 'checkout', 'profile', 'order_history', 'contact')
+
+
+def measure(fn, iterations=None):
+    """
+    Calls fn(i) repeatedly; returns latency stats in milliseconds and calls per second.
+    Like timeit, the garbage collector is paused while sampling.
+    """
+    samples = []
+    gc.collect()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        for i in range(iterations if iterations is not None else MAX_ITERATIONS):
+            if iterations is None and i >= MIN_ITERATIONS and time.perf_counter() - started >= MIN_SECONDS:
+                break
+            t0 = time.perf_counter()
+            fn(i)
+            samples.append((time.perf_counter() - t0) * 1000)
+    finally:
+        gc.enable()
+    ordered = sorted(samples)
+    return {
+        'iterations': len(samples),
+        'mean_ms': round(statistics.fmean(samples), 4),
+        'p50_ms': round(ordered[len(ordered) // 2], 4),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+        'per_s': round(len(samples) / (sum(samples) / 1000), 1),
+    }
+
+
+def run_size(size):
+    """All cases against a fresh stand-in holding `size` products."""
+    from admin_app import admin_web_server
+    from shop_app import web_server
+
+    results = {}
+    with standin_database(synthetic_products(size)):
+        # --- Rendering ---
+        catalog_page = web_server._homepage_catalog_page()
+        for section in SECTIONS:
+            results[f"create_page[{section}]"] = measure(
+                lambda i: web_server.create_page(f"PUP Shop - {section.title()}", section, catalog_page))
+
+        def cold_page(i):
+            # What the first request after start-up or a catalog change pays.
+            web_server._page_shell.cache_clear()
+            web_server._section_html.cache_clear()
+            web_server._grid_cache = (None, '')
+            web_server.create_page("PUP Shop - Homepage", 'homepage', catalog_page)
+        results['create_page[cold]'] = measure(cold_page)
+        results['create_fragment[homepage]'] = measure(lambda i: web_server.create_fragment('homepage', catalog_page))
+
+        admin_page = database.get_products_page(limit=admin_web_server.ADMIN_DEFAULT_PAGE_SIZE,
+                                                columns=admin_web_server.ADMIN_FIELDS)
+        with admin_web_server.app.test_request_context('/'):  # the page builds its links with url_for
+            results['create_admin_page'] = measure(lambda i: admin_web_server.create_admin_page(admin_page))
+
+        # --- Catalog ---
+        results['get_all_products[cached]'] = measure(lambda i: database.get_all_products())
+
+        def uncached(i):
+            database.invalidate_catalog()
+            database.get_all_products()
+        results['get_all_products[uncached]'] = measure(uncached)
+
+        # --- Requests ---
+        database.invalidate_catalog()
+        shop = web_server.app.test_client()
+        admin = admin_web_server.app.test_client()
+        results['GET /show/homepage'] = measure(lambda i: _check(shop.get('/show/homepage'), 200))
+        results['GET /fragment/cart'] = measure(lambda i: _check(shop.get('/fragment/cart'), 200))
+        results['POST /register'] = measure(lambda i: _check(shop.post('/register', data={
+            'name': 'Bench User', 'email': f"bench{i}@example.com", 'password': 'pw', 'confirm_password': 'pw'}), 302))
+        results['GET admin /'] = measure(lambda i: _check(admin.get('/'), 200))
+        results['GET admin /?q&sort'] = measure(lambda i: _check(admin.get('/', query_string={
+            'q': 'Tote', 'sort': 'stock_asc'}), 200))
+        results['POST admin /add'] = measure(lambda i: _check(admin.post('/add', data={
+            'item_name': f"Bench Item {i}", 'quantity': '10', 'price': '99.50'}), 302))
+        results['POST admin /update'] = measure(lambda i: _check(admin.post('/update', data={
+            'item_id': '1', 'item_name': 'Bench Updated', 'quantity': str(i), 'price': '10.00'}), 302))
+        added = _bench_item_ids()
+        results['POST admin /delete'] = measure(lambda i: _check(admin.post('/delete', data={
+            'item_id': str(added[i])}), 302), iterations=len(added))
+    return results
+
+
+def _bench_item_ids():
+    with database.db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT id FROM products WHERE name LIKE %s", ('Bench Item %',))
+            return [row[0] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+
+def _check(response, expected):
+    if response.status_code != expected:
+        raise SystemExit(f"{response.request.method} {response.request.path} returned "
+                         f"{response.status_code}, expected {expected}")
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(result, baseline, threshold=REGRESSION_THRESHOLD):
+    """Returns (size, case, old_ms, new_ms) for every case whose median regressed past `threshold`."""
+    regressions = []
+    for size, cases in result['sizes'].items():
+        for case, stats in cases.items():
+            old = baseline.get('sizes', {}).get(size, {}).get(case)
+            if old and stats['p50_ms'] > old['p50_ms'] * (1 + threshold):
+                regressions.append((size, case, old['p50_ms'], stats['p50_ms']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='catalog sizes to run (default 10 1000 50000)')
+    parser.add_argument('--json', metavar='PATH', default='bench_results.json',
+                        help='where to write the results (default bench_results.json)')
+    parser.add_argument('--compare', metavar='BASELINE', help='fail if a case is slower than in this results file')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help='allowed slowdown for --compare, as a fraction (default 0.25)')
+    args = parser.parse_args()
+
+    result = {
+        'commit': _commit(),
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sizes': {},
+    }
+    for size in args.sizes:
+        print(f"--- {size} products ---")
+        result['sizes'][str(size)] = cases = run_size(size)
+        for case, stats in cases.items():
+            print(f"{case:>30}: {stats['mean_ms']:9.3f} ms mean  {stats['p50_ms']:9.3f} ms p50  {stats['p95_ms']:9.3f} ms p95  {stats['per_s']:>9}/s")
+    with open(args.json, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"Wrote {args.json}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(result, json.load(f), args.threshold)
+        for size, case, old, new in regressions:
+            print(f"REGRESSION {size} products, {case}: {old:.3f} ms -> {new:.3f} ms")
+        if regressions:
+            raise SystemExit(f"FAILED: {len(regressions)} case(s) slower than {args.compare}")
+
+
+if __name__ == '__main__':
+    main()
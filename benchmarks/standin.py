@@ -0,0 +1,46 @@
+# benchmarks/standin.py
+"""
+A local stand-in for the MySQL database, so benchmarks run without a server.
+
+standin_database(products) switches shared.database to the SQLite backend on a scratch
+file, migrated like a real database and holding just the given products, and switches
+back afterwards. SQLite's timings are not MySQL's: use the results to compare commits
+against each other, not to size production.
+"""
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from shared import database
+from shared.changes import stop_change_feed
+from shared.backends import SQLiteBackend
+
+
+@contextmanager
+def standin_database(products):
+    """Serves shared.database from a scratch SQLite copy of `products` (dicts) for the block."""
+    directory = tempfile.mkdtemp(prefix='pup_standin_')
+    previous = database.get_backend()
+    database.set_backend(SQLiteBackend(os.path.join(directory, 'pup_shop.db')))
+    try:
+        if not database.init_db():
+            raise SystemExit("Could not create the stand-in database")
+        with database.db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("DELETE FROM products")  # the sample products from the migrations
+                cursor.executemany(
+                    f"INSERT INTO products ({', '.join(database.PRODUCT_COLUMNS)}) "
+                    f"VALUES ({', '.join(['%s'] * len(database.PRODUCT_COLUMNS))})",
+                    [tuple(p[c] for c in database.PRODUCT_COLUMNS) for p in products]
+                )
+                conn.commit()
+            finally:
+                cursor.close()
+        database.invalidate_catalog()
+        yield
+    finally:
+        stop_change_feed()  # it would go on polling the stand-in's tables on the next database
+        database.set_backend(previous)
+        shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,277 @@
+# shared/backends.py
+"""
+Storage backends behind shared/database.py.
+
+A backend opens connections, pools them, and covers the few places where the engines
+differ: advisory locking and index and column DDL for migrations, and full-text search.
+
+    MySQLBackend   the MySQL server the shop and admin apps were built on.
+    SQLiteBackend  an embedded single-file database for the single-kiosk build and for
+                   running without a server. WAL mode lets the shop and admin
+                   processes read while one of them writes.
+
+SQL elsewhere in the package is written for MySQL (%s placeholders, FOR UPDATE,
+ON DUPLICATE KEY UPDATE, AUTO_INCREMENT). SQLite connections translate those
+statements once per distinct query text, and raise mysql.connector errors with the
+matching errno, so callers need no per-backend code.
+"""
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal
+from functools import lru_cache
+
+import mysql.connector
+from mysql.connector import errors
+
+from shared.pool import ConnectionPool, ThreadLocalPool
+
+
+# --- MySQL ---
+class MySQLBackend:
+    name = 'mysql'
+    supports_fulltext = True
+    # MySQL commits DDL implicitly, so each migration step is committed as it lands.
+    transactional_ddl = False
+
+    def __init__(self, config, pool_config):
+        self.config = config
+        self.pool_config = pool_config
+
+    def connect(self):
+        """Opens a new raw connection. Raises on failure."""
+        return mysql.connector.connect(**self.config)
+
+    def create_pool(self):
+        # is_connected() pings the server, which catches connections dropped by wait_timeout.
+        return ConnectionPool(self.connect, validate=lambda conn: conn.is_connected(), **self.pool_config)
+
+    @contextmanager
+    def migration_lock(self, cursor, name, timeout):
+        """Holds a server-wide advisory lock, so processes starting together migrate one at a time."""
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (name, timeout))
+        if cursor.fetchone()[0] != 1:
+            raise RuntimeError("Timed out waiting for another process to finish migrating")
+        try:
+            yield
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (name,))
+            cursor.fetchone()
+
+    def index_exists(self, cursor, table, name):
+        cursor.execute(
+            "SELECT 1 FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s LIMIT 1",
+            (table, name)
+        )
+        return cursor.fetchone() is not None
+
+    def create_index(self, cursor, table, name, columns, kind=''):
+        """
+        CREATE [kind] INDEX unless an index called `name` already exists (MySQL has no
+        IF NOT EXISTS for it). `kind` is e.g. 'UNIQUE' or 'FULLTEXT'.
+        """
+        if not self.index_exists(cursor, table, name):
+            cursor.execute(f"CREATE {kind + ' ' if kind else ''}INDEX {name} ON {table} ({', '.join(columns)})")
+
+    def column_exists(self, cursor, table, name):
+        cursor.execute(
+            "SELECT 1 FROM information_schema.columns "
+            "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s LIMIT 1",
+            (table, name)
+        )
+        return cursor.fetchone() is not None
+
+    def add_column(self, cursor, table, name, definition):
+        """ALTER TABLE ... ADD COLUMN unless `table` already has a column called `name`."""
+        if not self.column_exists(cursor, table, name):
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+
+# --- SQLite ---
+_WRITE_VERBS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'CREATE', 'DROP', 'ALTER')
+_FOR_UPDATE = re.compile(r'\s+FOR\s+UPDATE\b', re.IGNORECASE)
+_AUTO_INCREMENT = re.compile(r'\bINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b', re.IGNORECASE)
+_ON_DUPLICATE = re.compile(r'\bON\s+DUPLICATE\s+KEY\s+UPDATE\b', re.IGNORECASE)
+_VALUES_REF = re.compile(r'\bVALUES\((\w+)\)', re.IGNORECASE)
+
+sqlite3.register_adapter(Decimal, str)
+# Every DECIMAL column in the schema is DECIMAL(10, 2); hand prices back as MySQL does.
+sqlite3.register_converter('DECIMAL', lambda text: Decimal(text.decode()).quantize(Decimal('0.01')))
+sqlite3.register_converter('TIMESTAMP', lambda text: datetime.fromisoformat(text.decode()))
+
+
+@lru_cache(maxsize=512)
+def translate(query):
+    """
+    Rewrites one MySQL statement for SQLite. Returns (sql, writes): `writes` is True when
+    the statement modifies data or locks rows (FOR UPDATE), so it must run in a write
+    transaction.
+    """
+    writes = query.lstrip().split(None, 1)[0].upper() in _WRITE_VERBS
+    if _FOR_UPDATE.search(query):
+        # SQLite locks the whole database for writing instead of single rows.
+        query, writes = _FOR_UPDATE.sub('', query), True
+    query = _AUTO_INCREMENT.sub('INTEGER PRIMARY KEY AUTOINCREMENT', query)
+    parts = _ON_DUPLICATE.split(query, 1)
+    if len(parts) == 2:
+        head, assignments = parts
+        query = head + 'ON CONFLICT DO UPDATE SET' + _VALUES_REF.sub(r'excluded.\1', assignments)
+    return query.replace('%s', '?'), writes
+
+
+_ERRNOS = (  # (sqlite message prefix, mysql error class, errno)
+    ('UNIQUE constraint failed', errors.IntegrityError, 1062),
+    ('NOT NULL constraint failed', errors.IntegrityError, 1048),
+    ('no such table', errors.ProgrammingError, 1146),
+    ('database is locked', errors.OperationalError, 1205),
+)
+
+
+@contextmanager
+def _mysql_errors():
+    try:
+        yield
+    except sqlite3.Error as e:
+        message = str(e)
+        for prefix, error_class, errno in _ERRNOS:
+            if message.startswith(prefix):
+                raise error_class(msg=message, errno=errno) from e
+        raise errors.DatabaseError(msg=message) from e
+
+
+def _dict_row(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+class _SQLiteCursor:
+    """The subset of a mysql.connector cursor that the package uses."""
+
+    def __init__(self, conn, dictionary):
+        self._conn = conn
+        self._cursor = conn.cursor()
+        if dictionary:
+            self._cursor.row_factory = _dict_row
+
+    def _begin(self, writes):
+        # Reads run in autocommit; the first write (or FOR UPDATE) of a transaction takes
+        # the write lock up front, so it waits on busy_timeout instead of failing mid-way.
+        if writes and not self._conn.in_transaction:
+            self._conn.execute("BEGIN IMMEDIATE")
+
+    def execute(self, query, params=()):
+        sql, writes = translate(query)
+        with _mysql_errors():
+            self._begin(writes)
+            self._cursor.execute(sql, tuple(params))
+
+    def executemany(self, query, seq_params):
+        sql, writes = translate(query)
+        with _mysql_errors():
+            self._begin(writes)
+            self._cursor.executemany(sql, [tuple(p) for p in seq_params])
+
+    def fetchone(self):
+        with _mysql_errors():
+            return self._cursor.fetchone()
+
+    def fetchmany(self, size):
+        with _mysql_errors():
+            return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        with _mysql_errors():
+            return self._cursor.fetchall()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def close(self):
+        self._cursor.close()
+
+
+class _SQLiteConnection:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, dictionary=False, buffered=None):
+        return _SQLiteCursor(self._conn, dictionary)
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    def commit(self):
+        with _mysql_errors():
+            self._conn.commit()
+
+    def rollback(self):
+        with _mysql_errors():
+            self._conn.rollback()
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        self._conn.close()
+
+
+class SQLiteBackend:
+    name = 'sqlite'
+    supports_fulltext = False  # search falls back to LIKE; see shared/search.py
+    # A migration runs as one transaction, which also serves as its lock.
+    transactional_ddl = True
+
+    def __init__(self, path, busy_timeout=10.0, cached_statements=256):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+
+    def connect(self):
+        """Opens a connection in WAL mode. Statements are prepared once per connection and reused."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with _mysql_errors():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, detect_types=sqlite3.PARSE_DECLTYPES,
+                                   isolation_level=None, check_same_thread=False,
+                                   cached_statements=self.cached_statements)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # durable at checkpoints; safe against corruption in WAL mode
+        return _SQLiteConnection(conn)
+
+    def create_pool(self):
+        return ThreadLocalPool(self.connect)
+
+    @contextmanager
+    def migration_lock(self, cursor, name, timeout):
+        cursor.execute("BEGIN IMMEDIATE")
+        yield
+
+    def index_exists(self, cursor, table, name):
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND name = %s",
+                       (table, name))
+        return cursor.fetchone() is not None
+
+    def create_index(self, cursor, table, name, columns, kind=''):
+        if kind.upper() == 'FULLTEXT':
+            return
+        cursor.execute(f"CREATE {kind + ' ' if kind else ''}INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+
+    def column_exists(self, cursor, table, name):
+        cursor.execute("SELECT 1 FROM pragma_table_info(%s) WHERE name = %s", (table, name))
+        return cursor.fetchone() is not None
+
+    def add_column(self, cursor, table, name, definition):
+        if not self.column_exists(cursor, table, name):
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
@@ -0,0 +1,254 @@
+# shared/build_static.py
+"""
+Build step for the page CSS/JS.
+
+    python -m shared.build_static --download   # fetch/refresh the vendored copies first
+    python -m shared.build_static              # rebuild assets/dist/ from assets/vendor/
+
+1. Vendoring: Tailwind, Font Awesome (with its webfonts) and localforage are kept under
+   assets/vendor/ so pages no longer depend on public CDNs.
+2. Purging: Tailwind and Font Awesome rules whose class selectors never appear in the
+   dominate templates (or their inline scripts) are dropped.
+3. Fingerprinting: outputs are written to assets/dist/ as <name>.<hash>.<ext> with a
+   manifest.json, plus .gz and (if the `brotli` package is installed) .br copies.
+"""
+import argparse
+import glob
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import urllib.parse
+import urllib.request
+
+from shared.static_assets import ASSETS_DIR, DIST_DIR, MANIFEST_PATH, VENDOR_DIR, VENDORED_PATHS
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# logical name -> (download URL, path under assets/vendor/, purge unused rules?)
+VENDOR_ASSETS = {
+    'tailwind.css': ('https://cdn.jsdelivr.net/npm/tailwindcss@2.2.19/dist/tailwind.min.css', VENDORED_PATHS['tailwind.css'], True),
+    'fontawesome.css': ('https://cdn.jsdelivr.net/npm/@fortawesome/fontawesome-free@6.4.0/css/all.min.css',
+                        VENDORED_PATHS['fontawesome.css'], True),
+    'localforage.js': ('https://unpkg.com/localforage@1.10.0/dist/localforage.min.js', VENDORED_PATHS['localforage.js'], False),
+}
+# First-party assets fingerprinted as-is: logical name -> path under assets/.
+LOCAL_ASSETS = {
+    'style.css': 'css/style.css',
+}
+# Files scanned for class names when purging.
+TEMPLATE_GLOBS = ('shop_app/*.py', 'admin_app/*.py', 'shared/*.py')
+
+_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+_CLASS = re.compile(r'\.((?:\\[0-9a-fA-F]{1,6}\s?|\\.|[\w-])+)')
+_TOKEN = re.compile(r'[\w\-:/.\[\]#%!]+')
+
+
+# --- Vendoring ---
+def download():
+    """Fetches the vendored assets, including the fonts Font Awesome's CSS refers to."""
+    for name, (url, relpath, _) in VENDOR_ASSETS.items():
+        target = os.path.join(VENDOR_DIR, relpath)
+        print(f"Downloading {url}")
+        data = _fetch(url)
+        _write(target, data)
+        if target.endswith('.css'):
+            for ref in _URL.findall(data.decode('utf-8')):
+                ref = ref[1].split('?')[0].split('#')[0]
+                if ref.startswith(('data:', 'http:', 'https:', '/')):
+                    continue
+                ref_url = urllib.parse.urljoin(url, ref)
+                print(f"Downloading {ref_url}")
+                _write(os.path.normpath(os.path.join(os.path.dirname(target), ref)), _fetch(ref_url))
+
+
+def _fetch(url):
+    with urllib.request.urlopen(url, timeout=60) as response:
+        return response.read()
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+# --- Purging ---
+def used_class_tokens(paths):
+    """Every word-like token in `paths`; a superset of the CSS classes the templates can emit."""
+    tokens = set()
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for token in _TOKEN.findall(f.read()):
+                tokens.add(token)
+                tokens.add(token.strip('.:'))
+    return tokens
+
+
+def _unescape(ident):
+    return re.sub(r'\\([0-9a-fA-F]{1,6}\s?|.)',
+                  lambda m: chr(int(m.group(1), 16)) if re.match(r'[0-9a-fA-F]', m.group(1)) else m.group(1),
+                  ident)
+
+
+def _split_top_level(text, sep):
+    parts, depth, start = [], 0, 0
+    for i, ch in enumerate(text):
+        if ch in '([':
+            depth += 1
+        elif ch in ')]':
+            depth -= 1
+        elif ch == sep and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+
+def _blocks(css):
+    """Yields (prelude, body) for each top-level statement; body is None for `@x ...;` statements."""
+    i, n = 0, len(css)
+    while i < n:
+        brace = css.find('{', i)
+        semi = css.find(';', i)
+        if brace == -1:
+            break
+        if semi != -1 and semi < brace and css[i:semi].strip().startswith('@'):
+            yield css[i:semi].strip(), None
+            i = semi + 1
+            continue
+        depth, j, quote = 0, brace, None
+        while j < n:
+            ch = css[j]
+            if quote:
+                if ch == '\\':
+                    j += 1
+                elif ch == quote:
+                    quote = None
+            elif ch in '"\'':
+                quote = ch
+            elif ch == '{':
+                depth += 1
+            elif ch == '}':
+                depth -= 1
+                if depth == 0:
+                    break
+            j += 1
+        yield css[i:brace].strip(), css[brace + 1:j]
+        i = j + 1
+
+
+def purge_css(css, used):
+    """Drops selectors whose classes are not all in `used`, and rules left with no selectors."""
+    kept_comments = ''.join(re.findall(r'/\*!.*?\*/', css, re.S))  # license banners
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    return kept_comments + _purge_blocks(css, used)
+
+
+def _purge_blocks(css, used):
+    out = []
+    for prelude, body in _blocks(css):
+        if body is None:
+            out.append(prelude + ';')
+        elif prelude.startswith(('@media', '@supports')):
+            inner = _purge_blocks(body, used)
+            if inner:
+                out.append(f"{prelude}{{{inner}}}")
+        elif prelude.startswith('@'):
+            out.append(f"{prelude}{{{body}}}")  # @font-face, @keyframes, @page: keep as-is
+        else:
+            selectors = [s.strip() for s in _split_top_level(prelude, ',')]
+            kept = [s for s in selectors if all(_unescape(c) in used for c in _CLASS.findall(s))]
+            if kept:
+                out.append(f"{','.join(kept)}{{{body.strip()}}}")
+    return ''.join(out)
+
+
+# --- Fingerprinting ---
+def _fingerprint(name, data):
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}{ext}"
+
+
+def _emit(name, data):
+    """Writes `data` to assets/dist/ under a fingerprinted name (+ compressed copies); returns it."""
+    built = _fingerprint(name, data)
+    path = os.path.join(DIST_DIR, built)
+    _write(path, data)
+    if os.path.splitext(name)[1] in ('.css', '.js', '.svg', '.ttf', '.json'):
+        gz = gzip.compress(data, 9, mtime=0)
+        if len(gz) < len(data):
+            _write(path + '.gz', gz)
+        if brotli is not None:
+            br = brotli.compress(data, quality=11)
+            if len(br) < len(data):
+                _write(path + '.br', br)
+    return built
+
+
+def _rewrite_urls(css, css_path):
+    """Fingerprints local files referenced through url() and points the CSS at the copies."""
+    def replace(match):
+        ref = match.group(2)
+        clean = ref.split('?')[0].split('#')[0]
+        if clean.startswith(('data:', 'http:', 'https:')):
+            return match.group(0)
+        if clean.startswith('/static/'):
+            target = os.path.join(ASSETS_DIR, clean[len('/static/'):])
+        else:
+            target = os.path.normpath(os.path.join(os.path.dirname(css_path), clean))
+        if not os.path.isfile(target):
+            return match.group(0)
+        with open(target, 'rb') as f:
+            built = _emit(os.path.basename(target), f.read())
+        return f"url(/static/dist/{built})"
+    return _URL.sub(replace, css)
+
+
+def build(purge=True):
+    """Rebuilds assets/dist/ and its manifest. Returns the manifest."""
+    sources = {name: (os.path.join(VENDOR_DIR, relpath), should_purge)
+               for name, (_, relpath, should_purge) in VENDOR_ASSETS.items()}
+    sources.update({name: (os.path.join(ASSETS_DIR, relpath), False) for name, relpath in LOCAL_ASSETS.items()})
+    missing = [path for path, _ in sources.values() if not os.path.isfile(path)]
+    if missing:
+        raise SystemExit(f"Missing vendored files ({', '.join(missing)}); run with --download first.")
+
+    used = used_class_tokens(sorted(p for pattern in TEMPLATE_GLOBS for p in glob.glob(os.path.join(ROOT_DIR, pattern))))
+    shutil.rmtree(DIST_DIR, ignore_errors=True)
+    manifest = {}
+    for name, (path, should_purge) in sources.items():
+        with open(path, 'rb') as f:
+            data = f.read()
+        before = len(data)
+        if name.endswith('.css'):
+            css = data.decode('utf-8')
+            if purge and should_purge:
+                css = purge_css(css, used)
+            data = _rewrite_urls(css, path).encode('utf-8')
+        manifest[name] = _emit(name, data)
+        print(f"{name:>16} -> {manifest[name]} ({before:,} -> {len(data):,} bytes)")
+
+    _write(MANIFEST_PATH, json.dumps(manifest, indent=2).encode('utf-8'))
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--download', action='store_true', help='fetch the vendored assets before building')
+    parser.add_argument('--no-purge', action='store_true', help='keep every Tailwind/Font Awesome rule')
+    args = parser.parse_args()
+    if args.download:
+        download()
+    build(purge=not args.no_purge)
+
+
+if __name__ == '__main__':
+    main()
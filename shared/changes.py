@@ -0,0 +1,328 @@
+# shared/changes.py
+"""
+Cross-process catalog change feed and its Server-Sent Events stream.
+
+Every product write made through shared.database appends to the catalog_changes table
+in the same transaction (see database._log_changes). ChangeFeed polls that table, which
+is one primary-key range query per interval, and for each new batch of changes:
+
+  * runs database.products_changed() for changes made by *other* processes, so this
+    process's catalog cache and search index stop serving stale rows at once instead
+    of after their TTLs;
+  * loads the changed products once and publishes them as an event to every open
+    stream, so shoppers' pages patch prices, names and stock in place, and to
+    listeners registered with on_event() (e.g. shared/inventory_summary.py).
+
+Change ids come from AUTO_INCREMENT, so on MySQL concurrent writers can commit them out
+of order: id 41 may become visible after id 42 was read. Ids skipped over like that are
+remembered as gaps and looked up again on every poll for up to `gap_timeout` seconds
+(after which the writer is taken to have rolled back). `last_id` only advances up to
+the oldest open gap, so it is always safe to resume from, and pruning stays behind it.
+
+install_catalog_stream(app) serves the events at GET /api/catalog/stream. Each stream
+holds a request thread, so at most `max_streams` are open per process: by default half
+of the worker's request threads (see serving.serve), leaving the rest for page loads.
+Streams end every `stream_lifetime` seconds, so deploys can drain and slots rotate
+between shoppers; browsers reconnect on their own and resume from the Last-Event-ID
+they were given. A refused stream (503) is final for EventSource, so the page script
+retries those itself with backoff, passing the last id as ?last_event_id=.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from flask import Response, request
+
+from shared import database
+from shared.database import db_connection, on_products_changed
+
+CHANGES_CONFIG = {
+    'poll_interval': float(os.environ.get('PUP_CHANGES_POLL_INTERVAL', 1.0)),  # seconds between polls
+    'keep_rows': int(os.environ.get('PUP_CHANGES_KEEP_ROWS', 10000)),         # older log rows are pruned
+    'max_streams': int(os.environ.get('PUP_SSE_MAX_STREAMS', 0)),             # per process; 0: half the request threads
+    'stream_lifetime': float(os.environ.get('PUP_SSE_STREAM_LIFETIME', 25)),  # below the 30 s drain timeout
+    'gap_timeout': float(os.environ.get('PUP_CHANGES_GAP_TIMEOUT', 60)),      # seconds to wait for a skipped id
+}
+# Fields sent for each changed product: what a product card and the cart show.
+EVENT_FIELDS = ('id', 'name', 'price', 'stock', 'image_url')
+HEARTBEAT_SECONDS = 10
+DEFAULT_REQUEST_THREADS = 8  # when the app isn't run through serving.serve (e.g. the Flask dev server)
+RECENT_EVENTS = 256
+MAX_ROWS_PER_POLL = 1000
+MAX_OPEN_GAPS = 1000
+PRUNE_EVERY_POLLS = 300
+RETRY_MS = 3000
+
+
+class ChangeFeed:
+    """Follows catalog_changes from a background thread; see the module docstring."""
+
+    def __init__(self, poll_interval=1.0, keep_rows=10000, gap_timeout=60.0):
+        self.poll_interval = poll_interval
+        self.keep_rows = keep_rows
+        self.gap_timeout = gap_timeout
+        self.last_id = None  # every change up to this id has been published
+        self.seq = 0         # events published by this feed
+        self._max_seen = None
+        self._gaps = {}      # change id skipped over -> when it was first missed
+        self._events = deque(maxlen=RECENT_EVENTS)  # (seq, last_id after it, newest change id, event), oldest first
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        self._poll_lock = threading.Lock()
+        self._listeners = []
+        self._thread = None
+        self.stopped = False
+
+    def start(self):
+        """Starts polling from the newest change. Returns self."""
+        self.last_id = self._max_seen = self._max_id()
+        self._thread = threading.Thread(target=self._run, name='catalog-changes', daemon=True)
+        self._thread.start()
+        return self
+
+    def wake(self):
+        """Polls now rather than at the next interval (e.g. after a write in this process)."""
+        self._wake.set()
+
+    def stop(self, timeout=5.0):
+        """Ends the polling thread, waiting up to `timeout` seconds for its current poll."""
+        self.stopped = True
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def poll(self):
+        """Polls on the caller's thread, for callers that must see their own write reflected at once."""
+        with self._poll_lock:
+            self._poll()
+
+    def on_event(self, callback):
+        """Registers callback(event) to run on the polling thread for every new event."""
+        self._listeners.append(callback)
+
+    def events_after(self, seq, timeout):
+        """
+        Waits up to `timeout` seconds for events published after event `seq` and returns
+        them as (seq, last_id, event) triples; [] on timeout. `last_id` is the feed's
+        position once that event was published, the point a client can resume from.
+        Only the last RECENT_EVENTS are kept: a client that was away longer misses some,
+        but every page load reads fresh rows.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                newer = [(event_seq, last_id, event) for event_seq, last_id, _, event in self._events if event_seq > seq]
+                remaining = deadline - time.monotonic()
+                if newer or remaining <= 0:
+                    return newer
+                self._cond.wait(remaining)
+
+    def seq_for_change(self, change_id):
+        """The event seq to resume from for a client that has seen every change up to `change_id`."""
+        with self._cond:
+            for event_seq, _, newest, _ in self._events:
+                if newest > change_id:
+                    return event_seq - 1
+            return self.seq
+
+    # --- Internals ---
+    def _max_id(self):
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT MAX(id) FROM catalog_changes")
+                return cursor.fetchone()[0] or 0
+            finally:
+                cursor.close()
+
+    def _run(self):
+        polls = 0
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            if self.stopped:
+                return
+            try:
+                self.poll()
+                polls += 1
+                if polls % PRUNE_EVERY_POLLS == 0:
+                    self._prune()
+            except Exception as e:
+                print(f"Catalog change feed poll failed: {e}")
+
+    def _poll(self):
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT id, product_id, source FROM catalog_changes WHERE id > %s ORDER BY id LIMIT %s",
+                               (self._max_seen, MAX_ROWS_PER_POLL))
+                rows = cursor.fetchall()
+                filled = []
+                if self._gaps:
+                    gaps = sorted(self._gaps)
+                    cursor.execute(f"SELECT id, product_id, source FROM catalog_changes "
+                                   f"WHERE id IN ({', '.join(['%s'] * len(gaps))})", gaps)
+                    filled = cursor.fetchall()
+            finally:
+                cursor.close()
+        last_id = self._track_gaps(rows, filled)
+        rows += filled
+        if not rows:
+            with self._cond:
+                self.last_id = last_id  # gaps may have expired
+            return
+        ids = {product_id for _, product_id, _ in rows}
+        unknown = None in ids  # e.g. an import added rows; nobody has a card for those yet
+        ids.discard(None)
+        if any(source != database.CHANGE_SOURCE for _, _, source in rows):
+            database.products_changed(None if unknown else sorted(ids))
+        products = self._load(sorted(ids)) if ids else []
+        event = {'products': products, 'deleted': sorted(ids - {product['id'] for product in products}),
+                 'unknown_rows': unknown}
+        with self._cond:
+            self.last_id = last_id
+            self.seq += 1
+            self._events.append((self.seq, last_id, max(change_id for change_id, _, _ in rows), event))
+            self._cond.notify_all()
+        for callback in list(self._listeners):
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Catalog change listener failed: {e}")
+
+    def _track_gaps(self, rows, filled):
+        """Records ids skipped over by `rows`, drops those `filled` or expired; returns the new last_id."""
+        now = time.monotonic()
+        for change_id, _, _ in filled:
+            del self._gaps[change_id]
+        if rows:
+            read = {change_id for change_id, _, _ in rows}
+            # Only the newest ids are tracked: a huge jump is an AUTO_INCREMENT skip, not open writers.
+            start = max(self._max_seen + 1, rows[-1][0] - MAX_ROWS_PER_POLL - MAX_OPEN_GAPS)
+            for change_id in range(start, rows[-1][0]):
+                if change_id not in read:
+                    self._gaps[change_id] = now
+            for change_id in sorted(self._gaps)[:-MAX_OPEN_GAPS]:
+                del self._gaps[change_id]
+            self._max_seen = rows[-1][0]
+        for change_id, missed_at in list(self._gaps.items()):
+            if now - missed_at > self.gap_timeout:
+                del self._gaps[change_id]  # rolled back, or an id AUTO_INCREMENT never used
+        return min(self._gaps) - 1 if self._gaps else self._max_seen
+
+    def _load(self, ids):
+        with db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            try:
+                cursor.execute(f"SELECT {', '.join(EVENT_FIELDS)} FROM products WHERE id IN ({', '.join(['%s'] * len(ids))})",
+                               ids)
+                return cursor.fetchall()
+            finally:
+                cursor.close()
+
+    def _prune(self):
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("DELETE FROM catalog_changes WHERE id <= %s", (self.last_id - self.keep_rows,))
+                conn.commit()
+            finally:
+                cursor.close()
+
+
+# --- Process-wide feed ---
+_feed = None
+_feed_lock = threading.Lock()
+
+
+def get_change_feed():
+    """Returns this process's feed, starting it on first use."""
+    global _feed
+    if _feed is None:
+        with _feed_lock:
+            if _feed is None:
+                feed = ChangeFeed(CHANGES_CONFIG['poll_interval'], CHANGES_CONFIG['keep_rows'],
+                                  CHANGES_CONFIG['gap_timeout'])
+                on_products_changed(lambda ids: feed.wake())
+                _feed = feed.start()
+    return _feed
+
+
+def stop_change_feed():
+    """Stops this process's feed, e.g. before switching databases; the next get_change_feed() starts a new one."""
+    global _feed
+    with _feed_lock:
+        if _feed is not None:
+            _feed.stop()
+            _feed = None
+
+
+def _reset_feed_after_fork():
+    # The polling thread doesn't survive a fork; a worker starts its own on first use.
+    global _feed
+    _feed = None
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_feed_after_fork)
+
+
+# --- Server-Sent Events ---
+def _sse(event_id, name, data):
+    return f"id: {event_id}\nevent: {name}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def max_streams(app):
+    """How many streams `app` may hold open per process; see the module docstring."""
+    threads = app.config.get('PUP_REQUEST_THREADS') or DEFAULT_REQUEST_THREADS
+    return CHANGES_CONFIG['max_streams'] or max(1, threads // 2)
+
+
+def install_catalog_stream(app):
+    """Registers GET /api/catalog/stream on `app`: catalog change events as text/event-stream."""
+    slots = None
+    slots_lock = threading.Lock()
+
+    def get_slots():
+        # Sized on first use: serving.serve records the thread count after the app is built.
+        nonlocal slots
+        with slots_lock:
+            if slots is None:
+                slots = threading.BoundedSemaphore(max_streams(app))
+            return slots
+
+    @app.route('/api/catalog/stream')
+    def catalog_stream():
+        slots = get_slots()
+        if not slots.acquire(blocking=False):
+            return Response("Too many open streams\n", status=503, mimetype='text/plain',
+                            headers={'Retry-After': str(RETRY_MS // 1000)})
+        try:
+            feed = get_change_feed()
+            last_id = request.headers.get('Last-Event-ID', type=int)
+            if last_id is None:
+                last_id = request.args.get('last_event_id', type=int)  # a stream the page script reopened
+        except Exception:
+            slots.release()
+            raise
+        # Event ids are change ids (the same in every process), so a browser can resume
+        # from any worker. Replayed events are harmless: they carry whole rows.
+        seq = feed.seq if last_id is None else feed.seq_for_change(last_id)
+
+        def stream():
+            nonlocal seq
+            yield f"retry: {RETRY_MS}\n\n"
+            deadline = time.monotonic() + CHANGES_CONFIG['stream_lifetime']
+            while time.monotonic() < deadline:
+                events = feed.events_after(seq, min(HEARTBEAT_SECONDS, max(0, deadline - time.monotonic())))
+                for seq, event_id, event in events:
+                    yield _sse(event_id, 'products', event)
+                if not events:
+                    yield ": keep-alive\n\n"  # also how a closed connection is noticed
+
+        response = Response(stream(), mimetype='text/event-stream',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+        # Runs when the server closes the response, even if the stream never started.
+        response.call_on_close(slots.release)
+        return response
@@ -0,0 +1,121 @@
+# shared/counters.py
+"""
+Write-behind counters.
+
+WriteBehindCounters adds up increments in memory, per (column, row id), and hands them
+to a `write_batch` function as one batch: every `flush_interval` seconds, as soon as
+`max_pending` distinct counters are waiting, and once more when the process exits. Hot
+rows are then written once per batch instead of once per event, outside the
+transactions that produced the events.
+
+Counts that were not flushed yet are lost if the process is killed outright, so use
+this only for figures that may lag or undercount slightly (popularity, not money or
+stock). A failed write is merged back and retried with the next batch.
+"""
+import atexit
+import os
+import threading
+import time
+
+from shared.metrics import Histogram, stats_collector
+
+FLUSH_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class WriteBehindCounters:
+    def __init__(self, name, write_batch, flush_interval=5.0, max_pending=500):
+        """
+        `write_batch({column: {row_id: delta}})` must apply the whole batch or raise.
+        `name` prefixes the metrics, e.g. 'pup_product_counters'.
+        """
+        self.name = name
+        self.write_batch = write_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.flush_seconds = Histogram(f"{name}_flush_seconds", 'Time to write one batch of counter increments.',
+                                       buckets=FLUSH_BUCKETS)
+        self._pending = {}  # column -> {row id: delta}
+        self._pending_count = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # one batch in flight at a time
+        self._wake = threading.Event()
+        self._thread = None
+        self.flushes = 0
+        self.flushed = 0  # (column, row) updates written
+        self.failures = 0
+        self.last_flush_seconds = 0.0
+        atexit.register(self.flush)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def add(self, column, row_id, amount=1):
+        """Adds `amount` to `column` of row `row_id`, to be written with the next batch."""
+        with self._lock:
+            counts = self._pending.setdefault(column, {})
+            if row_id not in counts:
+                self._pending_count += 1
+            counts[row_id] = counts.get(row_id, 0) + amount
+            full = self._pending_count >= self.max_pending
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"{self.name}-flush", daemon=True)
+                self._thread.start()
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """Writes everything pending now. Returns the number of counters written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending, self._pending_count = self._pending, {}, 0
+            if not batch:
+                return 0
+            started = time.perf_counter()
+            try:
+                self.write_batch(batch)
+            except Exception as e:
+                print(f"Counter flush failed, retrying with the next batch: {e}")
+                self.failures += 1
+                self._merge(batch)
+                return 0
+            self.last_flush_seconds = time.perf_counter() - started
+            self.flush_seconds.observe(value=self.last_flush_seconds)
+            written = sum(len(counts) for counts in batch.values())
+            self.flushes += 1
+            self.flushed += written
+            return written
+
+    def stats(self):
+        with self._lock:
+            pending = self._pending_count
+            pending_total = sum(sum(counts.values()) for counts in self._pending.values())
+        return {'pending': pending, 'pending_total': pending_total, 'flushes': self.flushes,
+                'flushed': self.flushed, 'failures': self.failures, 'last_flush_seconds': self.last_flush_seconds}
+
+    def collect(self):
+        """A /metrics collector (see shared.metrics.install_metrics): flush latency plus stats()."""
+        return self.flush_seconds.render() + stats_collector(
+            self.name, self.stats, counters=('flushes', 'flushed', 'failures'))()
+
+    # --- Internals ---
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def _merge(self, batch):
+        with self._lock:
+            for column, counts in batch.items():
+                pending = self._pending.setdefault(column, {})
+                for row_id, delta in counts.items():
+                    if row_id not in pending:
+                        self._pending_count += 1
+                    pending[row_id] = pending.get(row_id, 0) + delta
+
+    def _reset_after_fork(self):
+        # The child starts empty: the parent still owns (and will write) what it had pending.
+        self._pending, self._pending_count = {}, 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
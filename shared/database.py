@@ -1,27 +1,155 @@
 # shared/database.py
-import mysql.connector
 from mysql.connector import Error
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal
+import base64
 import hashlib
+import json
+import os
+import socket
+import threading
+import time
+
+from shared.backends import MySQLBackend, SQLiteBackend
+from shared.cache import TTLCache
+from shared.counters import WriteBehindCounters
+from shared.metrics import add_timing
+from shared.migrations import LATEST_VERSION, migrate
+from shared.pool import PoolTimeout
+
+# Storage backend: 'mysql' (a MySQL server, the default) or 'sqlite' (an embedded
+# database file, for the single-kiosk build). See shared/backends.py.
+DB_BACKEND = os.environ.get('PUP_DB_BACKEND', 'mysql')
 
 # --- IMPORTANT ---
-# UPDATE THIS WITH YOUR MYSQL DATABASE CREDENTIALS
+# UPDATE THIS WITH YOUR MYSQL DATABASE CREDENTIALS (or set the PUP_DB_* variables)
 # You must create the 'pup_shop' database manually first.
 # Example: CREATE DATABASE pup_shop;
 DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'root',
-    'password': 'Test1234!', # <-- CHANGE THIS
-    'database': 'pup_shop'
+    'host': os.environ.get('PUP_DB_HOST', 'localhost'),
+    'user': os.environ.get('PUP_DB_USER', 'root'),
+    'password': os.environ.get('PUP_DB_PASSWORD', 'Test1234!'), # <-- CHANGE THIS
+    'database': os.environ.get('PUP_DB_NAME', 'pup_shop')
+}
+
+# SQLite settings. The shop and admin processes share the file; init_db creates it.
+SQLITE_CONFIG = {
+    'path': os.environ.get('PUP_SQLITE_PATH',
+                           os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'pup_shop.db'))),
+    'busy_timeout': float(os.environ.get('PUP_SQLITE_BUSY_TIMEOUT', 10)),  # seconds to wait for the write lock
+}
+
+# MySQL connection pool settings. Each Flask process (shop and admin) keeps its own pool,
+# so the MySQL max_connections budget is roughly the sum of both sizes. SQLite keeps
+# one connection per thread instead.
+POOL_CONFIG = {
+    'size': int(os.environ.get('PUP_DB_POOL_SIZE', 5)),
+    'timeout': float(os.environ.get('PUP_DB_POOL_TIMEOUT', 10)),    # seconds to wait for a free connection
+    'recycle': float(os.environ.get('PUP_DB_POOL_RECYCLE', 1800)),  # reopen connections older than this
+}
+
+# Catalog cache settings. Writes made through this module invalidate the cache at once;
+# the TTL only bounds how long a change made by the *other* app process can go unseen.
+CATALOG_CACHE_CONFIG = {
+    'ttl': float(os.environ.get('PUP_CATALOG_TTL', 30)),
+    'maxsize': int(os.environ.get('PUP_CATALOG_CACHE_SIZE', 64)),
+    # Cursor pages, filtered pages and search fallbacks: many keys, each rarely reused.
+    # They get their own cache so scrolling and searching never evict the first pages.
+    'browse_maxsize': int(os.environ.get('PUP_CATALOG_BROWSE_CACHE_SIZE', 256)),
+}
+
+# User cache settings. Profile changes made through this module invalidate the entry at
+# once; the TTL bounds how long another process can keep serving the old record.
+USER_CACHE_CONFIG = {
+    'ttl': float(os.environ.get('PUP_USER_CACHE_TTL', 60)),
+    'maxsize': int(os.environ.get('PUP_USER_CACHE_SIZE', 1024)),
 }
 
+# Popularity counters (sold_count, view_count) are added up in memory and written in
+# batches; see shared/counters.py.
+COUNTER_CONFIG = {
+    'flush_interval': float(os.environ.get('PUP_COUNTER_FLUSH_INTERVAL', 5)),  # seconds between batches
+    'max_pending': int(os.environ.get('PUP_COUNTER_MAX_PENDING', 500)),        # or sooner, once this many are waiting
+}
+
+_backend = None
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_backend():
+    """Returns the storage backend chosen by DB_BACKEND, creating it on first use."""
+    global _backend
+    if _backend is None:
+        with _pool_lock:
+            if _backend is None:
+                if DB_BACKEND == 'sqlite':
+                    _backend = SQLiteBackend(**SQLITE_CONFIG)
+                elif DB_BACKEND == 'mysql':
+                    _backend = MySQLBackend(DB_CONFIG, POOL_CONFIG)
+                else:
+                    raise ValueError(f"Unknown PUP_DB_BACKEND: {DB_BACKEND!r} (expected 'mysql' or 'sqlite')")
+    return _backend
+
+def set_backend(backend):
+    """Switches this process to `backend` (e.g. a SQLiteBackend on a scratch file), closing the old pool."""
+    global _backend, _pool
+    with _pool_lock:
+        old_pool, _backend, _pool = _pool, backend, None
+    if old_pool is not None:
+        old_pool.close_all()
+    invalidate_catalog()
+
+def get_pool():
+    """Returns the process-wide connection pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        backend = get_backend()
+        with _pool_lock:
+            if _pool is None:
+                _pool = backend.create_pool()
+    return _pool
+
+def _reset_pool_after_fork():
+    # A forked serving worker must never share sockets with its parent; it opens its own.
+    global _pool
+    _pool = None
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_pool_after_fork)
+
+def get_pool_stats():
+    """Returns in-use, waiting, created and recycled counts for the connection pool."""
+    return get_pool().stats()
+
+@contextmanager
+def db_connection():
+    """
+    Borrows a pooled connection for the duration of a `with` block. The wait for the
+    connection and the time it is held count towards the request's DB metrics.
+    """
+    requested = time.perf_counter()
+    with get_pool().connection() as conn:
+        acquired = time.perf_counter()
+        add_timing('db_wait', acquired - requested)
+        try:
+            yield conn
+        finally:
+            add_timing('db', time.perf_counter() - acquired)
+
+def check_db():
+    """Raises if no healthy connection can be borrowed. Used by the /healthz readiness check."""
+    with db_connection():
+        pass
+
 def get_db_connection():
-    """Establishes a connection to the database."""
+    """Establishes a standalone (unpooled) connection to the database."""
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
+        conn = get_backend().connect()
         if conn.is_connected():
             return conn
     except Error as e:
-        print(f"Error connecting to MySQL database: {e}")
+        print(f"Error connecting to the database: {e}")
         return None
 
 def hash_password(password):
@@ -29,120 +157,690 @@ def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
 def init_db():
-    """Initializes the database, creating tables and inserting sample data if they don't exist."""
-    conn = get_db_connection()
-    if not conn:
+    """
+    Brings the database schema up to date (see shared/migrations.py). When the schema is
+    already current this is a single SELECT, so it is cheap to call on every start.
+    """
+    try:
+        with db_connection() as conn:
+            applied = migrate(conn, get_backend())
+        if applied:
+            invalidate_catalog()
+            print(f"Database initialized successfully (schema version {LATEST_VERSION}).")
+        return True
+    except PoolTimeout:
         print("Could not connect to DB for initialization.")
-        return
-    cursor = conn.cursor()
+    except (Error, RuntimeError) as e:
+        print(f"Error during DB initialization: {e}")
+    return False
 
-    try:
-        # Create Tables
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            name VARCHAR(255) NOT NULL,
-            email VARCHAR(255) NOT NULL UNIQUE,
-            password_hash VARCHAR(255) NOT NULL,
-            address1 TEXT,
-            address2 TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """)
-
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS products (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            name VARCHAR(255) NOT NULL,
-            description TEXT,
-            price DECIMAL(10, 2) NOT NULL,
-            stock INT NOT NULL,
-            image_url VARCHAR(255),
-            sold_count INT DEFAULT 0
-        )
-        """)
-        
-        # Check if products table is empty before inserting
-        cursor.execute("SELECT COUNT(*) FROM products")
-        if cursor.fetchone()[0] == 0:
-            print("Populating sample products...")
-            sample_products = [
-                ('PUP Minimalist Baybayin Lanyard', 'Coquette Style Baybayin Lanyard', 140.00, 100, '/static/images/product_lanyard.png', 50),
-                ('PUP Jeepney Signage', 'Collectible Iskolar Script Signage', 20.00, 200, '/static/images/product_jeepney.png', 112),
-                ('PUP Iskolar TOTE BAG (White)', 'White Tote Bag with Iskolar Script', 160.00, 75, '/static/images/product_tote1.png', 45),
-                ('PUP Iskolar TOTE BAG (Black)', 'Black Tote Bag with Iskolar Script', 160.00, 75, '/static/images/product_tote2.png', 30),
-                ('PUP STUDY WITH STYLE Shirt', 'PUP Obelisk silhouette design shirt', 450.00, 50, '/static/images/product_shirt.png', 88),
-            ]
-            cursor.executemany(
-                "INSERT INTO products (name, description, price, stock, image_url, sold_count) VALUES (%s, %s, %s, %s, %s, %s)",
-                sample_products
-            )
+# --- Catalog Cache ---
+_catalog_cache = TTLCache(maxsize=CATALOG_CACHE_CONFIG['maxsize'], ttl=CATALOG_CACHE_CONFIG['ttl'])
+_browse_cache = TTLCache(maxsize=CATALOG_CACHE_CONFIG['browse_maxsize'], ttl=CATALOG_CACHE_CONFIG['ttl'])
+_catalog_version = 0
+_catalog_lock = threading.Lock()
+_MISSING = object()
 
-        conn.commit()
-        print("Database initialized successfully.")
-    except Error as e:
-        print(f"Error during DB initialization: {e}")
-    finally:
-        cursor.close()
-        conn.close()
+def get_catalog_version():
+    """Returns a counter that increases every time the catalog is modified."""
+    return _catalog_version
+
+def invalidate_catalog():
+    """Drops all cached catalog reads and bumps the catalog version."""
+    global _catalog_version
+    with _catalog_lock:
+        _catalog_version += 1
+        _catalog_cache.invalidate()
+        _browse_cache.invalidate()
+
+def cached_catalog_query(key, loader, browse=False):
+    """
+    Returns loader() through the catalog cache. Cached values are shared between
+    callers and must be treated as read-only. Pass `browse=True` for long-tail reads
+    (cursor pages, filters, searches), which are cached apart from the rest.
+    """
+    cache = _browse_cache if browse else _catalog_cache
+    version = _catalog_version
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+    value = loader()
+    with _catalog_lock:
+        # Skip the store if a write landed while we were querying; the result may predate it.
+        if version == _catalog_version:
+            cache.set(key, value)
+    return value
+
+def get_catalog_cache_stats():
+    stats = dict(_catalog_cache.stats(), version=_catalog_version)
+    stats.update({f"browse_{key}": value for key, value in _browse_cache.stats().items()})
+    return stats
+
+# --- Product Change Listeners ---
+_product_listeners = []
+
+def on_products_changed(callback):
+    """
+    Registers callback(ids) to run after products are written through this module, with
+    the affected ids, or None when they aren't known (e.g. a bulk import of new rows).
+    Callbacks run on the writer's thread and should only record the change.
+    """
+    _product_listeners.append(callback)
+
+def products_changed(ids=None):
+    """Invalidates catalog reads and tells listeners which products changed."""
+    invalidate_catalog()
+    for callback in list(_product_listeners):
+        try:
+            callback(ids)
+        except Exception as e:
+            print(f"Product change listener failed: {e}")
+
+# --- Change Log ---
+# Product writes also append to catalog_changes, in the same transaction, so that other
+# processes can follow them (the shop follows the admin app's edits; see shared/changes.py).
+CHANGE_SOURCE = f"{socket.gethostname()}:{os.getpid()}"[-64:]
+
+def _reset_change_source_after_fork():
+    global CHANGE_SOURCE
+    CHANGE_SOURCE = f"{socket.gethostname()}:{os.getpid()}"[-64:]
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_change_source_after_fork)
+
+def _log_changes(cursor, ids):
+    """Records that products `ids` changed, as part of the cursor's transaction. A None id stands for rows not known by id."""
+    rows = [(product_id, CHANGE_SOURCE) for product_id in ids]
+    cursor.executemany("INSERT INTO catalog_changes (product_id, source) VALUES (%s, %s)", rows)
+
+# --- Product Rows ---
+PRODUCT_COLUMNS = ('id', 'name', 'description', 'price', 'stock', 'image_url', 'sold_count')
+# Long text left out of listings unless asked for; Product loads it on first read.
+LAZY_COLUMNS = ('description',)
+LIST_COLUMNS = tuple(c for c in PRODUCT_COLUMNS if c not in LAZY_COLUMNS)
+
+class Product:
+    """
+    One products row, holding only the columns it was selected with.
+
+    Slotted and immutable, so it is a fraction of the size of a dict row and safe to
+    share from the catalog cache. Read fields as attributes or, like the dict rows it
+    replaces, as product['name']. A column that wasn't selected raises KeyError
+    (AttributeError as an attribute), except description, which is loaded on first
+    read with one query; select it up front when every row needs it.
+    """
+    __slots__ = LIST_COLUMNS + ('_description', '_fields')
+
+    def __init__(self, fields, values):
+        """`fields` names the `values` in order (extra trailing values are ignored)."""
+        init = object.__setattr__
+        init(self, '_fields', fields)
+        for name, value in zip(fields, values):
+            init(self, '_description' if name == 'description' else name, value)
+
+    @property
+    def description(self):
+        try:
+            return self._description
+        except AttributeError:
+            description = _load_description(self.id)
+            object.__setattr__(self, '_description', description)
+            return description
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Product rows are read-only; write through update_product()")
+
+    def __delattr__(self, name):
+        raise AttributeError("Product rows are read-only; write through update_product()")
+
+    def __getitem__(self, name):
+        if name in PRODUCT_COLUMNS:
+            try:
+                return getattr(self, name)
+            except AttributeError:
+                pass
+        raise KeyError(name)
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def keys(self):
+        """The selected columns, so dict(product) works."""
+        return self._fields
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self._fields}
+
+    def __repr__(self):
+        return f"Product({', '.join(f'{name}={getattr(self, name)!r}' for name in self._fields)})"
+
+def product_columns(columns=None, default=LIST_COLUMNS):
+    """Validates a column selection and returns it as a tuple starting with id. Raises ValueError."""
+    columns = tuple(columns) if columns else default
+    unknown = [c for c in columns if c not in PRODUCT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown product fields: {', '.join(unknown)}")
+    return columns if 'id' in columns else ('id',) + columns
+
+def _load_description(product_id):
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT description FROM products WHERE id = %s", (product_id,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+        finally:
+            cursor.close()
 
 # --- Product CRUD Functions ---
-def get_all_products():
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM products ORDER BY id DESC")
-    products = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return products
+def get_all_products(columns=None):
+    """
+    Every product, newest first, as a cached list of Product rows with `columns`
+    (default LIST_COLUMNS). Prefer get_products_page, or iter_products to walk the
+    whole table without holding it in memory.
+    """
+    columns = product_columns(columns)
+    return cached_catalog_query(('all_products', columns), lambda: _load_all_products(columns))
+
+def _load_all_products(columns):
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"SELECT {', '.join(columns)} FROM products ORDER BY id DESC")
+            return [Product(columns, row) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+def iter_products(columns=None, batch_size=1000):
+    """
+    Yields every product in id order as a Product with `columns` (default LIST_COLUMNS),
+    reading `batch_size` rows at a time; see iter_product_batches.
+    """
+    columns = product_columns(columns)
+    for rows in iter_product_batches(batch_size, columns):
+        for row in rows:
+            yield Product(columns, row)
+
+# --- Catalog Pagination ---
+# sort name -> (column, direction). Every sort breaks ties on id in the same direction,
+# so (sort value, id) is unique and can be used as a keyset cursor.
+# Each sort is backed by an index on (column, id); see shared/migrations.py.
+PRODUCT_SORTS = {
+    'newest': ('id', 'DESC'),
+    'oldest': ('id', 'ASC'),
+    'best_selling': ('sold_count', 'DESC'),
+    'price_asc': ('price', 'ASC'),
+    'price_desc': ('price', 'DESC'),
+    'name_asc': ('name', 'ASC'),
+    'name_desc': ('name', 'DESC'),
+    'stock_asc': ('stock', 'ASC'),
+    'stock_desc': ('stock', 'DESC'),
+}
+MAX_PAGE_SIZE = 100
+
+def encode_cursor(row, sort_column):
+    """Builds an opaque cursor pointing just past `row`."""
+    value = row[sort_column]
+    if isinstance(value, Decimal):
+        value = str(value)
+    elif isinstance(value, datetime):
+        value = value.isoformat(sep=' ')  # the literal format both MySQL and SQLite compare with
+    return base64.urlsafe_b64encode(json.dumps([value, row['id']]).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor. Raises ValueError for malformed cursors."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, last_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return value, int(last_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+def get_products_page(limit=20, cursor=None, sort='newest', columns=None, name_filter=None, browse=None):
+    """
+    Returns one page of products as {'products': [Product, ...], 'next_cursor': str or None}.
+
+    Uses keyset pagination so every page costs the same index range scan no matter how
+    deep the caller has scrolled. `columns` limits the fields returned (id is always
+    included; default all of PRODUCT_COLUMNS) and `name_filter` keeps only names
+    containing that text. Raises ValueError for unknown sorts, columns or malformed cursors.
+
+    Pages after the first and filtered pages are cached as long-tail reads (see
+    cached_catalog_query); pass `browse=True` to cache a first page that way too, e.g.
+    for arbitrary API requests.
+    """
+    if sort not in PRODUCT_SORTS:
+        raise ValueError(f"Unknown sort: {sort!r}")
+    columns = product_columns(columns, default=PRODUCT_COLUMNS)
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    after = decode_cursor(cursor) if cursor else None
+    name_filter = (name_filter or '').strip() or None
+    key = ('page', sort, columns, limit, after, name_filter)
+    return cached_catalog_query(key, lambda: _load_products_page(limit, after, sort, columns, name_filter),
+                                browse=browse or after is not None or name_filter is not None)
+
+def like_contains(text):
+    """A LIKE pattern (to use with ESCAPE '!') matching names that contain `text` literally."""
+    # '!' rather than backslash as the escape character: it needs no quoting in any SQL dialect.
+    escaped = text.replace('!', '!!').replace('%', '!%').replace('_', '!_')
+    return f"%{escaped}%"
+
+def _load_products_page(limit, after, sort, columns, name_filter=None):
+    sort_column, direction = PRODUCT_SORTS[sort]
+    select_columns = columns if sort_column in columns else columns + (sort_column,)
+    op = '<' if direction == 'DESC' else '>'
+    conditions, params = [], []
+    if name_filter:
+        # A substring match can't seek the name index, but the scan stops after `limit` hits
+        # because rows are still read in index order.
+        conditions.append("name LIKE %s ESCAPE '!'")
+        params.append(like_contains(name_filter))
+    if after is not None:
+        value, last_id = after
+        if sort_column == 'id':
+            conditions.append(f"id {op} %s")
+            params.append(last_id)
+        else:
+            conditions.append(f"({sort_column} {op} %s OR ({sort_column} = %s AND id {op} %s))")
+            params += [value, value, last_id]
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    order = f"{sort_column} {direction}" if sort_column == 'id' else f"{sort_column} {direction}, id {direction}"
+    query = f"SELECT {', '.join(select_columns)} FROM products {where} ORDER BY {order} LIMIT %s"
+    params.append(limit + 1)  # one extra row tells us whether there is a next page
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(Product(select_columns, rows[-1]), sort_column)
+    # An extra sort column comes last in each row, so Product(columns, ...) leaves it out.
+    return {'products': [Product(columns, row) for row in rows], 'next_cursor': next_cursor}
 
 def add_product(name, quantity, price):
-    conn = get_db_connection()
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            "INSERT INTO products (name, stock, price, description, image_url) VALUES (%s, %s, %s, %s, %s)",
-            (name, quantity, price, 'Added from admin panel', '/static/images/pup_logo.png')
-        )
-        conn.commit()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    "INSERT INTO products (name, stock, price, description, image_url) VALUES (%s, %s, %s, %s, %s)",
+                    (name, quantity, price, 'Added from admin panel', '/static/images/pup_logo.png')
+                )
+                product_id = cursor.lastrowid
+                _log_changes(cursor, [product_id])
+                conn.commit()
+            finally:
+                cursor.close()
+        products_changed([product_id])
         return True
     except Error as e:
         print(f"Error adding product: {e}")
         return False
-    finally:
-        cursor.close()
-        conn.close()
 
 def update_product(item_id, name, quantity, price):
-    conn = get_db_connection()
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            "UPDATE products SET name=%s, stock=%s, price=%s WHERE id=%s",
-            (name, quantity, price, item_id)
-        )
-        conn.commit()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    "UPDATE products SET name=%s, stock=%s, price=%s WHERE id=%s",
+                    (name, quantity, price, item_id)
+                )
+                _log_changes(cursor, [item_id])
+                conn.commit()
+            finally:
+                cursor.close()
+        products_changed([item_id])
         return True
     except Error as e:
         print(f"Error updating product: {e}")
         return False
-    finally:
-        cursor.close()
-        conn.close()
 
 def delete_product(item_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
     try:
-        cursor.execute("DELETE FROM products WHERE id=%s", (item_id,))
-        conn.commit()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("DELETE FROM products WHERE id=%s", (item_id,))
+                _log_changes(cursor, [item_id])
+                conn.commit()
+            finally:
+                cursor.close()
+        products_changed([item_id])
         return True
     except Error as e:
         print(f"Error deleting product: {e}")
         return False
+
+# --- Bulk Import/Export ---
+def iter_product_batches(batch_size=1000, columns=PRODUCT_COLUMNS):
+    """
+    Yields the products table in id order as lists of tuples (`columns` order).
+    The cursor is unbuffered, so rows stay on the server until fetched and memory use
+    is bounded by `batch_size` however large the table is.
+    """
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"SELECT {', '.join(columns)} FROM products ORDER BY id")
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            try:
+                cursor.close()
+            except Error:
+                pass  # abandoned mid-stream; the pool discards the connection when rollback fails
+
+_UPSERT_SQL = (
+    f"INSERT INTO products ({', '.join(PRODUCT_COLUMNS)}) VALUES ({', '.join(['%s'] * len(PRODUCT_COLUMNS))}) "
+    f"ON DUPLICATE KEY UPDATE {', '.join(f'{c}=VALUES({c})' for c in PRODUCT_COLUMNS if c != 'id')}"
+)
+_REQUIRED_FOR_INSERT = ('name', 'price', 'stock')
+
+def upsert_products(records):
+    """
+    Inserts or updates a batch of products in one transaction.
+
+    `records` is a list of (line, fields) pairs, `fields` mapping some of PRODUCT_COLUMNS
+    to values. A record whose id exists updates only the fields it gives; any other
+    record inserts a new product and must give name, price and stock. The whole batch
+    goes to the server as one multi-row upsert; if the server rejects it, the rows are
+    replayed one by one so the bad ones can be reported and the rest still saved.
+
+    Returns {'inserted', 'updated', 'errors'} with errors as (line, message) pairs.
+    """
+    given = {fields.get('id') for _, fields in records}
+    ids = None if None in given else sorted(given)
+    with db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            result = _upsert_batch(cursor, records, batched=True)
+            if result is None:
+                conn.rollback()
+                result = _upsert_batch(cursor, records, batched=False)
+            if result['inserted'] or result['updated']:
+                # Rows added without an id are logged as one unknown (None) change.
+                _log_changes(cursor, sorted(given - {None}) + ([None] if None in given else []))
+            conn.commit()
+        finally:
+            cursor.close()
+    if result['inserted'] or result['updated']:
+        products_changed(ids)
+    return result
+
+def _upsert_batch(cursor, records, batched):
+    ids = sorted({fields['id'] for _, fields in records if fields.get('id') is not None})
+    existing = {}
+    if ids:
+        # Lock the rows being merged so a concurrent checkout can't be overwritten with stale values.
+        placeholders = ', '.join(['%s'] * len(ids))
+        cursor.execute(f"SELECT {', '.join(PRODUCT_COLUMNS)} FROM products WHERE id IN ({placeholders}) FOR UPDATE", ids)
+        existing = {row['id']: row for row in cursor.fetchall()}
+
+    result = {'inserted': 0, 'updated': 0, 'errors': []}
+    pending = []  # (line, values, is_update)
+    for line, fields in records:
+        current = existing.get(fields.get('id'))
+        if current is None:
+            missing = [c for c in _REQUIRED_FOR_INSERT if fields.get(c) is None]
+            if missing:
+                result['errors'].append((line, f"New product needs {', '.join(missing)}"))
+                continue
+            row = dict.fromkeys(PRODUCT_COLUMNS)
+            row['sold_count'] = 0
+        else:
+            row = dict(current)
+        row.update(fields)
+        values = tuple(row[c] for c in PRODUCT_COLUMNS)
+        if row['id'] is not None:
+            existing[row['id']] = row  # a later line for the same id builds on this one
+        pending.append((line, values, current is not None))
+
+    if batched:
+        try:
+            if pending:
+                cursor.executemany(_UPSERT_SQL, [values for _, values, _ in pending])
+        except Error:
+            return None
+        for _, _, is_update in pending:
+            result['updated' if is_update else 'inserted'] += 1
+        return result
+
+    for line, values, is_update in pending:
+        try:
+            cursor.execute(_UPSERT_SQL, values)
+            result['updated' if is_update else 'inserted'] += 1
+        except Error as e:
+            result['errors'].append((line, str(e)))
+    return result
+
+# --- Checkout ---
+SHIPPING_FEE = Decimal('36.00')
+PAYMENT_METHODS = ('cod',)
+
+class CheckoutError(Exception):
+    """Raised when an order cannot be placed. `product_id` names the offending item, if any."""
+    def __init__(self, message, product_id=None, out_of_stock=False):
+        super().__init__(message)
+        self.product_id = product_id
+        self.out_of_stock = out_of_stock
+
+def place_order(items, user_id=None, payment_method='cod'):
+    """
+    Places an order for `items`, an iterable of (product_id, quantity) pairs, in a single
+    transaction. Prices come from the database, never from the client.
+
+    Stock is reserved with conditional updates (stock >= qty), so concurrent buyers can
+    never oversell; if any line cannot be filled the whole order is rolled back. Sales
+    reach sold_count with the next product counter batch, outside this transaction.
+    Returns {'order_id', 'item_count', 'subtotal', 'shipping', 'total'}; raises CheckoutError.
+    """
+    if payment_method not in PAYMENT_METHODS:
+        raise CheckoutError(f"Unsupported payment method: {payment_method}")
+    quantities = {}
+    for product_id, quantity in items:
+        try:
+            product_id, quantity = int(product_id), int(quantity)
+        except (TypeError, ValueError):
+            raise CheckoutError("Cart items need an integer id and quantity")
+        if quantity <= 0:
+            raise CheckoutError("Quantities must be positive", product_id)
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    if not quantities:
+        raise CheckoutError("Cart is empty")
+    # Lock rows in a fixed order so two overlapping orders cannot deadlock each other.
+    product_ids = sorted(quantities)
+
+    with db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            placeholders = ', '.join(['%s'] * len(product_ids))
+            cursor.execute(f"SELECT id, name, price FROM products WHERE id IN ({placeholders})", product_ids)
+            prices = {row['id']: (row['name'], Decimal(str(row['price']))) for row in cursor.fetchall()}
+            missing = [pid for pid in product_ids if pid not in prices]
+            if missing:
+                raise CheckoutError(f"Unknown product id {missing[0]}", missing[0])
+
+            for pid in product_ids:
+                cursor.execute(
+                    "UPDATE products SET stock = stock - %s WHERE id = %s AND stock >= %s",
+                    (quantities[pid], pid, quantities[pid])
+                )
+                if cursor.rowcount != 1:
+                    raise CheckoutError(f"Not enough stock for {prices[pid][0]}", pid, out_of_stock=True)
+
+            subtotal = sum((prices[pid][1] * quantities[pid] for pid in product_ids), Decimal('0.00'))
+            item_count = sum(quantities.values())
+            total = subtotal + SHIPPING_FEE
+            cursor.execute(
+                "INSERT INTO orders (user_id, payment_method, item_count, subtotal, shipping, total) VALUES (%s, %s, %s, %s, %s, %s)",
+                (user_id, payment_method, item_count, subtotal, SHIPPING_FEE, total)
+            )
+            order_id = cursor.lastrowid
+            cursor.executemany(
+                "INSERT INTO order_items (order_id, product_id, quantity, unit_price) VALUES (%s, %s, %s, %s)",
+                [(order_id, pid, quantities[pid], prices[pid][1]) for pid in product_ids]
+            )
+            _log_changes(cursor, product_ids)
+            conn.commit()
+        finally:
+            cursor.close()
+
+    products_changed(product_ids)  # stock moved
+    for pid in product_ids:
+        product_counters.add('sold_count', pid, quantities[pid])
+    return {'order_id': order_id, 'item_count': item_count, 'subtotal': subtotal, 'shipping': SHIPPING_FEE, 'total': total}
+
+# --- Product Counters ---
+COUNTED_COLUMNS = ('sold_count', 'view_count')
+COUNTER_BATCH_ROWS = 500
+
+def _write_product_counters(batch):
+    """Applies {column: {product_id: delta}} with one UPDATE ... CASE per column and chunk, in one transaction."""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            for column, counts in batch.items():
+                if column not in COUNTED_COLUMNS:
+                    raise ValueError(f"Not a product counter: {column}")
+                ids = sorted(counts)  # the same row lock order as place_order
+                for start in range(0, len(ids), COUNTER_BATCH_ROWS):
+                    chunk = ids[start:start + COUNTER_BATCH_ROWS]
+                    cursor.execute(
+                        f"UPDATE products SET {column} = {column} + CASE id {' '.join(['WHEN %s THEN %s'] * len(chunk))} "
+                        f"ELSE 0 END WHERE id IN ({', '.join(['%s'] * len(chunk))})",
+                        [value for pid in chunk for value in (pid, counts[pid])] + chunk
+                    )
+            conn.commit()
+        finally:
+            cursor.close()
+    if 'sold_count' in batch:
+        invalidate_catalog()  # the best-sellers order may have changed
+
+product_counters = WriteBehindCounters('pup_product_counters', _write_product_counters, **COUNTER_CONFIG)
+
+def record_views(product_ids):
+    """Counts one view of each product; written with the next counter batch."""
+    for pid in product_ids:
+        product_counters.add('view_count', pid)
+
+# --- Order History ---
+ORDER_FIELDS = ('id', 'status', 'payment_method', 'item_count', 'subtotal', 'shipping', 'total', 'created_at')
+
+def get_orders_page(user_id, limit=20, cursor=None):
+    """
+    Returns one page of a user's orders, newest first, as {'orders': [...], 'next_cursor'}.
+
+    Item counts and totals are stored on the order at checkout, so this reads only the
+    orders table, through idx_orders_user_created: a page costs the same index range
+    scan however many orders the user has. Raises ValueError for malformed cursors.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    conditions, params = ["user_id = %s"], [user_id]
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        conditions.append("(created_at < %s OR (created_at = %s AND id < %s))")
+        params += [created_at, created_at, last_id]
+    params.append(limit + 1)
+
+    with db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(
+                f"SELECT {', '.join(ORDER_FIELDS)} FROM orders WHERE {' AND '.join(conditions)} "
+                "ORDER BY created_at DESC, id DESC LIMIT %s",
+                params
+            )
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1], 'created_at')
+    return {'orders': rows, 'next_cursor': next_cursor}
+
+# --- Users ---
+USER_FIELDS = ('id', 'name', 'email', 'password_hash', 'address1', 'address2')
+_user_cache = TTLCache(**USER_CACHE_CONFIG)
+_user_generation = 0
+_user_lock = threading.Lock()
+
+def get_user(user_id):
+    """
+    Returns the user's row as a dict, or None if there is no such user. Recently seen
+    users are served from memory, so a signed-in page view needs no query.
+    Cached values are shared between callers and must be treated as read-only.
+    """
+    user = _user_cache.get(user_id, _MISSING)
+    if user is _MISSING:
+        user = _load_user("id = %s", user_id, cache_as=user_id)
+    return user
+
+def get_user_by_email(email):
+    """Returns the user registered with `email`, or None. Always queries, and refreshes the cached record; used when logging in."""
+    return _load_user("email = %s", email)
+
+def _load_user(condition, value, cache_as=None):
+    generation = _user_generation
+    user = _query_user(condition, value)
+    key = user['id'] if user is not None else cache_as
+    if key is not None:
+        with _user_lock:
+            # Skip the store if a profile changed while we were querying; the row may predate it.
+            if generation == _user_generation:
+                _user_cache.set(key, user)
+    return user
+
+def _query_user(condition, value):
+    with db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(f"SELECT {', '.join(USER_FIELDS)} FROM users WHERE {condition}", (value,))
+            return cursor.fetchone()
+        finally:
+            cursor.close()
+
+def invalidate_user(user_id):
+    """Drops the cached record for `user_id`, so the next get_user() reads the table."""
+    global _user_generation
+    with _user_lock:
+        _user_generation += 1
+        _user_cache.pop(user_id)
+
+def update_user_profile(user_id, name, address1, address2):
+    """Updates a user's name and addresses. Returns True on success."""
+    try:
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("UPDATE users SET name=%s, address1=%s, address2=%s WHERE id=%s",
+                               (name, address1, address2, user_id))
+                conn.commit()
+            finally:
+                cursor.close()
+        return True
+    except Error as e:
+        print(f"Error updating profile: {e}")
+        return False
     finally:
-        cursor.close()
-        conn.close()
+        invalidate_user(user_id)
+
+def get_user_cache_stats():
+    return _user_cache.stats()
 
 # Run this once to setup the DB
 if __name__ == '__main__':
@@ -0,0 +1,151 @@
+# shared/images.py
+"""
+Resized and WebP derivatives of the product images under assets/images/.
+
+Derivatives are generated lazily with Pillow the first time a size is requested and
+cached on disk under a name that includes a hash of the source file, so replacing a
+source image simply produces new derivatives on the next request.
+
+    /static/images/<width>/<name>.png    resized copy in the source format
+    /static/images/<width>/<name>.webp   resized WebP copy
+"""
+import hashlib
+import os
+import threading
+
+from flask import abort, request, send_file
+
+try:
+    from PIL import Image, UnidentifiedImageError
+except ImportError:  # derivatives are an optimisation; without Pillow we serve originals
+    Image = None
+
+IMAGES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'assets', 'images'))
+CACHE_DIR = os.environ.get('PUP_IMAGE_CACHE',
+                           os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.cache', 'images')))
+
+# Fixed widths keep the number of cached variants bounded. 128/256 cover the cart and
+# homepage thumbnails at 1x/2x; 512 covers the grid on wide or high-DPI screens.
+IMAGE_WIDTHS = (128, 256, 512)
+WEBP_QUALITY = 80
+_SOURCE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+_FORMATS = {'.png': ('PNG', 'image/png'), '.jpg': ('JPEG', 'image/jpeg'),
+            '.jpeg': ('JPEG', 'image/jpeg'), '.webp': ('WEBP', 'image/webp')}
+
+_hashes = {}               # source path -> ((mtime_ns, size), sha1 hex)
+_undecodable = set()       # derivative paths whose source Pillow could not read
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def source_hash(path):
+    """Returns a content hash of `path`, recomputed only when its mtime or size changes."""
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _hashes.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    with open(path, 'rb') as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+    _hashes[path] = (stamp, digest)
+    return digest
+
+
+def _find_source(name):
+    stem, ext = os.path.splitext(name)
+    candidates = [name] if ext.lower() in _SOURCE_EXTENSIONS else [stem + e for e in _SOURCE_EXTENSIONS]
+    for candidate in candidates:
+        path = os.path.join(IMAGES_DIR, candidate)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def _lock_for(key):
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def get_derivative(name, width):
+    """
+    Returns (path, mimetype) of `name` scaled to `width` pixels wide. The output format
+    follows the extension of `name`, so 'shirt.webp' is a WebP rendering of 'shirt.png'.
+    Falls back to the original file when it can't be decoded. Returns None if unknown.
+    """
+    if width not in IMAGE_WIDTHS or os.path.basename(name) != name:
+        return None
+    ext = os.path.splitext(name)[1].lower()
+    source = _find_source(name)
+    if source is None or ext not in _FORMATS:
+        return None
+    fmt, mimetype = _FORMATS[ext]
+    if Image is None:
+        return source, _FORMATS.get(os.path.splitext(source)[1].lower(), (None, None))[1]
+
+    stem = os.path.splitext(os.path.basename(source))[0]
+    target = os.path.join(CACHE_DIR, f"{stem}-{source_hash(source)[:16]}-{width}{ext}")
+    if os.path.exists(target):
+        return target, mimetype
+    with _lock_for(target):
+        if target not in _undecodable and not os.path.exists(target):
+            if not _render(source, target, width, fmt):
+                _undecodable.add(target)  # keyed by source hash, so a fixed source is retried
+        if target in _undecodable:
+            return source, _FORMATS[os.path.splitext(source)[1].lower()][1]
+    return target, mimetype
+
+
+def _render(source, target, width, fmt):
+    try:
+        with Image.open(source) as im:
+            im.load()
+            if im.width > width:
+                height = max(1, round(im.height * width / im.width))
+                im = im.resize((width, height), Image.LANCZOS)
+            if fmt == 'JPEG' and im.mode not in ('RGB', 'L'):
+                im = im.convert('RGB')
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+            options = {'quality': WEBP_QUALITY, 'method': 4} if fmt == 'WEBP' else {'optimize': True}
+            im.save(tmp, fmt, **options)
+        os.replace(tmp, target)  # atomic, so concurrent workers never serve a half-written file
+        return True
+    except (OSError, UnidentifiedImageError) as e:
+        print(f"Could not create {width}px derivative of {source}: {e}")
+        return False
+
+
+def responsive_image(url, src_width=256, widths=IMAGE_WIDTHS):
+    """
+    For a local '/static/images/<name>' URL returns {'src', 'srcset', 'webp_srcset'},
+    with a version query so the derivative URLs can be cached forever. `src` (used by
+    clients without srcset support, like the Tkinter webview) is the `src_width` copy.
+    Returns None for anything else (external URLs, missing files).
+    """
+    prefix = '/static/images/'
+    if not url or not url.startswith(prefix) or '/' in url[len(prefix):]:
+        return None
+    name = url[len(prefix):]
+    source = _find_source(name)
+    if source is None:
+        return None
+    version = source_hash(source)[:12]
+    stem = os.path.splitext(name)[0]
+    srcset = lambda n: ', '.join(f"{prefix}{w}/{n}?v={version} {w}w" for w in widths)
+    return {'src': f"{prefix}{src_width}/{name}?v={version}", 'srcset': srcset(name), 'webp_srcset': srcset(stem + '.webp')}
+
+
+def install_image_routes(app):
+    """Registers the /static/images/<width>/<name> derivative route on `app`."""
+    @app.route('/static/images/<int:width>/<name>')
+    def image_derivative(width, name):
+        found = get_derivative(name, width)
+        if found is None:
+            abort(404)
+        path, mimetype = found
+        # Versioned URLs (from responsive_image) change whenever the source does.
+        max_age = 31536000 if request.args.get('v') else 3600
+        response = send_file(path, mimetype=mimetype, conditional=True, max_age=max_age)
+        if request.args.get('v'):
+            response.cache_control.immutable = True
+        return response
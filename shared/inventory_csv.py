@@ -0,0 +1,133 @@
+# shared/inventory_csv.py
+"""
+CSV import/export of the products table, used by the admin app's /import and /export.
+
+Files use the product column names as their header. An import may carry any subset of
+them: rows with an existing id update just the columns given (so `id,stock` is a
+restock file), and rows without one add new products and need name, price and stock.
+Blank cells leave the current value alone.
+
+Both directions stream: the import is parsed and written IMPORT_BATCH_SIZE rows at a
+time, and the export is generated from a server-side cursor.
+"""
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+
+from shared.database import PRODUCT_COLUMNS, iter_product_batches, upsert_products
+
+IMPORT_BATCH_SIZE = 500
+EXPORT_BATCH_SIZE = 1000
+# A nightly sync with a systematic mistake would otherwise return one error per row.
+MAX_REPORTED_ERRORS = 100
+
+
+def _non_negative(parse):
+    def parser(text):
+        value = parse(text)
+        if value < 0:
+            raise ValueError("must not be negative")
+        return value
+    return parser
+
+
+def _decimal(text):
+    try:
+        return Decimal(text).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError(f"not a number: {text!r}")
+
+
+def _text(limit=None):
+    def parser(text):
+        if limit and len(text) > limit:
+            raise ValueError(f"longer than {limit} characters")
+        return text
+    return parser
+
+
+_PARSERS = {
+    'id': _non_negative(int),
+    'name': _text(255),
+    'description': _text(),
+    'price': _non_negative(_decimal),
+    'stock': _non_negative(int),
+    'image_url': _text(255),
+    'sold_count': _non_negative(int),
+}
+
+
+def parse_row(row):
+    """Converts one CSV record to {column: value}, skipping blank cells. Raises ValueError."""
+    fields = {}
+    for column, text in row.items():
+        text = (text or '').strip()
+        if not text:
+            continue
+        try:
+            fields[column] = _PARSERS[column](text)
+        except ValueError as e:
+            raise ValueError(f"{column}: {e}")
+    if not fields:
+        raise ValueError("empty row")
+    return fields
+
+
+def import_csv(stream, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Upserts products from a binary CSV `stream`, one transaction per batch.
+    Returns {'inserted', 'updated', 'error_count', 'errors': [{'line', 'error'}]}.
+    Raises ValueError if the header is missing or names unknown columns.
+    """
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    header = reader.fieldnames
+    if not header:
+        raise ValueError("The CSV file is empty")
+    unknown = [c for c in header if c not in PRODUCT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)} (expected some of {', '.join(PRODUCT_COLUMNS)})")
+
+    summary = {'inserted': 0, 'updated': 0, 'error_count': 0, 'errors': []}
+
+    def report(line, message):
+        summary['error_count'] += 1
+        if len(summary['errors']) < MAX_REPORTED_ERRORS:
+            summary['errors'].append({'line': line, 'error': message})
+
+    def flush(batch):
+        result = upsert_products(batch)
+        summary['inserted'] += result['inserted']
+        summary['updated'] += result['updated']
+        for line, message in result['errors']:
+            report(line, message)
+
+    batch = []
+    for row in reader:
+        if None in row:
+            report(reader.line_num, "more cells than header columns")
+            continue
+        try:
+            batch.append((reader.line_num, parse_row(row)))
+        except ValueError as e:
+            report(reader.line_num, str(e))
+            continue
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    return summary
+
+
+def export_csv(batch_size=EXPORT_BATCH_SIZE):
+    """Yields the products table as CSV text, one chunk per `batch_size` rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(PRODUCT_COLUMNS)
+    for rows in iter_product_batches(batch_size):
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.getvalue():  # just the header: the table is empty
+        yield buffer.getvalue()
@@ -0,0 +1,191 @@
+# shared/inventory_summary.py
+"""
+Inventory figures for the admin dashboard, kept up to date instead of recomputed.
+
+InventorySummary holds the price and stock of every product in memory, together with
+running totals: product count, units in stock, stock value (price * stock), and how
+many products are low on stock or out of stock. Reading the figures costs nothing,
+however big the catalog.
+
+The totals change incrementally. Every product write (add_product, update_product,
+delete_product, imports, checkouts, from any process) lands in catalog_changes, and
+the change feed (shared/changes.py) hands each batch of changed rows to apply(), which
+swaps the old contribution of each row for its new one. Every `reconcile_interval`
+seconds, reconcile() rebuilds the figures from one scan of the products table, which
+corrects any drift (e.g. events dropped while the feed was down) and counts it. Imports
+that add rows without ids can't be applied row by row, so they trigger a reconcile.
+
+Top sellers are not kept here: get_products_page(sort='best_selling') reads them off
+idx_products_sold through the catalog cache.
+"""
+import os
+import threading
+from datetime import datetime
+from decimal import Decimal
+
+from shared.changes import get_change_feed
+from shared.database import db_connection, get_products_page
+
+SUMMARY_CONFIG = {
+    'low_stock': int(os.environ.get('PUP_LOW_STOCK_THRESHOLD', 10)),               # "low" means 0 < stock <= this
+    'reconcile_interval': float(os.environ.get('PUP_SUMMARY_RECONCILE_INTERVAL', 300)),  # seconds
+}
+TOP_SELLERS = 5
+_ZERO = Decimal('0.00')
+
+
+class InventorySummary:
+    def __init__(self, low_stock=10):
+        self.low_stock = low_stock
+        self._rows = {}  # product id -> (price, stock)
+        self._totals = self._empty_totals()
+        self._lock = threading.Lock()
+        # Set when a change named no rows (an import that added products): reconcile soon.
+        self.stale = threading.Event()
+        self.reconciled_at = None
+        self.reconciles = 0
+        self.drift_corrections = 0
+
+    @staticmethod
+    def _empty_totals():
+        return {'products': 0, 'units': 0, 'stock_value': _ZERO, 'low_stock': 0, 'out_of_stock': 0}
+
+    def figures(self):
+        """The current totals, plus when they were last reconciled."""
+        with self._lock:
+            return dict(self._totals, reconciled_at=self.reconciled_at)
+
+    def apply(self, event):
+        """Applies a change feed event: {'products': [rows with id, price, stock], 'deleted': [ids]}."""
+        with self._lock:
+            self._apply(self._rows, self._totals, event)
+        if event.get('unknown_rows'):
+            self.stale.set()
+
+    def reconcile(self, feed):
+        """Rebuilds the totals from the products table, then re-applies changes that arrived meanwhile."""
+        requested = self.stale.is_set()
+        self.stale.clear()
+        since = feed.seq
+        rows, totals = {}, self._empty_totals()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT id, price, stock FROM products")
+                for product_id, price, stock in cursor:
+                    rows[product_id] = (Decimal(str(price)), stock)
+                    self._add(totals, rows[product_id], 1)
+            finally:
+                cursor.close()
+        with self._lock:
+            # Events carry whole rows, so applying one the scan already saw changes nothing.
+            for _, _, event in feed.events_after(since, 0):
+                self._apply(rows, totals, event)
+            if self.reconciled_at is not None and not requested and totals != self._totals:
+                self.drift_corrections += 1
+                print(f"Inventory summary drifted, corrected: {self._totals} -> {totals}")
+            self._rows, self._totals = rows, totals
+            self.reconciled_at = datetime.now()
+            self.reconciles += 1
+
+    def stats(self):
+        figures = self.figures()
+        return {'products': figures['products'], 'units': figures['units'], 'stock_value': float(figures['stock_value']),
+                'low_stock': figures['low_stock'], 'out_of_stock': figures['out_of_stock'],
+                'reconciles': self.reconciles, 'drift_corrections': self.drift_corrections}
+
+    # --- Internals ---
+    def _apply(self, rows, totals, event):
+        for product in event['products']:
+            self._replace(rows, totals, product['id'], (Decimal(str(product['price'])), product['stock']))
+        for product_id in event['deleted']:
+            self._replace(rows, totals, product_id, None)
+
+    def _replace(self, rows, totals, product_id, row):
+        old = rows.pop(product_id, None)
+        if old is not None:
+            self._add(totals, old, -1)
+        if row is not None:
+            rows[product_id] = row
+            self._add(totals, row, 1)
+
+    def _add(self, totals, row, sign):
+        price, stock = row
+        totals['products'] += sign
+        totals['units'] += sign * stock
+        totals['stock_value'] += sign * price * stock
+        if stock <= 0:
+            totals['out_of_stock'] += sign
+        elif stock <= self.low_stock:
+            totals['low_stock'] += sign
+
+
+# --- Process-wide summary ---
+_summary = None
+_summary_feed = None  # the change feed _summary follows
+_summary_lock = threading.Lock()
+
+
+def get_inventory_summary():
+    """
+    Returns this process's summary, building it (one table scan) and following changes
+    on first use, or when the change feed was replaced (see changes.stop_change_feed).
+    """
+    global _summary, _summary_feed
+    feed = get_change_feed()
+    if _summary is None or _summary_feed is not feed:
+        with _summary_lock:
+            if _summary is None or _summary_feed is not feed:
+                summary = InventorySummary(SUMMARY_CONFIG['low_stock'])
+                feed.on_event(summary.apply)  # before the scan, so no change falls between the two
+                summary.reconcile(feed)
+                threading.Thread(target=_reconcile_forever, args=(summary, feed), name='inventory-reconcile',
+                                 daemon=True).start()
+                _summary, _summary_feed = summary, feed
+    return _summary
+
+
+def get_inventory_summary_stats():
+    """
+    stats() of this process's summary, or {} if none has been built. For /metrics: a
+    scrape must not start the change feed or scan the products table.
+    """
+    summary = _summary
+    return summary.stats() if summary is not None else {}
+
+
+def refresh_inventory_summary():
+    """Applies pending changes now, e.g. right after this process wrote to products."""
+    if _summary is not None:
+        try:
+            get_change_feed().poll()
+        except Exception as e:
+            print(f"Could not refresh the inventory summary: {e}")  # the feed thread catches up
+
+
+def _reconcile_forever(summary, feed):
+    while True:
+        summary.stale.wait(SUMMARY_CONFIG['reconcile_interval'])
+        if feed.stopped:
+            return
+        try:
+            summary.reconcile(feed)
+        except Exception as e:
+            print(f"Inventory summary reconcile failed: {e}")
+
+
+def _reset_summary_after_fork():
+    # Like the change feed, the reconcile thread doesn't survive a fork.
+    global _summary, _summary_feed
+    _summary = _summary_feed = None
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_summary_after_fork)
+
+
+def inventory_dashboard():
+    """The admin dashboard figures: get_inventory_summary().figures() plus the top sellers."""
+    figures = get_inventory_summary().figures()
+    figures['top_sellers'] = get_products_page(limit=TOP_SELLERS, sort='best_selling',
+                                               columns=('id', 'name', 'sold_count'))['products']
+    return figures
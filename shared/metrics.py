@@ -0,0 +1,212 @@
+# shared/metrics.py
+"""
+Request, render and database timing for the shop and admin Flask apps.
+
+install_metrics(app, name) records, per route:
+
+    pup_http_requests_total              requests by method, route and status
+    pup_http_request_duration_seconds    wall time from routing to the response being returned
+    pup_http_request_render_seconds      time spent rendering dominate documents
+    pup_http_request_db_seconds          time spent holding a pooled DB connection
+    pup_http_request_db_wait_seconds     time spent waiting for a pooled DB connection
+    pup_http_requests_in_flight          requests currently being handled
+    pup_http_request_errors_total        unhandled exceptions and 5xx responses
+
+and serves them, plus any extra collectors, at /metrics in the Prometheus text format.
+Render and DB time come from timed() blocks and from shared.database.db_connection(),
+summed per request. Figures are per process; under gunicorn every worker reports its own.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import Response, g, request
+
+# Seconds. Covers cache hits (sub-millisecond) up to requests stuck behind a full pool.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Per-request accumulator for timed() blocks; None outside a request.
+_request_timings = ContextVar('pup_request_timings', default=None)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + [f'{n}="{v}"' for n, v in extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.label_names, k)} {_number(v)}" for k, v in values]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, *labels, value):
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self):
+        with self._lock:
+            values = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._values.items())
+        lines = self.header()
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, key, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {count}")
+        return lines
+
+
+# --- Registry ---
+_route = ('app', 'method', 'route')
+REQUESTS = Counter('pup_http_requests_total', 'HTTP requests handled.', _route + ('status',))
+DURATION = Histogram('pup_http_request_duration_seconds', 'Time to handle a request.', _route)
+RENDER = Histogram('pup_http_request_render_seconds', 'Time spent rendering HTML per request.', _route)
+DB = Histogram('pup_http_request_db_seconds', 'Time spent holding a DB connection per request.', _route)
+DB_WAIT = Histogram('pup_http_request_db_wait_seconds', 'Time spent waiting for a pooled DB connection per request.', _route)
+IN_FLIGHT = Gauge('pup_http_requests_in_flight', 'Requests currently being handled.', ('app',))
+ERRORS = Counter('pup_http_request_errors_total', 'Requests that raised or returned a 5xx status.', _route)
+METRICS = [REQUESTS, DURATION, RENDER, DB, DB_WAIT, IN_FLIGHT, ERRORS]
+_PER_REQUEST = {'render': RENDER, 'db': DB, 'db_wait': DB_WAIT}
+
+
+def render_metrics(*collectors):
+    """The text exposition of every metric above plus the `collectors` (see stats_collector)."""
+    lines = []
+    for metric in METRICS:
+        lines += metric.render()
+    for collect in collectors:
+        try:
+            lines += collect()
+        except Exception as e:
+            print(f"Metrics collector failed: {e}")
+    return '\n'.join(lines) + '\n'
+
+
+def stats_collector(prefix, get_stats, counters=()):
+    """
+    Adapts a stats() function returning {key: number} (e.g. database.get_pool_stats) into
+    a collector: each key becomes a gauge `<prefix>_<key>`, or a counter
+    `<prefix>_<key>_total` for keys listed in `counters`.
+    """
+    def collect():
+        lines = []
+        for key, value in get_stats().items():
+            if not isinstance(value, (int, float)):
+                continue
+            name, kind = (f"{prefix}_{key}_total", 'counter') if key in counters else (f"{prefix}_{key}", 'gauge')
+            lines += [f"# TYPE {name} {kind}", f"{name} {_number(value)}"]
+        return lines
+    return collect
+
+
+# --- Timing ---
+def add_timing(kind, seconds):
+    """Adds `seconds` to the current request's `kind` total ('render', 'db' or 'db_wait')."""
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[kind] = timings.get(kind, 0.0) + seconds
+
+
+@contextmanager
+def timed(kind):
+    """Times the block into the current request's `kind` total; a no-op outside requests."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_timing(kind, time.perf_counter() - started)
+
+
+def install_metrics(app, name, *collectors):
+    """
+    Instruments every request on `app` (labelled app=`name`) and registers GET /metrics,
+    which also includes the output of the zero-argument `collectors`.
+    """
+    @app.before_request
+    def _start_timing():
+        g._metrics = (time.perf_counter(), _request_timings.set({}))
+        IN_FLIGHT.inc(name)
+
+    @app.after_request
+    def _record_status(response):
+        g._metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _finish_timing(exc):
+        started, token = g.pop('_metrics', (None, None))
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        timings = _request_timings.get() or {}
+        _request_timings.reset(token)
+        IN_FLIGHT.dec(name)
+        route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+        labels = (name, request.method, route)
+        status = 500 if exc is not None else g.pop('_metrics_status', 500)
+        REQUESTS.inc(*labels, str(status))
+        DURATION.observe(*labels, value=elapsed)
+        for kind, seconds in timings.items():
+            _PER_REQUEST[kind].observe(*labels, value=seconds)
+        if status >= 500:
+            ERRORS.inc(*labels)
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(render_metrics(*collectors), content_type=CONTENT_TYPE)
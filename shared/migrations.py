@@ -0,0 +1,205 @@
+# shared/migrations.py
+"""
+Versioned schema migrations.
+
+Each entry in MIGRATIONS is (version, description, step). Steps run in version order
+as step(cursor, backend), and the version is recorded in `schema_version` when the step
+succeeds: on MySQL each step is committed on its own, on SQLite the whole run is one
+transaction. Steps are written to be idempotent (tables use IF NOT EXISTS, indexes and
+columns are only created when missing), so a database created by an older init_db can
+be adopted without special casing. Index and column DDL goes through the backend (see
+shared/backends.py).
+
+migrate() first reads the recorded version; when it is already current no DDL runs at
+all, which keeps start-up to a single cheap query.
+"""
+from mysql.connector import Error
+
+# MySQL error raised when a table does not exist.
+ER_NO_SUCH_TABLE = 1146
+# Lock held while migrating, so the shop and admin apps starting together don't
+# both apply the same step.
+LOCK_NAME = 'pup_shop_schema'
+LOCK_TIMEOUT = 30
+
+
+# --- Steps ---
+def _create_base_tables(cursor, backend):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS users (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        email VARCHAR(255) NOT NULL UNIQUE,
+        password_hash VARCHAR(255) NOT NULL,
+        address1 TEXT,
+        address2 TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS products (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        description TEXT,
+        price DECIMAL(10, 2) NOT NULL,
+        stock INT NOT NULL,
+        image_url VARCHAR(255),
+        sold_count INT DEFAULT 0
+    )
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS orders (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id INT NULL,
+        status VARCHAR(32) NOT NULL DEFAULT 'Pending',
+        payment_method VARCHAR(32) NOT NULL,
+        item_count INT NOT NULL,
+        subtotal DECIMAL(10, 2) NOT NULL,
+        shipping DECIMAL(10, 2) NOT NULL,
+        total DECIMAL(10, 2) NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS order_items (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        order_id INT NOT NULL,
+        product_id INT NOT NULL,
+        quantity INT NOT NULL,
+        unit_price DECIMAL(10, 2) NOT NULL
+    )
+    """)
+    backend.create_index(cursor, 'order_items', 'idx_order_items_order', ('order_id',))
+
+
+def _seed_sample_products(cursor, backend):
+    cursor.execute("SELECT COUNT(*) FROM products")
+    if cursor.fetchone()[0] == 0:
+        print("Populating sample products...")
+        sample_products = [
+            ('PUP Minimalist Baybayin Lanyard', 'Coquette Style Baybayin Lanyard', 140.00, 100, '/static/images/product_lanyard.png', 50),
+            ('PUP Jeepney Signage', 'Collectible Iskolar Script Signage', 20.00, 200, '/static/images/product_jeepney.png', 112),
+            ('PUP Iskolar TOTE BAG (White)', 'White Tote Bag with Iskolar Script', 160.00, 75, '/static/images/product_tote1.png', 45),
+            ('PUP Iskolar TOTE BAG (Black)', 'Black Tote Bag with Iskolar Script', 160.00, 75, '/static/images/product_tote2.png', 30),
+            ('PUP STUDY WITH STYLE Shirt', 'PUP Obelisk silhouette design shirt', 450.00, 50, '/static/images/product_shirt.png', 88),
+        ]
+        cursor.executemany(
+            "INSERT INTO products (name, description, price, stock, image_url, sold_count) VALUES (%s, %s, %s, %s, %s, %s)",
+            sample_products
+        )
+
+
+def _add_catalog_indexes(cursor, backend):
+    # Each index matches a keyset sort in database.PRODUCT_SORTS: the trailing id makes
+    # `ORDER BY col, id LIMIT n` (and its cursor predicate) a plain index range scan.
+    backend.create_index(cursor, 'products', 'idx_products_sold', ('sold_count', 'id'))
+    backend.create_index(cursor, 'products', 'idx_products_price', ('price', 'id'))
+    # Name lookups (admin search, duplicate checks) and prefix matches.
+    backend.create_index(cursor, 'products', 'idx_products_name', ('name',))
+    # "Which orders contained product X" for stock and sales reports.
+    backend.create_index(cursor, 'order_items', 'idx_order_items_product', ('product_id',))
+
+
+def _add_stock_index(cursor, backend):
+    # The admin inventory table sorts by quantity (low stock first).
+    backend.create_index(cursor, 'products', 'idx_products_stock', ('stock', 'id'))
+
+
+def _add_fulltext_index(cursor, backend):
+    # Fallback for catalogs too big for the in-memory search index (shared/search.py).
+    # SQLite has no FULLTEXT index; the backend skips it and search falls back to LIKE.
+    backend.create_index(cursor, 'products', 'ft_products_text', ('name', 'description'), kind='FULLTEXT')
+
+
+def _add_order_history_index(cursor, backend):
+    # A user's orders, newest first, for the order history pages. The primary key is
+    # appended to every secondary index (InnoDB, and SQLite's rowid), so this also
+    # serves the (created_at, id) keyset in database.get_orders_page.
+    backend.create_index(cursor, 'orders', 'idx_orders_user_created', ('user_id', 'created_at'))
+
+
+def _add_catalog_changes(cursor, backend):
+    # Append-only log of product writes, followed by other processes (shared/changes.py).
+    # product_id is NULL when the writer didn't know which rows changed (a bulk import).
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS catalog_changes (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        product_id INT NULL,
+        source VARCHAR(64) NOT NULL,
+        changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+
+def _add_view_count(cursor, backend):
+    # Product views, a popularity signal next to sold_count. Both are written in batches
+    # (see the Product Counters section of shared/database.py).
+    backend.add_column(cursor, 'products', 'view_count', 'INT NOT NULL DEFAULT 0')
+
+
+MIGRATIONS = [
+    (1, 'base tables', _create_base_tables),
+    (2, 'sample products', _seed_sample_products),
+    (3, 'catalog and order item indexes', _add_catalog_indexes),
+    (4, 'stock index', _add_stock_index),
+    (5, 'product search fulltext index', _add_fulltext_index),
+    (6, 'order history index', _add_order_history_index),
+    (7, 'catalog change log', _add_catalog_changes),
+    (8, 'product view count', _add_view_count),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# --- Helpers ---
+def current_version(cursor):
+    """The highest applied migration, or 0 for a database that predates schema_version."""
+    try:
+        cursor.execute("SELECT MAX(version) FROM schema_version")
+    except Error as e:
+        if e.errno == ER_NO_SUCH_TABLE:
+            return 0
+        raise
+    version = cursor.fetchone()[0]
+    return version or 0
+
+
+# --- Runner ---
+def migrate(conn, backend):
+    """
+    Brings the schema up to LATEST_VERSION. Returns the list of versions applied, which
+    is empty on the fast path (schema already current).
+    """
+    cursor = conn.cursor()
+    try:
+        if current_version(cursor) >= LATEST_VERSION:
+            conn.rollback()  # end the read's snapshot before handing the connection back
+            return []
+
+        with backend.migration_lock(cursor, LOCK_NAME, LOCK_TIMEOUT):
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INT PRIMARY KEY,
+                description VARCHAR(255) NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """)
+            applied = []
+            # Re-read under the lock: another process may have migrated while we waited.
+            version = current_version(cursor)
+            for step_version, description, step in MIGRATIONS:
+                if step_version <= version:
+                    continue
+                print(f"Applying migration {step_version}: {description}")
+                step(cursor, backend)
+                cursor.execute("INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                               (step_version, description))
+                if not backend.transactional_ddl:
+                    conn.commit()
+                applied.append(step_version)
+            conn.commit()
+            return applied
+    finally:
+        cursor.close()
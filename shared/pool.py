@@ -0,0 +1,269 @@
+# shared/pool.py
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out within the pool timeout."""
+
+
+class ConnectionPool:
+    """
+    A small thread-safe connection pool.
+
+    `connect` is a zero-argument callable returning a new DB-API connection.
+    Connections are validated when borrowed and replaced once they are older
+    than `recycle` seconds, so a long-idle kiosk never hands out a connection
+    the server has already dropped.
+    """
+
+    def __init__(self, connect, size=5, timeout=10.0, recycle=1800.0, validate=None):
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self._validate = validate
+        self._cond = threading.Condition()
+        self._idle = []      # (conn, created_at) pairs; most recently returned last
+        self._born = {}      # id(conn) -> created_at for connections currently checked out
+        self._total = 0      # open connections plus slots reserved for a connect in progress
+        self._waiting = 0
+        self._created = 0
+        self._recycled = 0
+        self._discarded = 0
+        self._timeouts = 0
+
+    # --- Checkout / return ---
+    def acquire(self):
+        """Borrows a connection, blocking up to `timeout` seconds if the pool is exhausted."""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            conn, born = self._checkout(deadline)
+            if conn is None:
+                # We hold a reserved slot: open a brand new connection outside the lock.
+                try:
+                    conn, born = self._connect(), time.monotonic()
+                except Exception:
+                    self._free_slot()
+                    raise
+                with self._cond:
+                    self._created += 1
+                    self._born[id(conn)] = born
+                return conn
+
+            if self._usable(conn, born):
+                with self._cond:
+                    self._born[id(conn)] = born
+                return conn
+            # Stale or broken: drop it and try again with the freed slot.
+            self._close(conn)
+            self._free_slot()
+
+    def release(self, conn, discard=False):
+        """Returns a borrowed connection. Broken connections should be released with discard=True."""
+        with self._cond:
+            born = self._born.pop(id(conn), None)
+        if born is None:
+            return
+        if not discard:
+            try:
+                # Never hand the next borrower an open transaction (or a stale REPEATABLE READ snapshot).
+                if getattr(conn, 'in_transaction', False):
+                    conn.rollback()
+            except Exception:
+                discard = True
+        if discard:
+            with self._cond:
+                self._discarded += 1
+            self._close(conn)
+            self._free_slot()
+            return
+        with self._cond:
+            self._idle.append((conn, born))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager that borrows a connection and always returns it to the pool."""
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            broken = False
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+            self.release(conn, discard=broken)
+            raise
+        else:
+            self.release(conn)
+
+    def stats(self):
+        """Returns a snapshot of pool usage counters."""
+        with self._cond:
+            return {
+                'size': self.size,
+                'open': self._total,
+                'idle': len(self._idle),
+                'in_use': self._total - len(self._idle),
+                'waiting': self._waiting,
+                'created': self._created,
+                'recycled': self._recycled,
+                'discarded': self._discarded,
+                'timeouts': self._timeouts,
+            }
+
+    def close_all(self):
+        """Closes every idle connection. Connections still checked out are closed when released."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._total -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._close(conn)
+
+    # --- Internals ---
+    def _checkout(self, deadline):
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    if self._idle:
+                        return self._idle.pop()
+                    if self._total < self.size:
+                        self._total += 1
+                        return None, None
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(f"No database connection available within {self.timeout}s")
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+    def _usable(self, conn, born):
+        if self.recycle and time.monotonic() - born > self.recycle:
+            with self._cond:
+                self._recycled += 1
+            return False
+        if self._validate is None:
+            return True
+        try:
+            return bool(self._validate(conn))
+        except Exception:
+            return False
+
+    def _free_slot(self):
+        with self._cond:
+            self._total -= 1
+            self._cond.notify()
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+class ThreadLocalPool:
+    """
+    Keeps each thread's connections for that thread alone, for embedded databases.
+
+    An embedded database (SQLite) has no server-side connection limit to guard and
+    opening a connection is cheap, but a connection should stay on one thread. Each
+    thread reuses its own idle connections; a thread that nests connection() blocks
+    gets a second one. Same interface as ConnectionPool.
+    """
+
+    def __init__(self, connect):
+        self._connect = connect
+        self._lock = threading.Lock()
+        self._idle = {}      # thread id -> idle connections, most recently returned last
+        self._in_use = 0
+        self._created = 0
+        self._discarded = 0
+
+    def acquire(self):
+        ident = threading.get_ident()
+        with self._lock:
+            idle = self._idle.get(ident)
+            conn = idle.pop() if idle else None
+            self._in_use += 1
+        if conn is None:
+            self._close_orphans()
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._lock:
+                    self._in_use -= 1
+                raise
+            with self._lock:
+                self._created += 1
+        return conn
+
+    def release(self, conn, discard=False):
+        if not discard:
+            try:
+                if getattr(conn, 'in_transaction', False):
+                    conn.rollback()
+            except Exception:
+                discard = True
+        with self._lock:
+            self._in_use -= 1
+            if discard:
+                self._discarded += 1
+            else:
+                self._idle.setdefault(threading.get_ident(), []).append(conn)
+        if discard:
+            ConnectionPool._close(conn)
+
+    @contextmanager
+    def connection(self):
+        """Context manager that borrows this thread's connection and always returns it."""
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            broken = False
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+            self.release(conn, discard=broken)
+            raise
+        else:
+            self.release(conn)
+
+    def _close_orphans(self):
+        # Servers that start a thread per request would otherwise leave one idle
+        # connection behind per finished thread.
+        alive = {thread.ident for thread in threading.enumerate()}
+        with self._lock:
+            orphaned = [self._idle.pop(ident) for ident in list(self._idle) if ident not in alive]
+        for conns in orphaned:
+            for conn in conns:
+                ConnectionPool._close(conn)
+
+    def stats(self):
+        """Returns a snapshot of usage counters, keyed like ConnectionPool.stats()."""
+        with self._lock:
+            idle = sum(len(conns) for conns in self._idle.values())
+            return {
+                'threads': len(self._idle),
+                'open': idle + self._in_use,
+                'idle': idle,
+                'in_use': self._in_use,
+                'created': self._created,
+                'discarded': self._discarded,
+            }
+
+    def close_all(self):
+        """Closes every idle connection, on every thread."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                ConnectionPool._close(conn)
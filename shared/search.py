@@ -0,0 +1,363 @@
+# shared/search.py
+"""
+Product search and typeahead for the shop.
+
+An in-memory inverted index maps every word in a product's name and description to the
+products containing it. Query words are matched as prefixes against a sorted vocabulary,
+so "tot bla" finds "PUP Iskolar TOTE BAG (Black)" as the user types. A product matches when
+every query word matches one of its words. Name hits outrank description hits, and ties
+go to the better seller.
+
+The index is built from the products table on first use. It then follows writes made
+through shared.database (see on_products_changed): changed ids are queued, and one
+query refreshes them just before the next search. A periodic rebuild picks up writes
+made by other processes, such as the admin app.
+
+Catalogs larger than max_products are not held in memory. They are searched with MySQL
+FULLTEXT instead (index ft_products_text, see shared/migrations.py), or with LIKE on
+backends without full-text indexes.
+"""
+import heapq
+import os
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+
+from shared.cache import TTLCache
+from shared.database import (PRODUCT_COLUMNS, cached_catalog_query, db_connection, get_backend,
+                             iter_products, like_contains, on_products_changed)
+
+SEARCH_CONFIG = {
+    'refresh': float(os.environ.get('PUP_SEARCH_REFRESH', 300)),            # seconds between full rebuilds
+    'max_products': int(os.environ.get('PUP_SEARCH_MAX_PRODUCTS', 200000)),  # above this, use FULLTEXT
+}
+# Fields returned for each hit: enough to render a product card.
+RESULT_FIELDS = ('id', 'name', 'price', 'image_url')
+MAX_RESULTS = 50
+# A one-letter prefix can match thousands of words; only the first few are expanded.
+MAX_PREFIX_TERMS = 200
+NAME_WEIGHT, DESCRIPTION_WEIGHT = 3, 1
+EXACT_BONUS = 1  # a whole-word match beats a prefix match
+# Typeahead sends the same short prefixes over and over; results are cached until the index changes.
+RESULT_CACHE_SIZE = 1024
+
+_WORD = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Lower-cased, accent-stripped words of `text`."""
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKD', text.casefold())
+    return _WORD.findall(''.join(ch for ch in text if not unicodedata.combining(ch)))
+
+
+class SearchIndex:
+    """Inverted index over product names and descriptions. Safe to share between threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._docs = {}        # id -> {RESULT_FIELDS..., 'sold_count'}
+        self._words = {}       # id -> set of words, for removal
+        self._postings = {}    # word -> {id: weight}
+        self._vocab = []       # sorted words, for prefix lookup
+        # word -> [(-weight, -sold_count, id)], best first. Entries for removed or changed
+        # products are left behind and skipped when read; words in _unsorted get re-sorted
+        # (cheap, the list is nearly sorted) on their next read.
+        self._ranked = {}
+        self._unsorted = set()
+        self._results = TTLCache(maxsize=RESULT_CACHE_SIZE)
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, product):
+        """Adds `product` (a Product or dict with PRODUCT_COLUMNS), replacing any previous version."""
+        weights = {}
+        for word in tokenize(product.get('description')):
+            weights[word] = DESCRIPTION_WEIGHT
+        for word in tokenize(product.get('name')):
+            weights[word] = NAME_WEIGHT
+        product_id = product['id']
+        doc = {field: product.get(field) for field in RESULT_FIELDS}
+        doc['sold_count'] = sold = product.get('sold_count') or 0
+        with self._lock:
+            previous = self._docs.get(product_id)
+            same_rank = previous is not None and previous['sold_count'] == sold
+            for word in self._words.get(product_id, set()) - weights.keys():
+                self._unpost(word, product_id)
+            self._docs[product_id] = doc
+            self._words[product_id] = set(weights)
+            for word, weight in weights.items():
+                posting = self._postings.get(word)
+                if posting is None:
+                    posting = self._postings[word] = {}
+                    self._ranked[word] = []
+                    self._vocab.insert(bisect_left(self._vocab, word), word)
+                if not (same_rank and posting.get(product_id) == weight):
+                    self._ranked[word].append((-weight, -sold, product_id))
+                    self._unsorted.add(word)
+                posting[product_id] = weight
+            self._results.invalidate()
+
+    def remove(self, product_id):
+        with self._lock:
+            self._docs.pop(product_id, None)
+            for word in self._words.pop(product_id, ()):
+                self._unpost(word, product_id)
+            self._results.invalidate()
+
+    def _unpost(self, word, product_id):
+        posting = self._postings[word]
+        del posting[product_id]
+        if not posting:
+            del self._postings[word]
+            del self._ranked[word]
+            self._unsorted.discard(word)
+            del self._vocab[bisect_left(self._vocab, word)]
+
+    def _ranked_list(self, word):
+        ranked = self._ranked[word]
+        if word in self._unsorted:
+            if len(ranked) > 2 * len(self._postings[word]):  # mostly stale entries: start over
+                sold = lambda pid: self._docs[pid]['sold_count']
+                ranked[:] = [(-weight, -sold(pid), pid) for pid, weight in self._postings[word].items()]
+            ranked.sort()
+            self._unsorted.discard(word)
+        return ranked
+
+    def _expand(self, prefix):
+        start = bisect_left(self._vocab, prefix)
+        words = []
+        for word in self._vocab[start:start + MAX_PREFIX_TERMS]:
+            if not word.startswith(prefix):
+                break
+            words.append(word)
+        return words
+
+    def search(self, query, limit=20, names_only=False):
+        """Returns up to `limit` result dicts for `query`, best first."""
+        terms = tuple(sorted(set(tokenize(query))))
+        if not terms:
+            return []
+        key = (terms, limit, names_only)
+        with self._lock:
+            results = self._results.get(key)
+            if results is None:
+                expansions = [(term, self._expand(term)) for term in terms]
+                if len(expansions) == 1:
+                    scores = self._top_candidates(*expansions[0], limit, names_only)
+                else:
+                    scores = self._match_all(expansions, names_only)
+                docs = self._docs
+                best = heapq.nlargest(limit, scores.items(),
+                                      key=lambda item: (item[1], docs[item[0]]['sold_count'], -item[0]))
+                results = [{field: docs[pid][field] for field in RESULT_FIELDS} for pid, _ in best]
+                self._results.set(key, results)
+            return results
+
+    def _top_candidates(self, term, words, limit, names_only):
+        """
+        One-word query: reads only the head of each matching word's ranked list. A product
+        in the overall top `limit` is necessarily in the top `limit` of its best word.
+        """
+        scores = {}
+        for word in words:
+            bonus = EXACT_BONUS if word == term else 0
+            posting = self._postings[word]
+            taken = 0
+            for neg_weight, neg_sold, product_id in self._ranked_list(word):
+                weight = -neg_weight
+                if names_only and weight != NAME_WEIGHT:
+                    break  # ranked by weight first, so only description hits remain
+                if posting.get(product_id) != weight or self._docs[product_id]['sold_count'] != -neg_sold:
+                    continue  # stale entry
+                if weight + bonus > scores.get(product_id, 0):
+                    scores[product_id] = weight + bonus
+                taken += 1
+                if taken >= limit:
+                    break
+        return scores
+
+    def _match_all(self, expansions, names_only):
+        """Scores of the products matching every term, summed over the terms."""
+        sized = sorted((sum(len(self._postings[w]) for w in words), term, words) for term, words in expansions)
+        scores = None
+        for size, term, words in sized:
+            matched = {}
+            if scores is not None and len(scores) * len(words) < size:
+                # Few candidates left: probe them rather than walk every posting.
+                for product_id, score in scores.items():
+                    best = 0
+                    for word in words:
+                        weight = self._postings[word].get(product_id, 0)
+                        if names_only and weight != NAME_WEIGHT:
+                            continue
+                        best = max(best, weight + (EXACT_BONUS if word == term and weight else 0))
+                    if best:
+                        matched[product_id] = score + best
+            else:
+                for word in words:
+                    bonus = EXACT_BONUS if word == term else 0
+                    for product_id, weight in self._postings[word].items():
+                        if names_only and weight != NAME_WEIGHT:
+                            continue
+                        if scores is None or product_id in scores:
+                            if weight + bonus > matched.get(product_id, 0):
+                                matched[product_id] = weight + bonus
+                if scores is not None:
+                    matched = {pid: scores[pid] + score for pid, score in matched.items()}
+            scores = matched
+            if not scores:
+                break
+        return scores
+
+
+# --- Process-wide index ---
+_index = None
+_index_built_at = 0.0
+_use_fulltext = False
+_dirty = set()        # ids written since they were last indexed
+_rebuild_needed = False
+_state_lock = threading.Lock()
+_build_lock = threading.Lock()
+
+
+def _on_products_changed(ids):
+    global _rebuild_needed
+    with _state_lock:
+        if ids is None:
+            _rebuild_needed = True
+        else:
+            _dirty.update(ids)
+
+
+on_products_changed(_on_products_changed)
+
+
+def build_index():
+    """Builds a fresh index from the products table. Returns it, or None if the catalog is too big."""
+    index = SearchIndex()
+    for product in iter_products(PRODUCT_COLUMNS):
+        index.add(product)
+        if len(index) > SEARCH_CONFIG['max_products']:
+            return None
+    return index
+
+
+def _rebuild(built_at):
+    """Replaces the index, unless another thread already rebuilt it since `built_at`."""
+    global _index, _index_built_at, _use_fulltext, _rebuild_needed
+    with _build_lock:
+        if _index_built_at != built_at and not _rebuild_needed:
+            return
+        with _state_lock:
+            _rebuild_needed = False
+            _dirty.clear()  # the new index reads every row, so queued ids are covered
+        started = time.monotonic()
+        index = build_index()
+        with _state_lock:
+            _index, _use_fulltext, _index_built_at = index, index is None, started
+
+
+def _refresh(index):
+    """Re-reads the products queued by _on_products_changed into `index`."""
+    with _state_lock:
+        ids = list(_dirty)
+        _dirty.clear()
+    ids = [int(i) for i in ids if str(i).isdigit()]
+    if not ids:
+        return
+    with db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(f"SELECT {', '.join(PRODUCT_COLUMNS)} FROM products WHERE id IN ({', '.join(['%s'] * len(ids))})", ids)
+            rows = {row['id']: row for row in cursor.fetchall()}
+        finally:
+            cursor.close()
+    for product_id in ids:
+        if product_id in rows:
+            index.add(rows[product_id])
+        else:
+            index.remove(product_id)
+
+
+def set_index(index):
+    """Installs a prebuilt SearchIndex as the process-wide one (used by the search benchmark)."""
+    global _index, _index_built_at, _use_fulltext
+    with _build_lock, _state_lock:
+        _index, _index_built_at, _use_fulltext = index, time.monotonic(), False
+        _dirty.clear()
+
+
+def get_index():
+    """
+    Returns the up-to-date process-wide SearchIndex, building it on first use, or None
+    when the catalog is searched with FULLTEXT instead.
+    """
+    built_at = _index_built_at
+    if (_index is None and not _use_fulltext) or _rebuild_needed:
+        _rebuild(built_at)
+    elif time.monotonic() - built_at > SEARCH_CONFIG['refresh'] and not _build_lock.locked():
+        # Serve the current index while a fresh one is built in the background.
+        threading.Thread(target=_rebuild, args=(built_at,), name='search-rebuild', daemon=True).start()
+    index = _index
+    if index is not None and _dirty:
+        _refresh(index)
+    return index
+
+
+# --- Queries ---
+def _fulltext_query(terms):
+    # Boolean mode: every term required, each as a prefix. tokenize() leaves only \w characters.
+    return ' '.join(f"+{term}*" for term in terms)
+
+
+def _fulltext_search(query, limit, names_only):
+    terms = tokenize(query)
+    if not terms:
+        return []
+    columns = 'name' if names_only else 'name, description'
+    if get_backend().supports_fulltext:
+        query = (f"SELECT {', '.join(RESULT_FIELDS)}, MATCH({columns}) AGAINST (%s IN BOOLEAN MODE) AS score "
+                 f"FROM products WHERE MATCH({columns}) AGAINST (%s IN BOOLEAN MODE) "
+                 "ORDER BY score DESC, sold_count DESC, id LIMIT %s")
+        params = (_fulltext_query(terms), _fulltext_query(terms), limit)
+    else:
+        # A scan, but it stops after `limit` hits; matches inside words too, unlike FULLTEXT.
+        match = "name LIKE %s ESCAPE '!'" if names_only else "(name LIKE %s ESCAPE '!' OR description LIKE %s ESCAPE '!')"
+        query = (f"SELECT {', '.join(RESULT_FIELDS)} FROM products WHERE {' AND '.join([match] * len(terms))} "
+                 "ORDER BY sold_count DESC, id LIMIT %s")
+        params = [like_contains(term) for term in terms for _ in range(1 if names_only else 2)] + [limit]
+
+    def load():
+        with db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            try:
+                cursor.execute(query, params)
+                return [{field: row[field] for field in RESULT_FIELDS} for row in cursor.fetchall()]
+            finally:
+                cursor.close()
+    return cached_catalog_query(('search', tuple(terms), limit, names_only), load, browse=True)
+
+
+def search_products(query, limit=20):
+    """Products whose name or description match every word of `query` (as prefixes)."""
+    limit = max(1, min(int(limit), MAX_RESULTS))
+    index = get_index()
+    if index is None:
+        return _fulltext_search(query, limit, names_only=False)
+    return index.search(query, limit)
+
+
+def suggest_products(prefix, limit=8):
+    """Typeahead: up to `limit` {'id', 'name'} for products whose *name* matches `prefix`."""
+    limit = max(1, min(int(limit), MAX_RESULTS))
+    index = get_index()
+    if index is None:
+        hits = _fulltext_search(prefix, limit, names_only=True)
+    else:
+        hits = index.search(prefix, limit, names_only=True)
+    return [{'id': hit['id'], 'name': hit['name']} for hit in hits]
@@ -0,0 +1,126 @@
+# shared/serving.py
+"""
+Production HTTP serving for the shop and admin Flask apps.
+
+serve() runs an app under gunicorn: a configurable number of worker processes, each
+with a pool of request threads (gthread workers) and HTTP/1.1 keep-alive. On SIGTERM
+the workers stop accepting, /healthz answers 503 on connections that are still open,
+and in-flight requests get `drain_timeout` seconds to finish.
+
+The Tkinter launchers call the same entry point from a background thread. gunicorn
+needs the main thread (and isn't available on Windows), so in that case serve() falls
+back to a single in-process threaded Werkzeug server.
+
+Settings come from PUP_<APP>_{HOST,PORT,WORKERS,THREADS,KEEPALIVE,DRAIN_TIMEOUT}
+environment variables, overridable on the command line, e.g.:
+
+    python -m shop_app.web_server --host 0.0.0.0 --port 8000 --workers 4 --threads 16
+"""
+import argparse
+import os
+import signal
+import sys
+import threading
+
+from flask import jsonify
+from werkzeug.serving import make_server
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:  # Windows kiosks only ever run the embedded single-worker server
+    BaseApplication = None
+
+_draining = threading.Event()
+
+
+# --- Configuration ---
+def server_config(name, default_port, argv=()):
+    """
+    Resolves serving options for app `name` ('shop' or 'admin') from the environment,
+    then from `argv` (command-line style arguments) if given.
+    """
+    env = lambda key, default: os.environ.get(f"PUP_{name.upper()}_{key}", default)
+    parser = argparse.ArgumentParser(prog=f"{name} server", description=f"Serve the PUP {name} app.")
+    parser.add_argument('--host', default=env('HOST', '127.0.0.1'), help='bind address')
+    parser.add_argument('--port', type=int, default=int(env('PORT', default_port)), help='bind port')
+    parser.add_argument('--workers', type=int, default=int(env('WORKERS', 1)), help='worker processes')
+    parser.add_argument('--threads', type=int, default=int(env('THREADS', 8)), help='request threads per worker')
+    parser.add_argument('--keepalive', type=int, default=int(env('KEEPALIVE', 5)),
+                        help='seconds an idle keep-alive connection is held open')
+    parser.add_argument('--drain-timeout', type=int, default=int(env('DRAIN_TIMEOUT', 30)),
+                        help='seconds to let in-flight requests finish after SIGTERM')
+    return vars(parser.parse_args(list(argv)))
+
+
+def install_health_check(app, *checks):
+    """
+    Registers GET /healthz on `app`. It answers 503 while the process is draining or
+    when any of the zero-argument `checks` raises, and 200 otherwise.
+    """
+    @app.route('/healthz')
+    def healthz():
+        if _draining.is_set():
+            return jsonify({'status': 'draining'}), 503
+        for check in checks:
+            try:
+                check()
+            except Exception as err:
+                return jsonify({'status': 'unavailable', 'error': str(err)}), 503
+        return jsonify({'status': 'ok'})
+
+
+# --- Servers ---
+def _post_worker_init(worker):
+    # gunicorn installs its own SIGTERM handler; chain ours so /healthz reports the drain.
+    def handle_exit(sig, frame):
+        _draining.set()
+        worker.handle_exit(sig, frame)
+    signal.signal(signal.SIGTERM, handle_exit)
+
+
+if BaseApplication is not None:
+    class _GunicornApplication(BaseApplication):
+        def __init__(self, app, options):
+            self.application = app
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return self.application
+
+
+def serve(app, host='127.0.0.1', port=5000, workers=1, threads=8, keepalive=5, drain_timeout=30, on_ready=None):
+    """
+    Serves `app` until SIGTERM/SIGINT (or for the life of the process when embedded).
+    `on_ready`, if given, is called once the listening socket is bound.
+    """
+    _draining.clear()
+    app.config['PUP_REQUEST_THREADS'] = threads  # e.g. changes.max_streams sizes itself from this
+    embedded = threading.current_thread() is not threading.main_thread()
+    if embedded or BaseApplication is None:
+        if workers > 1:
+            print("Multiple workers need gunicorn on the main thread; serving with 1 worker.", file=sys.stderr)
+        # Werkzeug's threaded server: one process, a thread per connection, no keep-alive.
+        server = make_server(host, port, app, threaded=True)
+        if on_ready is not None:
+            on_ready()
+        server.serve_forever()
+        return
+
+    options = {
+        'bind': f"{host}:{port}",
+        'workers': workers,
+        'threads': threads,
+        'worker_class': 'gthread',
+        'keepalive': keepalive,
+        'graceful_timeout': drain_timeout,
+        'post_worker_init': _post_worker_init,
+        'accesslog': '-',
+    }
+    if on_ready is not None:
+        options['when_ready'] = lambda arbiter: on_ready()
+    _GunicornApplication(app, options).run()
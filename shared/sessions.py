@@ -0,0 +1,95 @@
+# shared/sessions.py
+"""
+Signed-cookie sessions for the shop.
+
+install_sessions(app) configures Flask's session cookie, which is signed with the
+secret key so it can't be forged or edited. A signed-in session holds the user's id and
+a fingerprint of their password hash. current_user() resolves it through
+database.get_user(), an in-memory LRU in front of the users table, so a signed-in page
+view costs no query once the user is cached. Any worker can check the signature, so
+sessions need no shared store.
+
+Changing a password changes the fingerprint, which signs out every other session of
+that user as soon as their cached record is refreshed.
+"""
+import hashlib
+import hmac
+import os
+import secrets
+from datetime import timedelta
+
+from flask import g, session
+
+from shared.database import get_user
+
+SESSION_CONFIG = {
+    # Set PUP_SECRET_KEY in production. Otherwise a key is generated once and kept in
+    # secret_key_file, so every process on this machine signs with the same key.
+    'secret_key': os.environ.get('PUP_SECRET_KEY'),
+    'secret_key_file': os.environ.get('PUP_SECRET_KEY_FILE',
+                                      os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'secret_key'))),
+    'lifetime_days': float(os.environ.get('PUP_SESSION_DAYS', 14)),
+    'secure_cookie': os.environ.get('PUP_SESSION_SECURE', '0') == '1',  # only send over HTTPS
+}
+
+
+def _secret_key():
+    if SESSION_CONFIG['secret_key']:
+        return SESSION_CONFIG['secret_key']
+    path = SESSION_CONFIG['secret_key_file']
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        # O_EXCL: when processes start together, one writes the key and the rest read it.
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(path) as f:
+            return f.read().strip()
+    with os.fdopen(fd, 'w') as f:
+        key = secrets.token_hex(32)
+        f.write(key)
+    print(f"Generated a session secret key in {path}; set PUP_SECRET_KEY to choose one.")
+    return key
+
+
+def install_sessions(app):
+    """Configures `app`'s signed session cookie (see the module docstring)."""
+    app.secret_key = _secret_key()
+    app.config.update(
+        SESSION_COOKIE_NAME='pup_session',
+        SESSION_COOKIE_HTTPONLY=True,
+        SESSION_COOKIE_SAMESITE='Lax',
+        SESSION_COOKIE_SECURE=SESSION_CONFIG['secure_cookie'],
+        PERMANENT_SESSION_LIFETIME=timedelta(days=SESSION_CONFIG['lifetime_days']),
+    )
+
+
+def _fingerprint(user):
+    return hashlib.sha256(user['password_hash'].encode()).hexdigest()[:16]
+
+
+def login_user(user):
+    """Starts a session for `user` (a database.get_user() record)."""
+    session.clear()
+    session.permanent = True
+    session['user_id'] = user['id']
+    session['auth'] = _fingerprint(user)
+    g.user = user
+
+
+def logout_user():
+    session.clear()
+    g.user = None
+
+
+def current_user():
+    """The signed-in user's record, or None for a guest. Treat it as read-only."""
+    if 'user' not in g:
+        g.user = None
+        user_id = session.get('user_id')
+        if user_id is not None:
+            user = get_user(user_id)
+            if user is not None and hmac.compare_digest(session.get('auth', ''), _fingerprint(user)):
+                g.user = user
+            else:
+                session.clear()  # the user was deleted or changed their password
+    return g.user
@@ -0,0 +1,85 @@
+# shared/startup.py
+"""
+Startup helpers for the Tkinter desktop shells.
+
+Both shells start their Flask server and warm the database in background threads while
+Tk builds the window, and only point the webview at the server once it is listening.
+StartupTimer records how long each phase took; run a shell with --startup-timings (or
+PUP_STARTUP_TIMINGS=1) to print them. With --in-process (or PUP_WEBVIEW_TRANSPORT=wsgi)
+no server is started at all and the webview talks to the app through shared/webview.py.
+"""
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+TIMINGS_FLAG = '--startup-timings'
+IN_PROCESS_FLAG = '--in-process'
+
+
+class StartupTimer:
+    """Collects (phase, start, duration) records relative to process start-up."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._t0 = time.perf_counter()
+        self._records = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_argv(cls, argv=None):
+        argv = sys.argv[1:] if argv is None else argv
+        return cls(enabled=TIMINGS_FLAG in argv or os.environ.get('PUP_STARTUP_TIMINGS') == '1')
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, start, time.perf_counter() - start)
+
+    def mark(self, name):
+        """Records an instantaneous milestone (e.g. 'server listening')."""
+        self._record(name, time.perf_counter(), 0.0)
+
+    def _record(self, name, start, duration):
+        with self._lock:
+            self._records.append((name, start - self._t0, duration, threading.current_thread().name))
+
+    def report(self, title='Startup timings'):
+        if not self.enabled:
+            return
+        with self._lock:
+            records = sorted(self._records, key=lambda r: r[1])
+        print(f"--- {title} ---")
+        for name, offset, duration, thread in records:
+            took = f"{duration * 1000:8.1f} ms" if duration else " " * 11
+            print(f"{offset * 1000:8.1f} ms  {took}  {name} [{thread}]")
+
+
+def in_process_requested(argv=None):
+    """True when the webview should call the Flask app in-process instead of over loopback HTTP."""
+    argv = sys.argv[1:] if argv is None else argv
+    return IN_PROCESS_FLAG in argv or os.environ.get('PUP_WEBVIEW_TRANSPORT') == 'wsgi'
+
+
+def run_in_background(name, target, *args):
+    """Starts `target(*args)` in a daemon thread and returns the thread."""
+    thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+    thread.start()
+    return thread
+
+
+def warm_up(timer, *steps):
+    """
+    Runs (name, callable) warm-up steps in order, timing each. Failures are reported
+    but not raised, so an unreachable DB never blocks the window from opening.
+    """
+    for name, step in steps:
+        try:
+            with timer.phase(name):
+                step()
+        except Exception as e:
+            print(f"Warm-up step '{name}' failed: {e}")
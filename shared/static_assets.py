@@ -0,0 +1,113 @@
+# shared/static_assets.py
+"""
+Runtime side of the static asset pipeline (see shared/build_static.py).
+
+The build writes content-hashed copies of the page CSS/JS into assets/dist/ together
+with .gz/.br precompressed variants and a manifest.json. Pages link to assets through
+asset_url(), which prefers the fingerprinted local copy, then the unbuilt vendored copy
+under assets/vendor/, and only then the CDN.
+
+A fresh checkout has neither (assets/dist/ is built, assets/vendor/ is downloaded), so
+an offline first start would get no Tailwind at all. For that case pages also inline
+fallback_css(): assets/css/fallback.css, a small hand-kept subset of the utilities they
+use, which keeps them laid out until `python -m shared.build_static --download` is run.
+"""
+import json
+import mimetypes
+import os
+from functools import lru_cache
+
+from flask import abort, request, send_file
+from werkzeug.security import safe_join
+
+ASSETS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'assets'))
+DIST_DIR = os.path.join(ASSETS_DIR, 'dist')
+VENDOR_DIR = os.path.join(ASSETS_DIR, 'vendor')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+FALLBACK_CSS_PATH = os.path.join(ASSETS_DIR, 'css', 'fallback.css')
+
+# Logical asset name -> path of the vendored copy under assets/vendor/ (see build_static).
+VENDORED_PATHS = {
+    'tailwind.css': 'css/tailwind.min.css',
+    'fontawesome.css': 'css/fontawesome.min.css',
+    'localforage.js': 'js/localforage.min.js',
+}
+
+# Logical asset name -> URL used when there is no build output (e.g. a fresh checkout).
+FALLBACK_URLS = {
+    'tailwind.css': 'https://cdn.jsdelivr.net/npm/tailwindcss@2.2.19/dist/tailwind.min.css',
+    'fontawesome.css': 'https://cdn.jsdelivr.net/npm/@fortawesome/fontawesome-free@6.4.0/css/all.min.css',
+    'localforage.js': 'https://unpkg.com/localforage@1.10.0/dist/localforage.min.js',
+    'style.css': '/static/css/style.css',
+}
+
+# Encodings the build precompresses, in order of preference.
+_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+_manifest = None
+
+
+def load_manifest():
+    """Returns the build manifest (logical name -> fingerprinted file name), read once per process."""
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(MANIFEST_PATH, encoding='utf-8') as f:
+                _manifest = json.load(f)
+        except (OSError, ValueError):
+            _manifest = {}
+    return _manifest
+
+
+def asset_url(name):
+    """URL for logical asset `name`: the fingerprinted local copy if built, else the vendored copy, else the fallback."""
+    built = load_manifest().get(name)
+    if built:
+        return f"/static/dist/{built}"
+    if _is_vendored(name):
+        return f"/static/vendor/{VENDORED_PATHS[name]}"
+    return FALLBACK_URLS[name]
+
+
+def _is_vendored(name):
+    return name in VENDORED_PATHS and os.path.isfile(os.path.join(VENDOR_DIR, VENDORED_PATHS[name]))
+
+
+@lru_cache(maxsize=None)
+def fallback_css():
+    """
+    CSS for pages to inline when Tailwind has neither a built nor a vendored copy (it
+    would come from the CDN, which an offline start can't reach); '' otherwise. Read
+    once per process, like the manifest.
+    """
+    if load_manifest().get('tailwind.css') or _is_vendored('tailwind.css'):
+        return ''
+    try:
+        with open(FALLBACK_CSS_PATH, encoding='utf-8') as f:
+            return f.read()
+    except OSError as e:
+        print(f"Could not read the fallback stylesheet: {e}")
+        return ''
+
+
+def install_static_routes(app):
+    """
+    Registers /static/dist/<file> on `app`. Files there are content-hashed, so they are
+    served as immutable, and a precompressed variant is used when the client accepts it.
+    """
+    @app.route('/static/dist/<path:filename>')
+    def dist_asset(filename):
+        path = safe_join(DIST_DIR, filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        encoding = None
+        for name, suffix in _ENCODINGS:
+            if request.accept_encodings[name] and os.path.isfile(path + suffix):
+                encoding, path = name, path + suffix
+                break
+        response = send_file(path, mimetype=mimetype, conditional=True, max_age=31536000)
+        response.cache_control.immutable = True
+        response.vary.add('Accept-Encoding')
+        if encoding:
+            response.content_encoding = encoding
+        return response
@@ -0,0 +1,147 @@
+# shared/webview.py
+"""
+In-process transport between the Tkinter webview and a Flask app.
+
+By default the desktop shells run their Flask app on a loopback port and point the
+HtmlFrame at it. With the in-process transport (--in-process, or
+PUP_WEBVIEW_TRANSPORT=wsgi) no server is started: link clicks and form submits are
+dispatched straight into the app through WSGI and the resulting HTML is handed to
+HtmlFrame.load_html(), and stylesheets/images are read from assets/ without HTTP.
+Cookies the app sets (e.g. the session cookie from /login) are kept in memory and sent
+back with later requests, as a browser would.
+"""
+import mimetypes
+import os
+from http.cookies import CookieError, SimpleCookie
+from urllib.parse import urldefrag, urljoin, urlsplit
+
+from werkzeug.security import safe_join
+from werkzeug.test import EnvironBuilder, run_wsgi_app
+
+from shared.images import IMAGE_WIDTHS, get_derivative
+from shared.static_assets import DIST_DIR
+
+ASSETS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'assets'))
+# Pages are given this origin so relative links resolve to something we can dispatch.
+ORIGIN = 'http://pup.local'
+MAX_REDIRECTS = 5
+_REDIRECTS = (301, 302, 303, 307, 308)
+
+
+def _body(data, mimetype, decode=None):
+    # HtmlFrame expects text for everything except raster images.
+    if mimetype.startswith('image/') and 'svg' not in mimetype:
+        return data
+    return data.decode(decode or 'utf-8', errors='ignore')
+
+
+class WSGITransport:
+    """Serves an HtmlFrame from a WSGI `app` without sockets; see attach()."""
+
+    def __init__(self, app, origin=ORIGIN):
+        self.app = app
+        self.origin = origin
+        self.frame = None
+        self.cookies = {}  # name -> value as sent in a Cookie header
+
+    def attach(self, frame):
+        """Routes every page and resource load of `frame` through this transport."""
+        self.frame = frame
+        frame.configure(request_func=self.fetch, on_link_click=self.navigate, on_form_submit=self.navigate)
+
+    def home(self):
+        self.navigate(self.origin + '/')
+
+    def navigate(self, url, data='', method='GET'):
+        """Loads `url` (a link click or form submit) into the attached frame."""
+        method = method.upper()
+        if method == 'GET' and data:
+            url, data = url + data, ''
+        url, fragment = urldefrag(url)
+        if not url.startswith(self.origin):
+            self.frame.load_url(url)
+            return
+        final_url, body, mimetype, code = self.fetch(url, data, method)
+        if mimetype != 'text/html':
+            body = f"<pre>{body}</pre>" if isinstance(body, str) else ''
+        self.frame.load_html(body, base_url=final_url, fragment=fragment or None)
+
+    def fetch(self, url, data='', method='GET', decode=None):
+        """
+        HtmlFrame `request_func`: returns (url, data, mimetype, status) for `url`,
+        following redirects. URLs outside our origin (e.g. CDN fallbacks) are downloaded.
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = urlsplit(url)
+            if f"{parts.scheme}://{parts.netloc}" != self.origin:
+                from tkinterweb.utilities import download
+                return download(url, data, method, decode)
+            static = self._static_file(parts.path)
+            if static is not None:
+                path, mimetype = static
+                with open(path, 'rb') as f:
+                    return url, _body(f.read(), mimetype, decode), mimetype, 200
+
+            status, headers, body = self._dispatch(parts, data, method)
+            location = headers.get('Location')
+            if status in _REDIRECTS and location:
+                url = urljoin(url, location)
+                if status in (301, 302, 303):
+                    method, data = 'GET', ''
+                continue
+            mimetype = headers.get('Content-Type', 'text/html').split(';')[0].strip()
+            return url, _body(body, mimetype, decode), mimetype, status
+        raise RuntimeError(f"Too many redirects loading {url}")
+
+    def _static_file(self, path):
+        """(path, mimetype) for a /static/ URL that can be read straight from disk, else None."""
+        if not path.startswith('/static/'):
+            return None
+        rel = path[len('/static/'):]
+        head, _, rest = rel.partition('/')
+        if head == 'images' and '/' in rest:
+            width, _, name = rest.partition('/')
+            return get_derivative(name, int(width)) if width.isdigit() and int(width) in IMAGE_WIDTHS else None
+        target = safe_join(DIST_DIR, rest) if head == 'dist' else safe_join(ASSETS_DIR, rel)
+        if target is None or not os.path.isfile(target):
+            return None
+        return target, mimetypes.guess_type(target)[0] or 'application/octet-stream'
+
+    def _dispatch(self, parts, data, method):
+        builder = EnvironBuilder(path=parts.path or '/', query_string=parts.query, method=method,
+                                 base_url=self.origin, data=data or None,
+                                 content_type='application/x-www-form-urlencoded' if data else None,
+                                 headers=self._request_headers())
+        try:
+            environ = builder.get_environ()
+        finally:
+            builder.close()
+        app_iter, status, headers = run_wsgi_app(self.app, environ, buffered=True)
+        self._store_cookies(headers)
+        try:
+            body = b''.join(app_iter)
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+        return int(status.split(None, 1)[0]), headers, body
+
+    def _request_headers(self):
+        headers = {'Accept-Encoding': 'identity'}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f"{name}={value}" for name, value in self.cookies.items())
+        return headers
+
+    def _store_cookies(self, headers):
+        # One app on one origin, so Domain and Path don't matter; expiry is only honoured
+        # as deletion (Max-Age=0 or an empty value, which is how Flask clears a cookie).
+        for header in headers.getlist('Set-Cookie'):
+            try:
+                cookie = SimpleCookie(header)
+            except CookieError:
+                print(f"Ignoring malformed Set-Cookie header: {header!r}")
+                continue
+            for name, morsel in cookie.items():
+                if morsel.value == '' or morsel['max-age'] == '0':
+                    self.cookies.pop(name, None)
+                else:
+                    self.cookies[name] = morsel.coded_value
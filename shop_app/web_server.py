@@ -1,25 +1,151 @@
 # shop_app/web_server.py
-from flask import Flask, render_template_string, request, jsonify, redirect, url_for
+from flask import Flask, render_template_string, request, jsonify, redirect, url_for, make_response
 from dominate import document
 from dominate.tags import *
-from shared.database import get_all_products, hash_password, get_db_connection
+from dominate.util import raw
+from mysql.connector import Error
+from shared.cache import TTLCache
+from shared.database import get_products_page, get_catalog_version, get_catalog_cache_stats, get_pool_stats, get_orders_page, hash_password, db_connection, place_order, CheckoutError, check_db
+from shared.database import get_user_by_email, get_user_cache_stats, update_user_profile, product_counters, record_views
+from shared.pool import PoolTimeout
+from shared.search import get_index as get_search_index, search_products, suggest_products
+from shared.changes import get_change_feed, install_catalog_stream
+from shared.sessions import current_user, install_sessions, login_user, logout_user
+from shared.metrics import install_metrics, stats_collector, timed
+from shared.images import IMAGE_WIDTHS, install_image_routes, responsive_image
+from shared.serving import install_health_check, serve, server_config
+from shared.static_assets import asset_url, fallback_css, install_static_routes
+from functools import lru_cache
+from html import escape
+import hashlib
+import hmac
+import json
 import os
+import re
+import sys
 
 # Create the Flask application
 app = Flask(__name__, static_folder=os.path.join('..', 'assets'), static_url_path='/static')
+install_health_check(app, check_db)
+install_metrics(app, 'shop',
+                stats_collector('pup_db_pool', get_pool_stats, counters=('created', 'recycled', 'discarded', 'timeouts')),
+                stats_collector('pup_catalog_cache', get_catalog_cache_stats,
+                                counters=('hits', 'misses', 'browse_hits', 'browse_misses')),
+                stats_collector('pup_user_cache', get_user_cache_stats, counters=('hits', 'misses')),
+                product_counters.collect)
+install_sessions(app)
+install_image_routes(app)
+install_static_routes(app)
+install_catalog_stream(app)
 
-def create_page(page_title, active_section_id):
+# --- Page Rendering Cache ---
+# Nothing in the page shell depends on the request except the title, which section is
+# shown and the product grid. The shell and each section are rendered once with
+# placeholders for those, and finished pages and fragments are cached per (section,
+# catalog version).
+_TITLE_PLACEHOLDER = '__PAGE_TITLE__'
+_SECTION_PLACEHOLDER = '<!--SECTION-->'
+_GRID_PLACEHOLDER = '<!--PRODUCT_GRID-->'
+_PROFILE_PLACEHOLDER = '<!--PROFILE-->'  # filled per request with the signed-in user's details
+_ACTIVE_TOKEN = re.compile(r'\{active:(\w+)\|([^|}]*)\|([^|}]*)\}')
+_page_cache = TTLCache(maxsize=64)
+_grid_cache = (None, '')  # (catalog page the grid was rendered from, grid HTML)
+
+# The homepage renders the first page of best sellers; the rest is fetched from
+# /api/products as the user scrolls.
+HOMEPAGE_PAGE_SIZE = 20
+HOMEPAGE_SORT = 'best_selling'
+SEARCH_PAGE_SIZE = 20
+ORDER_HISTORY_PAGE_SIZE = 20
+SUGGEST_SIZE = 8
+MAX_VIEWS_PER_REPORT = 100
+VIEW_REPORT_SECONDS = 15
+GRID_FIELDS = ('id', 'name', 'price', 'image_url')
+
+def _when_active(section_id, active, inactive=''):
+    """Emits a token that resolves to `active` or `inactive` depending on the requested section."""
+    return '{active:%s|%s|%s}' % (section_id, active, inactive)
+
+def create_page(page_title, active_section_id, catalog_page=None):
+    """
+    Generates the HTML for a page by filling the prerendered shell with the requested section.
+    """
+    html = _page_shell().replace(_TITLE_PLACEHOLDER, escape(page_title), 1)
+    return _fill(html.replace(_SECTION_PLACEHOLDER, _section_html(active_section_id), 1), active_section_id, catalog_page)
+
+def create_fragment(section_id, catalog_page=None):
+    """
+    Generates the HTML for one section on its own, as the page script swaps it in.
+    """
+    return _fill(_section_html(section_id), section_id, catalog_page)
+
+def _fill(html, active_section_id, catalog_page):
+    if catalog_page is None:
+        catalog_page = _homepage_catalog_page()
+    html = _ACTIVE_TOKEN.sub(lambda m: m.group(2) if m.group(1) == active_section_id else m.group(3), html)
+    return html.replace(_GRID_PLACEHOLDER, _render_product_grid(catalog_page), 1)
+
+def _page_title(section):
+    return f"PUP Shop - {section.title()}"
+
+def render_section_page(section, fragment=False):
+    """
+    Returns (html, etag) for a /show/<section> page, or for /fragment/<section> when
+    `fragment` is set, rendering it only when the catalog changed.
+    """
+    catalog_page = _homepage_catalog_page()
+    key = (section, fragment, get_catalog_version())
+    entry = _page_cache.get(key)
+    # The catalog cache hands out the same object until it reloads, so an identity check
+    # also catches changes that arrive through the catalog TTL rather than a write.
+    if entry is None or entry[0] is not catalog_page:
+        with timed('render'):
+            if fragment:
+                html = create_fragment(section, catalog_page)
+            else:
+                html = create_page(_page_title(section), section, catalog_page)
+        entry = (catalog_page, html, hashlib.sha1(html.encode('utf-8')).hexdigest())
+        _page_cache.set(key, entry)
+    return entry[1], entry[2]
+
+def warm_caches():
+    """Loads the catalog, renders the homepage, builds the search index and starts following catalog changes."""
+    render_section_page('homepage')
+    get_search_index()
+    get_change_feed()
+
+def _homepage_catalog_page():
+    return get_products_page(limit=HOMEPAGE_PAGE_SIZE, sort=HOMEPAGE_SORT, columns=GRID_FIELDS)
+
+def _render_product_grid(catalog_page):
+    global _grid_cache
+    rendered_from, html = _grid_cache
+    if rendered_from is not catalog_page:
+        grid = div(class_="grid grid-cols-2 gap-4", id="product-grid",
+                   data_sort=HOMEPAGE_SORT, data_next_cursor=catalog_page['next_cursor'] or '')
+        with grid:
+            for product in catalog_page['products']:
+                _create_product_card(product)
+        # Scrolling this into view loads the next page (see loadMoreProducts in the page script).
+        html = grid.render() + div(id="product-grid-sentinel").render()
+        _grid_cache = (catalog_page, html)
+    return html
+
+@lru_cache(maxsize=None)
+def _page_shell():
     """
-    Generates the base HTML structure for all pages using dominate.
+    Builds the request-independent page structure with dominate, once per process.
     """
-    doc = document(title=page_title)
+    doc = document(title=_TITLE_PLACEHOLDER)
 
     with doc.head:
         meta(charset="UTF-8")
         meta(name="viewport", content="width=device-width, initial-scale=1.0")
-        link(href="https://cdn.jsdelivr.net/npm/tailwindcss@2.2.19/dist/tailwind.min.css", rel="stylesheet")
-        link(href="https://cdn.jsdelivr.net/npm/@fortawesome/fontawesome-free@6.4.0/css/all.min.css", rel="stylesheet")
-        link(href="/static/css/style.css", rel="stylesheet")
+        link(href=asset_url('tailwind.css'), rel="stylesheet")
+        if fallback_css():
+            style(raw(fallback_css()))  # no local Tailwind yet; see shared/static_assets.py
+        link(href=asset_url('fontawesome.css'), rel="stylesheet")
+        link(href=asset_url('style.css'), rel="stylesheet")
         style("""
             .section { display: none; }
             .section.active { display: block; }
@@ -37,42 +163,50 @@ def create_page(page_title, active_section_id):
                 h1("PUP E-Commerce", class_="text-xl font-bold")
                 div(class_="space-x-4", _id="top-nav-icons")
 
-            # Main Content Area
+            # Main Content Area: the requested section. Others are fetched from
+            # /fragment/<section> when the page script navigates to them.
             with main(id="main-content"):
-                _create_login_register_section(active_section_id)
-                _create_shopping_cart_section(active_section_id)
-                _create_checkout_section(active_section_id)
-                _create_profile_section(active_section_id)
-                _create_order_history_section(active_section_id)
-                _create_contact_us_section(active_section_id)
-                _create_homepage_section(active_section_id, get_all_products())
+                comment('SECTION')
 
         # Fixed Bottom Navigation Bar
         with nav(class_="fixed bottom-0 left-0 right-0 bg-[#722F37] text-white p-2 shadow-t-lg z-50"):
             with div(class_="flex justify-around"):
-                button(i(class_="fas fa-home text-2xl"), span("Home", class_="text-xs block"),
-                       class_="text-center bottom-nav-item active" if active_section_id == 'homepage' else "text-center bottom-nav-item opacity-70",
-                       onclick="window.location.href='/show/homepage'")
-                button(i(class_="fas fa-shopping-cart text-2xl"), span("Cart", class_="text-xs block"),
-                       class_="text-center bottom-nav-item active" if active_section_id == 'cart' else "text-center bottom-nav-item opacity-70",
-                       onclick="window.location.href='/show/cart'")
-                button(i(class_="fas fa-user text-2xl"), span("Profile", class_="text-xs block"),
-                       class_="text-center bottom-nav-item active" if active_section_id == 'profile' else "text-center bottom-nav-item opacity-70",
-                       onclick="window.location.href='/show/profile'")
+                a(i(class_="fas fa-home text-2xl"), span("Home", class_="text-xs block"),
+                  class_="text-center bottom-nav-item " + _when_active('homepage', 'active', 'opacity-70'),
+                  **_section_link('homepage'))
+                a(i(class_="fas fa-shopping-cart text-2xl"), span("Cart", class_="text-xs block"),
+                  class_="text-center bottom-nav-item " + _when_active('cart', 'active', 'opacity-70'),
+                  **_section_link('cart'))
+                a(i(class_="fas fa-user text-2xl"), span("Profile", class_="text-xs block"),
+                  class_="text-center bottom-nav-item " + _when_active('profile', 'active', 'opacity-70'),
+                  **_section_link('profile'))
         
-        button("?", class_="fixed bottom-20 right-4 bg-black text-white w-12 h-12 rounded-full text-2xl shadow-lg z-40", onclick="window.location.href='/show/contact'")
+        a("?", class_="fixed bottom-20 right-4 bg-black text-white w-12 h-12 rounded-full text-2xl shadow-lg z-40 flex items-center justify-center",
+          **_section_link('contact'))
 
         # JavaScript for state management
         _add_spa_javascript()
         
     return doc.render()
 
+@lru_cache(maxsize=None)
+def _section_html(section_id):
+    """Renders one section with dominate, once per process. Tokens and the grid are filled per request."""
+    container = div()
+    with container:
+        SECTION_BUILDERS[section_id]()
+    return ''.join(child.render() for child in container.children)
+
+def _section_link(section_id):
+    """Attributes for a link to a section: a plain page link, which the page script turns into an in-page swap."""
+    return {'href': f"/show/{section_id}", 'data_section': section_id}
+
 # --- Section Creation Functions (they remain mostly the same) ---
-# NOTE: The onclick events in the navigation now use full page reloads to simplify state
-# management in the hybrid Tkinter/Flask model. This is more robust.
+# Links between sections are plain links to /show/<section>, so every page works without
+# JavaScript; the page script intercepts them and swaps in /fragment/<section> instead.
 
-def _create_login_register_section(active_id):
-    with section(id='register', class_='p-5 section active' if active_id == 'register' else 'p-5 section'):
+def _create_register_section():
+    with section(id='register', class_='p-5 section' + _when_active('register', ' active')):
         with div(class_="text-center mb-6"):
             img(src="/static/images/pup_logo.png", class_="mx-auto h-20 w-20 mb-4")
             h2("Mula sayo para sa bayan", class_="text-3xl font-bold text-[#722F37]")
@@ -85,10 +219,11 @@ def _create_login_register_section(active_id):
                 input_(type="password", id="reg_password", name="password", required=True, class_="w-full p-2 border rounded"), class_="mb-4")
             div(label("Confirm Password:", _for="reg_confirm_password", class_="block mb-2 font-bold"),
                 input_(type="password", id="reg_confirm_password", name="confirm_password", required=True, class_="w-full p-2 border rounded"), class_="mb-4")
-            button("Back to LOGIN", type="button", onclick="window.location.href='/show/login'", class_="w-full bg-cyan-400 text-white p-3 rounded-lg mb-2 hover:bg-cyan-500")
+            a("Back to LOGIN", class_="block text-center w-full bg-cyan-400 text-white p-3 rounded-lg mb-2 hover:bg-cyan-500", **_section_link('login'))
             button("REGISTER", type="submit", class_="w-full bg-cyan-500 text-white p-3 rounded-lg hover:bg-cyan-600")
 
-    with section(id='login', class_='p-5 section active' if active_id == 'login' else 'p-5 section'):
+def _create_login_section():
+    with section(id='login', class_='p-5 section' + _when_active('login', ' active')):
         with div(class_="text-center mb-6"):
              img(src="/static/images/pup_logo.png", class_="mx-auto h-20 w-20 mb-4")
              h2("Welcome Back!", class_="text-3xl font-bold text-[#722F37]")
@@ -99,23 +234,43 @@ def _create_login_register_section(active_id):
                 input_(type="password", id="login_password", name="password", required=True, class_="w-full p-2 border rounded"), class_="mb-4")
             button("LOGIN", type="submit", class_="w-full bg-[#722F37] text-white p-3 rounded-lg mb-2 hover:bg-[#5a252a]")
             a("Forgot Password?", href="#", class_="text-sm text-cyan-600 block text-center mb-4")
-            button("Create Account", type="button", onclick="window.location.href='/show/register'", class_="w-full bg-gray-200 text-gray-700 p-3 rounded-lg")
+            a("Create Account", class_="block text-center w-full bg-gray-200 text-gray-700 p-3 rounded-lg", **_section_link('register'))
 
-def _create_homepage_section(active_id, products):
-    with section(id='homepage', class_='p-4 section active' if active_id == 'homepage' else 'p-4 section'):
+def _create_homepage_section():
+    with section(id='homepage', class_='p-4 section' + _when_active('homepage', ' active')):
         img(src="/static/images/pup_logo.png", class_="w-full h-40 object-contain rounded-lg mb-4", alt="PUP Logo")
+        with form(id="search-form", action="#", class_="relative mb-4", onsubmit="runSearch(event)"):
+            input_(type="search", id="search-input", name="q", placeholder="Search PUP merch", autocomplete="off",
+                   class_="w-full p-2 border rounded-full", oninput="suggest(this.value)")
+            ul(id="search-suggestions", class_="absolute left-0 right-0 bg-white shadow-md rounded-lg z-30 hidden")
+        div(id="search-results", class_="grid grid-cols-2 gap-4 mb-4 hidden")
         h3("Best Sellers", class_="text-2xl font-bold text-[#722F37] mb-4")
-        with div(class_="grid grid-cols-2 gap-4"):
-            for p in products:
-                with div(class_="bg-white rounded-lg shadow-md p-3 text-center"):
-                    img(src=p['image_url'], alt=p['name'], class_="h-32 w-full object-contain mb-2")
-                    p(p['name'], class_="font-bold text-sm h-10")
-                    p(f"₱{p['price']:.2f}", class_="text-red-600 font-bold mb-2")
-                    button("Add to Cart", class_="w-full bg-red-500 text-white text-sm py-1 rounded-full",
-                           onclick=f"addToCart({p['id']}, '{p['name'].replace(\"'\", \"\\\\'\")}', {p['price']}, '{p['image_url']}')")
-
-def _create_shopping_cart_section(active_id):
-    with section(id='cart', class_='p-4 section active' if active_id == 'cart' else 'p-4 section'):
+        comment('PRODUCT_GRID')
+
+class picture(html_tag):
+    pass
+
+def _responsive_img(url, alt, sizes, class_):
+    """Renders a <picture> with WebP and resized derivatives, or a plain <img> for non-local URLs."""
+    variants = responsive_image(url)
+    if variants is None:
+        return img(src=url, alt=alt, class_=class_)
+    with picture() as element:
+        source(type="image/webp", srcset=variants['webp_srcset'], sizes=sizes)
+        img(src=variants['src'], srcset=variants['srcset'], sizes=sizes, alt=alt, class_=class_, loading="lazy")
+    return element
+
+def _create_product_card(product):
+    js_name = product['name'].replace("'", "\\'")
+    with div(class_="bg-white rounded-lg shadow-md p-3 text-center", data_product_id=product['id']):
+        _responsive_img(product['image_url'], product['name'], sizes="50vw", class_="h-32 w-full object-contain mb-2")
+        p(product['name'], class_="font-bold text-sm h-10")
+        p(f"₱{product['price']:.2f}", class_="text-red-600 font-bold mb-2")
+        button("Add to Cart", class_="w-full bg-red-500 text-white text-sm py-1 rounded-full",
+               onclick=f"addToCart({product['id']}, '{js_name}', {product['price']}, '{product['image_url']}')")
+
+def _create_shopping_cart_section():
+    with section(id='cart', class_='p-4 section' + _when_active('cart', ' active')):
         div(h2("Shopping Cart", class_="text-2xl font-bold text-[#722F37] mb-4"), class_="flex justify-between items-center")
         with div(class_="flex justify-between items-center mb-4 bg-white p-2 rounded-lg"):
             div(input_(type="checkbox", id="select-all-cart", onchange="toggleSelectAll(this)"), label(" Select All", _for="select-all-cart"), class_="flex items-center space-x-2")
@@ -125,10 +280,10 @@ def _create_shopping_cart_section(active_id):
             with div(class_="flex justify-between items-center mb-4"):
                 span("Subtotal:", class_="font-bold")
                 span("₱0.00", id="cart-subtotal", class_="font-bold")
-            button("CHECK OUT", class_="w-full bg-[#722F37] text-white p-3 rounded-lg font-bold", onclick="window.location.href='/show/checkout'")
+            a("CHECK OUT", class_="block text-center w-full bg-[#722F37] text-white p-3 rounded-lg font-bold", **_section_link('checkout'))
 
-def _create_checkout_section(active_id):
-    with section(id='checkout', class_='p-4 section active' if active_id == 'checkout' else 'p-4 section'):
+def _create_checkout_section():
+    with section(id='checkout', class_='p-4 section' + _when_active('checkout', ' active')):
         h2("STUDY WITH PASSION", class_="text-2xl font-bold text-center text-[#722F37] mb-6")
         with div(class_="bg-white p-4 rounded-lg shadow-md mb-6"):
              h3("Order Summary", class_="font-bold border-b pb-2 mb-2")
@@ -139,23 +294,47 @@ def _create_checkout_section(active_id):
         with div(class_="bg-white p-4 rounded-lg shadow-md mb-6"):
             h3("Payment Method", class_="font-bold mb-2")
             div(input_(type="radio", name="payment", id="cod", checked=True), label(" Cash on delivery", _for="cod"), class_="flex items-center")
-        button("CHECK OUT NOW!", class_="w-full bg-red-600 text-white p-4 rounded-lg font-bold text-lg")
+        button("CHECK OUT NOW!", class_="w-full bg-red-600 text-white p-4 rounded-lg font-bold text-lg", onclick="checkout()")
 
-def _create_profile_section(active_id):
-    with section(id='profile', class_='p-4 section active' if active_id == 'profile' else 'p-4 section'):
+def _create_profile_section():
+    with section(id='profile', class_='p-4 section' + _when_active('profile', ' active')):
         div(i(class_="fas fa-user-circle text-8xl text-gray-400"), class_="text-center mb-4")
-        with div(class_="bg-white p-4 rounded-lg shadow-md mb-4"):
-            h3("Address 1", class_="font-bold")
-            p("Juan Dela Cruz", class_="text-gray-600")
-            p("123 Sampaguita St, Sampaloc, Manila", class_="text-gray-600")
-            p("0917-123-4567", class_="text-gray-600")
+        comment('PROFILE')
         with div(class_="bg-white rounded-lg shadow-md"):
-            a(div("Order History", i(class_="fas fa-chevron-right float-right text-gray-400")), href="/show/order_history", class_="block p-3 border-b")
+            a(div("Order History", i(class_="fas fa-chevron-right float-right text-gray-400")), class_="block p-3 border-b",
+              **_section_link('order_history'))
             a(div("User Settings", i(class_="fas fa-chevron-right float-right text-gray-400")), href="#", class_="block p-3 border-b")
             a(div("Change Password", i(class_="fas fa-chevron-right float-right text-gray-400")), href="#", class_="block p-3")
 
-def _create_order_history_section(active_id):
-    with section(id='order_history', class_='p-4 section active' if active_id == 'order_history' else 'p-4 section'):
+def _profile_card(user):
+    """The signed-in user's name and addresses, with forms to edit them and to log out."""
+    with div(class_="bg-white p-4 rounded-lg shadow-md mb-4") as card:
+        h3(user['name'], class_="font-bold")
+        p(user['email'], class_="text-gray-600")
+        p(user['address1'] or "No address yet", class_="text-gray-600")
+        if user['address2']:
+            p(user['address2'], class_="text-gray-600")
+        with details(class_="mt-2"):
+            summary("Edit profile", class_="text-cyan-600 cursor-pointer")
+            with form(action="/profile", method="POST", class_="mt-2"):
+                for field, caption in (('name', "Name:"), ('address1', "Address 1:"), ('address2', "Address 2:")):
+                    div(label(caption, _for=f"profile_{field}", class_="block mb-2 font-bold"),
+                        input_(type="text", id=f"profile_{field}", name=field, value=user[field] or '',
+                               required=(field == 'name'), class_="w-full p-2 border rounded"), class_="mb-4")
+                button("SAVE", type="submit", class_="w-full bg-[#722F37] text-white p-3 rounded-lg")
+        with form(action="/logout", method="POST", class_="mt-2"):
+            button("LOG OUT", type="submit", class_="w-full bg-gray-200 text-gray-700 p-3 rounded-lg")
+    return card.render()
+
+@lru_cache(maxsize=None)
+def _guest_profile_card():
+    card = div(p("Log in to see your addresses and orders.", class_="text-gray-600 mb-4"),
+               a("LOGIN", class_="block text-center w-full bg-[#722F37] text-white p-3 rounded-lg", **_section_link('login')),
+               class_="bg-white p-4 rounded-lg shadow-md mb-4 text-center")
+    return card.render()
+
+def _create_order_history_section():
+    with section(id='order_history', class_='p-4 section' + _when_active('order_history', ' active')):
         h2("Order History", class_="text-2xl font-bold text-[#722F37] mb-4 text-center p-3 bg-white rounded-lg shadow-md")
         with div(class_="overflow-x-auto"):
             with table(class_="w-full text-left bg-white rounded-lg shadow-md"):
@@ -165,14 +344,14 @@ def _create_order_history_section(active_id):
                         th("Status", class_="p-3")
                         th("Items", class_="p-3")
                         th("Payment", class_="p-3")
-                with tbody():
-                    with tr(class_="border-b"):
-                        td("PUPSHP-001", class_="p-3"); td("Delivered", class_="p-3 text-green-600"); td("2", class_="p-3"); td("₱356.00", class_="p-3")
-                    with tr():
-                        td("PUPSHP-002", class_="p-3"); td("Shipped", class_="p-3 text-blue-600"); td("1", class_="p-3"); td("₱140.00", class_="p-3")
+                # The page shell is shared by every visitor; the signed-in user's orders
+                # are fetched from /api/orders (see loadOrders in the page script).
+                tbody(id="order-history-rows")
+        button("Load more", id="order-history-more", class_="hidden w-full mt-4 bg-white text-[#722F37] p-3 rounded-lg shadow-md font-bold",
+               onclick="loadOrders()")
 
-def _create_contact_us_section(active_id):
-    with section(id='contact', class_='p-4 section active' if active_id == 'contact' else 'p-4 section'):
+def _create_contact_us_section():
+    with section(id='contact', class_='p-4 section' + _when_active('contact', ' active')):
         h2("Contact Us", class_="text-2xl font-bold text-center text-[#722F37] mb-6")
         with form(class_="bg-white p-6 rounded-lg shadow-md"):
             div(label("Name:", _for="contact_name", class_="block mb-2 font-bold"),
@@ -183,12 +362,38 @@ def _create_contact_us_section(active_id):
                 textarea(id="contact_message", name="message", rows="5", class_="w-full p-2 border rounded"), class_="mb-6")
             button("Submit", type="submit", class_="w-full bg-[#722F37] text-white p-3 rounded-lg font-bold")
 
+# In page order; also the sections /show/<section> and /fragment/<section> accept.
+SECTION_BUILDERS = {
+    'register': _create_register_section,
+    'login': _create_login_section,
+    'cart': _create_shopping_cart_section,
+    'checkout': _create_checkout_section,
+    'profile': _create_profile_section,
+    'order_history': _create_order_history_section,
+    'contact': _create_contact_us_section,
+    'homepage': _create_homepage_section,
+}
+
 def _add_spa_javascript():
-    script(src="https://unpkg.com/localforage@1.10.0/dist/localforage.min.js")
-    script(type="text/javascript").add_raw("""
+    script(src=asset_url('localforage.js'))
+    script(raw("""
         // JavaScript logic remains the same as previous corrected version...
         // This script handles cart state using localforage.
         let cart = [];
+        const IMAGE_WIDTHS = __IMAGE_WIDTHS__;
+
+        // Resized/WebP derivatives are served from /static/images/<width>/<name> (see shared/images.py).
+        function isLocalImage(url) { return /^\\/static\\/images\\/[^\\/]+$/.test(url || ''); }
+        function thumbUrl(url, width, ext) {
+            const name = url.split('/').pop();
+            return `/static/images/${width}/${ext ? name.replace(/\\.[^.]+$/, ext) : name}`;
+        }
+        function thumbSrcset(url, ext) { return IMAGE_WIDTHS.map(w => `${thumbUrl(url, w, ext)} ${w}w`).join(', '); }
+        function pictureHtml(url, sizes, className, srcWidth) {
+            if (!isLocalImage(url)) return `<img src="${url}" class="${className}">`;
+            return `<picture><source type="image/webp" srcset="${thumbSrcset(url, '.webp')}" sizes="${sizes}">` +
+                   `<img src="${thumbUrl(url, srcWidth)}" srcset="${thumbSrcset(url)}" sizes="${sizes}" class="${className}" loading="lazy"></picture>`;
+        }
 
         async function loadCart() {
             const savedCart = await localforage.getItem('pup_cart');
@@ -248,7 +453,7 @@ def _add_spa_javascript():
             container.innerHTML = cart.map(item => `
                 <div class="flex items-center bg-white p-2 rounded-lg space-x-3">
                     <input type="checkbox" class="cart-item-checkbox" ${item.selected ? 'checked' : ''} onchange="toggleItemSelection(${item.id}, this)">
-                    <img src="${item.image_url}" class="w-16 h-16 object-contain rounded-md">
+                    ${pictureHtml(item.image_url, '64px', 'w-16 h-16 object-contain rounded-md', 128)}
                     <div class="flex-grow">
                         <p class="font-bold text-sm">${item.name}</p><p class="text-red-500 font-bold">₱${item.price.toFixed(2)}</p>
                     </div>
@@ -272,6 +477,284 @@ def _add_spa_javascript():
             document.getElementById('checkout-total').textContent = `₱${total.toFixed(2)}`;
         }
         
+        // --- Lazy product grid: fetch the next keyset page when the sentinel scrolls into view ---
+        let loadingProducts = false;
+
+        function renderProductCard(product) {
+            const card = document.createElement('div');
+            card.className = 'bg-white rounded-lg shadow-md p-3 text-center';
+            card.dataset.productId = product.id;
+            if (viewObserver) viewObserver.observe(card);
+            const image = document.createElement('div');
+            image.innerHTML = pictureHtml(product.image_url, '50vw', 'h-32 w-full object-contain mb-2', 256);
+            image.querySelector('img').alt = product.name;
+            const name = document.createElement('p');
+            name.className = 'font-bold text-sm h-10'; name.textContent = product.name;
+            const price = document.createElement('p');
+            price.className = 'text-red-600 font-bold mb-2';
+            price.textContent = `₱${parseFloat(product.price).toFixed(2)}`;
+            const addButton = document.createElement('button');
+            addButton.className = 'w-full bg-red-500 text-white text-sm py-1 rounded-full';
+            addButton.textContent = 'Add to Cart';
+            addButton.onclick = () => addToCart(product.id, product.name, parseFloat(product.price), product.image_url);
+            card.append(image, name, price, addButton);
+            return card;
+        }
+
+        async function loadMoreProducts() {
+            const grid = document.getElementById('product-grid');
+            if (!grid || loadingProducts || !grid.dataset.nextCursor) return;
+            loadingProducts = true;
+            try {
+                const params = new URLSearchParams({ cursor: grid.dataset.nextCursor, sort: grid.dataset.sort, fields: 'id,name,price,image_url' });
+                const response = await fetch(`/api/products?${params}`);
+                if (!response.ok) return;
+                const page = await response.json();
+                page.products.forEach(product => grid.appendChild(renderProductCard(product)));
+                grid.dataset.nextCursor = page.next_cursor || '';
+            } finally {
+                loadingProducts = false;
+            }
+        }
+
+        // Typeahead: ask for suggestions once typing pauses, and drop answers to stale prefixes.
+        let suggestTimer = null, suggestSeq = 0;
+        function suggest(prefix) {
+            clearTimeout(suggestTimer);
+            suggestTimer = setTimeout(async () => {
+                const list = document.getElementById('search-suggestions');
+                const seq = ++suggestSeq;
+                if (!prefix.trim()) { list.classList.add('hidden'); return; }
+                const response = await fetch(`/api/suggest?${new URLSearchParams({ q: prefix })}`);
+                if (!response.ok || seq !== suggestSeq) return;
+                const { suggestions } = await response.json();
+                list.replaceChildren(...suggestions.map(item => {
+                    const entry = document.createElement('li');
+                    entry.className = 'p-2 border-b cursor-pointer hover:bg-gray-100';
+                    entry.textContent = item.name;
+                    entry.onclick = () => { document.getElementById('search-input').value = item.name; runSearch(); };
+                    return entry;
+                }));
+                list.classList.toggle('hidden', suggestions.length === 0);
+            }, 120);
+        }
+
+        async function runSearch(event) {
+            if (event) event.preventDefault();
+            clearTimeout(suggestTimer); suggestSeq++;
+            document.getElementById('search-suggestions').classList.add('hidden');
+            const query = document.getElementById('search-input').value.trim();
+            const results = document.getElementById('search-results');
+            if (!query) { results.classList.add('hidden'); return; }
+            const response = await fetch(`/api/search?${new URLSearchParams({ q: query })}`);
+            if (!response.ok) return;
+            const { products } = await response.json();
+            if (products.length) {
+                results.replaceChildren(...products.map(renderProductCard));
+            } else {
+                const none = document.createElement('p');
+                none.className = 'col-span-2 text-center text-gray-500'; none.textContent = `No products match "${query}".`;
+                results.replaceChildren(none);
+            }
+            results.classList.remove('hidden');
+        }
+
+        function setupLazyGrid() {
+            const sentinel = document.getElementById('product-grid-sentinel');
+            if (!sentinel || !('IntersectionObserver' in window)) return;
+            new IntersectionObserver(entries => {
+                if (entries.some(entry => entry.isIntersecting)) loadMoreProducts();
+            }, { rootMargin: '400px' }).observe(sentinel);
+        }
+
+        // --- Order history: keyset pages of the signed-in user's orders ---
+        const ORDER_STATUS_CLASSES = { Delivered: 'text-green-600', Shipped: 'text-blue-600', Cancelled: 'text-red-600' };
+        let orderCursor = null;
+
+        function orderRow(cells) {
+            const row = document.createElement('tr');
+            row.className = 'border-b';
+            cells.forEach(([text, extra]) => {
+                const cell = document.createElement('td');
+                cell.className = 'p-3 ' + (extra || ''); cell.textContent = text;
+                row.appendChild(cell);
+            });
+            return row;
+        }
+
+        async function loadOrders() {
+            const rows = document.getElementById('order-history-rows');
+            const more = document.getElementById('order-history-more');
+            const params = new URLSearchParams({ limit: __ORDER_PAGE_SIZE__ });
+            if (orderCursor) params.set('cursor', orderCursor);
+            more.classList.add('hidden');
+            const response = await fetch(`/api/orders?${params}`);
+            if (!response.ok) {
+                const message = response.status === 401 ? 'Log in to see your orders.' : 'Could not load your orders.';
+                const row = orderRow([[message, 'text-center text-gray-500']]);
+                row.firstChild.colSpan = 4;
+                rows.replaceChildren(row);
+                return;
+            }
+            const page = await response.json();
+            if (!orderCursor && page.orders.length === 0) {
+                const row = orderRow([['No orders yet.', 'text-center text-gray-500']]);
+                row.firstChild.colSpan = 4;
+                rows.replaceChildren(row);
+            }
+            rows.append(...page.orders.map(order => orderRow([
+                [`PUPSHP-${String(order.id).padStart(3, '0')}`],
+                [order.status, ORDER_STATUS_CLASSES[order.status] || 'text-yellow-600'],
+                [order.item_count],
+                [`₱${parseFloat(order.total).toFixed(2)}`],
+            ])));
+            orderCursor = page.next_cursor;
+            if (orderCursor) more.classList.remove('hidden');
+        }
+
+        function setupOrderHistory() {
+            if (document.getElementById('order_history')) loadOrders();
+        }
+
+        // --- Live catalog: patch cards and cart lines as /api/catalog/stream reports changes ---
+        function patchProductCard(card, product) {
+            const [name, price] = card.querySelectorAll('p');
+            const addButton = card.querySelector('button');
+            name.textContent = product.name;
+            price.textContent = `₱${parseFloat(product.price).toFixed(2)}`;
+            addButton.onclick = () => addToCart(product.id, product.name, parseFloat(product.price), product.image_url);
+            addButton.disabled = product.stock <= 0;
+            addButton.textContent = product.stock <= 0 ? 'Out of Stock' : 'Add to Cart';
+            addButton.classList.toggle('opacity-50', product.stock <= 0);
+        }
+
+        function applyCatalogChange(change) {
+            const cards = id => document.querySelectorAll(`[data-product-id="${id}"]`);
+            change.products.forEach(product => cards(product.id).forEach(card => patchProductCard(card, product)));
+            change.deleted.forEach(id => cards(id).forEach(card => card.remove()));
+            let cartChanged = false;
+            change.products.forEach(product => {
+                const item = cart.find(i => i.id === product.id);
+                if (item && (item.name !== product.name || item.price !== parseFloat(product.price))) {
+                    item.name = product.name; item.price = parseFloat(product.price); cartChanged = true;
+                }
+            });
+            if (cartChanged) { saveCart(); updateCartDisplay(); if (document.getElementById('checkout-subtotal')) updateCheckoutDisplay(); }
+        }
+
+        let catalogStreamRetries = 0, lastCatalogEventId = null;
+
+        function setupCatalogStream() {
+            // When an open stream drops, the browser reconnects by itself and resumes from the
+            // Last-Event-ID it was sent. A refused stream (503 while every slot is taken) closes
+            // the EventSource for good, so reopen it from here with backoff, resuming from the
+            // last event seen.
+            if (!window.EventSource) return;
+            const query = lastCatalogEventId === null ? '' : `?last_event_id=${encodeURIComponent(lastCatalogEventId)}`;
+            const stream = new EventSource('/api/catalog/stream' + query);
+            stream.addEventListener('open', () => { catalogStreamRetries = 0; });
+            stream.addEventListener('products', event => {
+                lastCatalogEventId = event.lastEventId;
+                applyCatalogChange(JSON.parse(event.data));
+            });
+            stream.addEventListener('error', () => {
+                if (stream.readyState !== EventSource.CLOSED) return;
+                const delay = Math.min(60000, 3000 * 2 ** catalogStreamRetries++) * (0.5 + Math.random());
+                setTimeout(setupCatalogStream, delay);
+            });
+        }
+
+        // --- Product views: cards that were at least half on screen, reported in batches ---
+        const seenProducts = new Set(), unsentViews = [];
+        let viewObserver = null;
+
+        function observeProductCards(root) {
+            if (!viewObserver) return;
+            root.querySelectorAll('[data-product-id]').forEach(card => viewObserver.observe(card));
+        }
+
+        function sendViews() {
+            if (unsentViews.length === 0) return;
+            navigator.sendBeacon('/api/views', new Blob([JSON.stringify({ ids: unsentViews.splice(0) })], { type: 'application/json' }));
+        }
+
+        function setupViewTracking() {
+            if (!('IntersectionObserver' in window) || !navigator.sendBeacon) return;
+            viewObserver = new IntersectionObserver(entries => entries.forEach(entry => {
+                if (!entry.isIntersecting) return;
+                const id = parseInt(entry.target.dataset.productId);
+                viewObserver.unobserve(entry.target);
+                if (!seenProducts.has(id)) { seenProducts.add(id); unsentViews.push(id); }
+            }), { threshold: 0.5 });
+            observeProductCards(document);
+            setInterval(sendViews, __VIEW_REPORT_SECONDS__ * 1000);
+            document.addEventListener('visibilitychange', () => { if (document.visibilityState === 'hidden') sendViews(); });
+        }
+
+        // --- Navigation: swap sections in from /fragment/<section> instead of loading whole pages ---
+        const SECTION_TITLES = __SECTION_TITLES__;
+
+        function sectionInserted(id) {
+            if (id === 'homepage') setupLazyGrid();
+            observeProductCards(document.getElementById(id));
+            if (id === 'order_history') loadOrders();
+        }
+
+        async function showSection(id, push) {
+            let target = document.getElementById(id);
+            if (!target) {
+                const response = await fetch(`/fragment/${id}`);
+                if (!response.ok) { window.location.href = `/show/${id}`; return; }
+                document.getElementById('main-content').insertAdjacentHTML('beforeend', await response.text());
+                target = document.getElementById(id);
+                sectionInserted(id);
+            }
+            document.querySelectorAll('#main-content > section').forEach(s => {
+                s.hidden = s !== target;
+                s.classList.toggle('active', s === target);
+            });
+            document.querySelectorAll('.bottom-nav-item').forEach(item => {
+                item.classList.toggle('active', item.dataset.section === id);
+                item.classList.toggle('opacity-70', item.dataset.section !== id);
+            });
+            if (id === 'cart') updateCartDisplay();
+            if (id === 'checkout') updateCheckoutDisplay();
+            document.title = SECTION_TITLES[id];
+            if (push) history.pushState({ section: id }, '', `/show/${id}`);
+            window.scrollTo(0, 0);
+        }
+
+        function setupNavigation() {
+            // A full page holds just the section it was requested for.
+            const current = document.querySelector('#main-content > section');
+            if (!current || !window.fetch) return;
+            history.replaceState({ section: current.id }, '');
+            document.addEventListener('click', event => {
+                const link = event.target.closest('a[data-section]');
+                if (!link || event.button !== 0 || event.metaKey || event.ctrlKey || event.shiftKey || event.altKey) return;
+                event.preventDefault();
+                showSection(link.dataset.section, true);
+            });
+            window.addEventListener('popstate', event => { if (event.state && event.state.section) showSection(event.state.section, false); });
+        }
+
+        async function checkout() {
+            const items = cart.filter(i => i.selected).map(i => ({ id: i.id, quantity: i.quantity }));
+            if (items.length === 0) { showNotification('Select items to check out first.'); return; }
+            const payment = document.querySelector('input[name="payment"]:checked');
+            const response = await fetch('/api/checkout', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ items, payment_method: payment ? payment.id : 'cod' }),
+            });
+            const result = await response.json();
+            if (!response.ok) { showNotification(result.error || 'Checkout failed.'); return; }
+            cart = cart.filter(i => !i.selected);
+            await saveCart();
+            showNotification(`Order #${result.order_id} placed!`);
+            setTimeout(() => { window.location.href = '/show/order_history'; }, 1000);
+        }
+
         function showNotification(message) {
             const notif = document.createElement('div');
             notif.className = 'fixed top-16 left-1/2 -translate-x-1/2 bg-green-500 text-white px-4 py-2 rounded-lg shadow-lg z-50';
@@ -280,7 +763,15 @@ def _add_spa_javascript():
         }
 
         document.addEventListener('DOMContentLoaded', loadCart);
-    """)
+        document.addEventListener('DOMContentLoaded', setupLazyGrid);
+        document.addEventListener('DOMContentLoaded', setupOrderHistory);
+        document.addEventListener('DOMContentLoaded', setupCatalogStream);
+        document.addEventListener('DOMContentLoaded', setupNavigation);
+        document.addEventListener('DOMContentLoaded', setupViewTracking);
+    """.replace('__IMAGE_WIDTHS__', json.dumps(list(IMAGE_WIDTHS)))
+        .replace('__SECTION_TITLES__', json.dumps({section_id: _page_title(section_id) for section_id in SECTION_BUILDERS}))
+        .replace('__ORDER_PAGE_SIZE__', str(ORDER_HISTORY_PAGE_SIZE))
+        .replace('__VIEW_REPORT_SECONDS__', str(VIEW_REPORT_SECONDS))), type="text/javascript")
 
 # --- Flask Routes ---
 @app.route("/")
@@ -288,23 +779,172 @@ def index(): return redirect(url_for('show_section', section='homepage'))
 
 @app.route("/show/<section>")
 def show_section(section):
-    valid_sections = ['login', 'register', 'cart', 'checkout', 'profile', 'order_history', 'contact', 'homepage']
-    if section not in valid_sections: section = 'homepage'
-    return create_page(f"PUP Shop - {section.title()}", section)
+    if section not in SECTION_BUILDERS: section = 'homepage'
+    return _section_response(section, fragment=False)
+
+@app.route("/fragment/<section>")
+def show_fragment(section):
+    """Just the <section> element of /show/<section>, for the page script to swap in."""
+    if section not in SECTION_BUILDERS:
+        return "Unknown section", 404
+    return _section_response(section, fragment=True)
+
+def _section_response(section, fragment):
+    html, etag = render_section_page(section, fragment)
+    cache_control = 'no-cache'
+    if section == 'profile':
+        # The only per-user section: the cached page is shared, the user's details are not.
+        user = current_user()
+        html = html.replace(_PROFILE_PLACEHOLDER, _profile_card(user) if user else _guest_profile_card(), 1)
+        etag = hashlib.sha1(html.encode('utf-8')).hexdigest()
+        cache_control = 'private, no-cache'
+    response = make_response(html)
+    response.set_etag(etag)
+    # Let browsers keep the page but revalidate it, so repeat visits get a 304.
+    response.headers['Cache-Control'] = cache_control
+    return response.make_conditional(request)
+
+@app.route("/api/products")
+def api_products():
+    """
+    Keyset-paginated catalog. Query args: limit, cursor (from a previous next_cursor),
+    sort (newest, best_selling, price_asc, price_desc) and fields (comma-separated).
+    """
+    fields = [f for f in request.args.get('fields', '').split(',') if f]
+    try:
+        page = get_products_page(limit=request.args.get('limit', HOMEPAGE_PAGE_SIZE, type=int),
+                                 cursor=request.args.get('cursor'),
+                                 sort=request.args.get('sort', 'newest'),
+                                 columns=fields or None, browse=True)
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+    return jsonify({'products': [product.as_dict() for product in page['products']], 'next_cursor': page['next_cursor']})
+
+@app.route("/api/search")
+def api_search():
+    """Product search. Query args: q (every word must match, as a prefix) and limit."""
+    query = request.args.get('q', '')
+    try:
+        products = search_products(query, request.args.get('limit', SEARCH_PAGE_SIZE, type=int))
+    except (Error, PoolTimeout) as err:
+        print(f"Error searching products: {err}")
+        return jsonify({'error': 'Search is unavailable'}), 503
+    return jsonify({'query': query, 'products': products})
+
+@app.route("/api/suggest")
+def api_suggest():
+    """Typeahead for the search box. Query args: q (what has been typed so far) and limit."""
+    query = request.args.get('q', '')
+    try:
+        suggestions = suggest_products(query, request.args.get('limit', SUGGEST_SIZE, type=int))
+    except (Error, PoolTimeout) as err:
+        print(f"Error loading suggestions: {err}")
+        return jsonify({'error': 'Search is unavailable'}), 503
+    return jsonify({'query': query, 'suggestions': suggestions})
+
+@app.route("/api/views", methods=["POST"])
+def api_views():
+    """
+    Product cards the shopper has seen. Body: {"ids": [1, 2, ...]}. Counted in memory and
+    written to view_count in batches, so this never waits on the database.
+    """
+    payload = request.get_json(silent=True) or {}
+    ids = payload.get('ids') if isinstance(payload, dict) else None
+    if not isinstance(ids, list):
+        return jsonify({'error': 'Expected a list of product ids'}), 400
+    record_views({pid for pid in ids[:MAX_VIEWS_PER_REPORT] if isinstance(pid, int) and not isinstance(pid, bool) and pid > 0})
+    return '', 204
+
+def current_user_id():
+    """The signed-in user's id, or None for a guest."""
+    user = current_user()
+    return user['id'] if user else None
+
+@app.route("/api/orders")
+def api_orders():
+    """The signed-in user's orders, newest first. Query args: limit and cursor (from a previous next_cursor)."""
+    user_id = current_user_id()
+    if user_id is None:
+        return jsonify({'error': 'Log in to see your orders'}), 401
+    try:
+        page = get_orders_page(user_id, limit=request.args.get('limit', ORDER_HISTORY_PAGE_SIZE, type=int),
+                               cursor=request.args.get('cursor'))
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+    except (Error, PoolTimeout) as err:
+        print(f"Error loading orders: {err}")
+        return jsonify({'error': 'Order history is unavailable'}), 503
+    for order in page['orders']:
+        order['created_at'] = order['created_at'].isoformat()
+    return jsonify(page)
+
+@app.route("/api/checkout", methods=["POST"])
+def api_checkout():
+    """
+    Places an order. Body: {"items": [{"id": 1, "quantity": 2}, ...], "payment_method": "cod"}.
+    """
+    payload = request.get_json(silent=True) or {}
+    items = payload.get('items') if isinstance(payload, dict) else None
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        return jsonify({'error': 'Expected a list of cart items'}), 400
+    try:
+        order = place_order([(item.get('id'), item.get('quantity')) for item in items],
+                            user_id=current_user_id(), payment_method=payload.get('payment_method', 'cod'))
+    except CheckoutError as err:
+        return jsonify({'error': str(err), 'product_id': err.product_id}), 409 if err.out_of_stock else 400
+    except (Error, PoolTimeout) as err:
+        print(f"Error placing order: {err}")
+        return jsonify({'error': 'Database unavailable'}), 503
+    return jsonify(order), 201
 
 @app.route("/register", methods=["POST"])
 def handle_register():
     name = request.form['name']; email = request.form['email']; password = request.form['password']; confirm_password = request.form['confirm_password']
     if password != confirm_password: return "Passwords do not match!", 400
     password_hash = hash_password(password)
-    conn = get_db_connection(); cursor = conn.cursor()
     try:
-        cursor.execute("INSERT INTO users (name, email, password_hash) VALUES (%s, %s, %s)", (name, email, password_hash))
-        conn.commit()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("INSERT INTO users (name, email, password_hash) VALUES (%s, %s, %s)", (name, email, password_hash))
+                conn.commit()
+            finally:
+                cursor.close()
     except Exception as err:
         return f"Error: {err}", 500
-    finally:
-        cursor.close(); conn.close()
     return redirect(url_for('show_section', section='login'))
 
-def run_shop_server(): app.run(host='127.0.0.1', port=5000, debug=False)
\ No newline at end of file
+@app.route("/login", methods=["POST"])
+def handle_login():
+    email = request.form['email']; password = request.form['password']
+    try:
+        user = get_user_by_email(email)
+    except (Error, PoolTimeout) as err:
+        return f"Error: {err}", 500
+    if user is None or not hmac.compare_digest(user['password_hash'], hash_password(password)):
+        return "Invalid email or password!", 401
+    login_user(user)
+    return redirect(url_for('show_section', section='profile'))
+
+@app.route("/logout", methods=["POST"])
+def handle_logout():
+    logout_user()
+    return redirect(url_for('show_section', section='homepage'))
+
+@app.route("/profile", methods=["POST"])
+def handle_profile():
+    user_id = current_user_id()
+    if user_id is None:
+        return redirect(url_for('show_section', section='login'))
+    name = request.form['name'].strip()
+    if not name: return "Name is required!", 400
+    if not update_user_profile(user_id, name, request.form.get('address1', '').strip() or None,
+                               request.form.get('address2', '').strip() or None):
+        return "Could not update your profile, please try again.", 503
+    return redirect(url_for('show_section', section='profile'))
+
+def run_shop_server(argv=(), on_ready=None):
+    serve(app, on_ready=on_ready, **server_config('shop', default_port=5000, argv=argv))
+
+if __name__ == '__main__':
+    run_shop_server(sys.argv[1:])
\ No newline at end of file
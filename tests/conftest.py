@@ -0,0 +1,35 @@
+# tests/conftest.py
+"""
+Shared fixtures. Database tests run against the SQLite stand-in from
+benchmarks/standin.py: a scratch file, migrated like a real database, per test.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.standin import standin_database  # noqa: E402
+from shared import database  # noqa: E402
+
+
+def make_product(product_id, name, price='10.00', stock=10, sold_count=0, description=''):
+    return {'id': product_id, 'name': name, 'description': description, 'price': price, 'stock': stock,
+            'image_url': '/static/images/pup_logo.png', 'sold_count': sold_count}
+
+
+@pytest.fixture
+def products():
+    """The catalog the `db` fixture starts with; override in a module to change it."""
+    return [make_product(i, f"Product {i}", price=f"{10 + i % 3}.00", stock=5) for i in range(1, 26)]
+
+
+@pytest.fixture
+def db(products):
+    """shared.database, serving a fresh stand-in holding `products`."""
+    with standin_database(products):
+        try:
+            yield database
+        finally:
+            database.product_counters.flush()  # into this database, not the next one
@@ -0,0 +1,96 @@
+# tests/test_checkout.py
+import threading
+from decimal import Decimal
+
+import pytest
+
+from shared.database import CheckoutError
+
+
+def _stock_and_sold(db, product_id):
+    db.product_counters.flush()
+    with db.db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT stock, sold_count FROM products WHERE id = %s", (product_id,))
+            return cursor.fetchone()
+        finally:
+            cursor.close()
+
+
+def _order_count(db):
+    with db.db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT COUNT(*) FROM orders")
+            return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+
+
+def test_order_takes_stock_and_prices_from_the_database(db):
+    order = db.place_order([(1, 2), (2, 1), (1, 1)])
+    assert order['item_count'] == 4
+    # Product 1 costs 11.00 and product 2 costs 12.00 (see the products fixture).
+    assert order['subtotal'] == Decimal('45.00')
+    assert order['total'] == order['subtotal'] + order['shipping']
+    assert _stock_and_sold(db, 1) == (2, 3)
+    assert _stock_and_sold(db, 2) == (4, 1)
+
+
+def test_short_line_rolls_back_the_whole_order(db):
+    with pytest.raises(CheckoutError) as raised:
+        db.place_order([(1, 1), (2, 6)])
+    assert raised.value.out_of_stock and raised.value.product_id == 2
+    assert _stock_and_sold(db, 1) == (5, 0)
+    assert _stock_and_sold(db, 2) == (5, 0)
+    assert _order_count(db) == 0
+
+
+@pytest.mark.parametrize('items', [[], [(1, 0)], [(1, -1)], [('x', 1)], [(999, 1)]])
+def test_invalid_carts_are_rejected(db, items):
+    with pytest.raises(CheckoutError):
+        db.place_order(items)
+    assert _order_count(db) == 0
+
+
+def test_concurrent_buyers_never_oversell(db):
+    outcomes = []
+    gate = threading.Barrier(20)
+
+    def buy():
+        gate.wait()
+        try:
+            db.place_order([(3, 1)])
+            outcomes.append('placed')
+        except CheckoutError as err:
+            outcomes.append('sold_out' if err.out_of_stock else 'error')
+
+    threads = [threading.Thread(target=buy) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert outcomes.count('placed') == 5
+    assert outcomes.count('sold_out') == 15
+    assert _stock_and_sold(db, 3) == (0, 5)
+
+
+@pytest.mark.parametrize('body', [[], 'x', 42, {'items': 'x'}, {'items': [1]}])
+def test_api_rejects_malformed_bodies(db, body):
+    from shop_app.web_server import app
+    response = app.test_client().post('/api/checkout', json=body)
+    assert response.status_code == 400
+    assert _order_count(db) == 0
+
+
+def test_api_answers_503_when_the_database_is_unavailable(db, monkeypatch):
+    from shared.pool import PoolTimeout
+    from shop_app import web_server
+
+    def place_order(*args, **kwargs):
+        raise PoolTimeout("no connection available")
+    monkeypatch.setattr(web_server, 'place_order', place_order)
+    response = web_server.app.test_client().post('/api/checkout', json={'items': [{'id': 1, 'quantity': 1}]})
+    assert response.status_code == 503
+    assert response.get_json() == {'error': 'Database unavailable'}
@@ -0,0 +1,52 @@
+# tests/test_counters.py
+import time
+
+from shared.counters import WriteBehindCounters
+
+
+def _counters(write_batch):
+    # A long interval and a big threshold: nothing flushes unless the test asks.
+    return WriteBehindCounters('test_counters', write_batch, flush_interval=3600, max_pending=1000)
+
+
+def test_increments_are_summed_per_column_and_row():
+    written = []
+    counters = _counters(written.append)
+    counters.add('sold_count', 1, 2)
+    counters.add('sold_count', 1, 3)
+    counters.add('view_count', 1)
+    counters.add('sold_count', 2)
+    assert counters.stats()['pending'] == 3
+    assert counters.flush() == 3
+    assert written == [{'sold_count': {1: 5, 2: 1}, 'view_count': {1: 1}}]
+    assert counters.flush() == 0
+
+
+def test_failed_batch_is_merged_into_the_next_one():
+    attempts = []
+
+    def write_batch(batch):
+        attempts.append(batch)
+        if len(attempts) == 1:
+            raise RuntimeError("database unavailable")
+
+    counters = _counters(write_batch)
+    counters.add('sold_count', 1, 2)
+    assert counters.flush() == 0
+    assert counters.stats()['failures'] == 1
+    counters.add('sold_count', 1, 1)
+    counters.add('sold_count', 2, 1)
+    assert counters.flush() == 2
+    assert attempts[-1] == {'sold_count': {1: 3, 2: 1}}
+    assert counters.stats()['pending'] == 0
+
+
+def test_reaching_max_pending_wakes_the_flusher():
+    counters = WriteBehindCounters('test_counters', lambda batch: None, flush_interval=3600, max_pending=2)
+    counters.add('sold_count', 1)
+    assert not counters._wake.is_set()
+    counters.add('sold_count', 2)
+    deadline = time.monotonic() + 2
+    while counters.stats()['pending'] and time.monotonic() < deadline:
+        time.sleep(0.01)  # the flusher thread runs once woken
+    assert counters.stats()['pending'] == 0
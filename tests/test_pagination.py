@@ -0,0 +1,69 @@
+# tests/test_pagination.py
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from shared.database import PRODUCT_SORTS, decode_cursor, encode_cursor
+
+
+@pytest.mark.parametrize('value', [42, 'Tote Bag', Decimal('19.90'), datetime(2025, 6, 13, 8, 30)])
+def test_cursor_round_trip(value):
+    encoded_value, last_id = decode_cursor(encode_cursor({'sort': value, 'id': 7}, 'sort'))
+    assert last_id == 7
+    assert encoded_value == (str(value) if isinstance(value, Decimal)
+                             else value.isoformat(sep=' ') if isinstance(value, datetime) else value)
+
+
+@pytest.mark.parametrize('cursor', ['', 'not base64!', 'e30', 'WzFd'])  # '', junk, {}, [1]
+def test_malformed_cursors_raise_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def _walk(db, sort, limit=4, **kwargs):
+    pages, cursor = [], None
+    while True:
+        page = db.get_products_page(limit=limit, cursor=cursor, sort=sort, **kwargs)
+        pages.append([product['id'] for product in page['products']])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize('sort', sorted(PRODUCT_SORTS))
+def test_every_sort_visits_each_product_once(db, sort):
+    # The fixture has only three prices and one stock level, so most sorts page through ties.
+    pages = _walk(db, sort)
+    ids = [product_id for page in pages for product_id in page]
+    assert sorted(ids) == list(range(1, 26))
+    assert all(len(page) == 4 for page in pages[:-1])
+
+
+def test_ties_break_on_id_in_the_sort_direction(db):
+    ascending = [i for page in _walk(db, 'price_asc') for i in page]
+    descending = [i for page in _walk(db, 'price_desc') for i in page]
+    assert ascending[:3] == [3, 6, 9]    # price 10.00, ids ascending
+    assert descending[:3] == [23, 20, 17]  # price 12.00, ids descending
+
+
+def test_columns_are_limited_and_id_is_always_included(db):
+    product = db.get_products_page(limit=1, columns=('name',))['products'][0]
+    assert dict(product) == {'id': 25, 'name': 'Product 25'}
+    with pytest.raises(KeyError):
+        product['price']
+
+
+def test_unknown_sorts_and_columns_raise_value_error(db):
+    with pytest.raises(ValueError):
+        db.get_products_page(sort='random')
+    with pytest.raises(ValueError):
+        db.get_products_page(columns=('password',))
+
+
+def test_name_filter_matches_like_wildcards_literally(db):
+    db.add_product('50% off_sale', 1, '1.00')
+    db.add_product('500 offsale', 1, '1.00')
+    names = [p['name'] for p in db.get_products_page(name_filter='0% off_', columns=('name',))['products']]
+    assert names == ['50% off_sale']
+    assert sum(len(page) for page in _walk(db, 'newest', name_filter='Product 1')) == 11  # 1, 10-19
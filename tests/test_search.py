@@ -0,0 +1,53 @@
+# tests/test_search.py
+from shared.search import SearchIndex
+
+
+def _index(*products):
+    index = SearchIndex()
+    for product_id, name, description, sold in products:
+        index.add({'id': product_id, 'name': name, 'description': description, 'price': 10,
+                   'image_url': '', 'sold_count': sold})
+    return index
+
+
+def _ids(index, query, limit=20, **kwargs):
+    return [result['id'] for result in index.search(query, limit, **kwargs)]
+
+
+def test_name_matches_rank_above_description_matches():
+    index = _index((1, 'Canvas bag', 'holds a hoodie', 900), (2, 'Hoodie', 'warm', 1), (3, 'Mug', 'ceramic', 5))
+    assert _ids(index, 'hoodie') == [2, 1]
+    assert _ids(index, 'hoodie', names_only=True) == [2]
+
+
+def test_ties_break_on_sold_count_then_id():
+    index = _index((1, 'Tote bag', '', 5), (2, 'Tote bag', '', 50), (3, 'Tote bag', '', 50))
+    assert _ids(index, 'tote') == [2, 3, 1]
+
+
+def test_exact_words_beat_prefix_matches():
+    index = _index((1, 'Totebag', '', 100), (2, 'Tote', '', 1))
+    assert _ids(index, 'tote') == [2, 1]
+
+
+def test_every_word_must_match_as_a_prefix():
+    index = _index((1, 'PUP hoodie', 'maroon', 0), (2, 'PUP mug', 'maroon', 0), (3, 'Hoodie', 'grey', 0))
+    assert _ids(index, 'pup hood') == [1]
+    assert sorted(_ids(index, 'maroon pu')) == [1, 2]
+    assert _ids(index, 'pup socks') == []
+
+
+def test_updates_and_removals_are_reflected():
+    index = _index((1, 'Tote bag', '', 5), (2, 'Tote bag', '', 10))
+    assert _ids(index, 'tote') == [2, 1]
+    index.add({'id': 1, 'name': 'Tote bag', 'description': '', 'price': 10, 'image_url': '', 'sold_count': 20})
+    assert _ids(index, 'tote') == [1, 2]
+    index.remove(2)
+    assert _ids(index, 'tote') == [1]
+    index.add({'id': 1, 'name': 'Lanyard', 'description': '', 'price': 10, 'image_url': '', 'sold_count': 20})
+    assert _ids(index, 'tote') == []
+
+
+def test_limit_keeps_the_best_results():
+    index = _index(*[(i, f"Shirt {i}", '', i) for i in range(1, 51)])
+    assert _ids(index, 'shirt', limit=3) == [50, 49, 48]
@@ -0,0 +1,55 @@
+# tests/test_upsert.py
+import io
+
+import pytest
+
+from shared.inventory_csv import import_csv
+
+
+def _row(db, product_id):
+    with db.db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT name, price, stock FROM products WHERE id = %s", (product_id,))
+            return cursor.fetchone()
+        finally:
+            cursor.close()
+
+
+def test_updates_keep_fields_not_given_and_inserts_get_new_ids(db):
+    result = db.upsert_products([(2, {'id': 1, 'stock': 40}), (3, {'name': 'Lanyard', 'price': '85.00', 'stock': 3})])
+    assert result == {'inserted': 1, 'updated': 1, 'errors': []}
+    assert _row(db, 1)[0] == 'Product 1' and _row(db, 1)[2] == 40
+    assert _row(db, 26)[0] == 'Lanyard'
+
+
+def test_later_lines_for_the_same_id_build_on_earlier_ones(db):
+    db.upsert_products([(2, {'id': 1, 'name': 'Renamed'}), (3, {'id': 1, 'stock': 0})])
+    assert _row(db, 1)[0] == 'Renamed' and _row(db, 1)[2] == 0
+
+
+def test_new_products_need_name_price_and_stock(db):
+    result = db.upsert_products([(2, {'name': 'No price', 'stock': 1}), (3, {'id': 2, 'stock': 9})])
+    assert result['inserted'] == 0 and result['updated'] == 1
+    assert result['errors'] == [(2, 'New product needs price')]
+
+
+def test_a_row_the_server_rejects_is_reported_and_the_rest_saved(db):
+    # NULL name violates NOT NULL: the batch fails and is replayed row by row.
+    result = db.upsert_products([(2, {'id': 1, 'stock': 7}), (3, {'id': 2, 'name': None}), (4, {'id': 3, 'stock': 8})])
+    assert result['updated'] == 2
+    assert [line for line, _ in result['errors']] == [3]
+    assert _row(db, 1)[2] == 7 and _row(db, 3)[2] == 8
+    assert _row(db, 2)[0] == 'Product 2'
+
+
+def test_import_csv_reports_bad_lines_by_line_number(db):
+    data = b"id,name,price,stock\n1,Updated,11.00,4\n,Missing stock,5.00,\n,New,5.00,2\n"
+    summary = import_csv(io.BytesIO(data))
+    assert (summary['inserted'], summary['updated'], summary['error_count']) == (1, 1, 1)
+    assert summary['errors'][0]['line'] == 3
+
+
+def test_import_csv_rejects_unknown_columns(db):
+    with pytest.raises(ValueError):
+        import_csv(io.BytesIO(b"id,colour\n1,red\n"))